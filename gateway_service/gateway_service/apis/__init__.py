@@ -1,3 +1,5 @@
+from typing import Dict
+
 from gateway_service.apis.library_system_api.api import LibrarySystemAPI
 from gateway_service.apis.rating_system_api.api import RatingSystemAPI
 from gateway_service.apis.reservation_system.api import ReservationSystemAPI
@@ -17,3 +19,20 @@ async def get_reservation_system_api() -> ReservationSystemAPI:
 
 async def get_rating_system_api() -> RatingSystemAPI:
     return rating_system_api
+
+
+async def startup_apis() -> None:
+    for api in (library_system_api, reservation_system_api, rating_system_api):
+        await api.startup()
+
+
+async def shutdown_apis() -> None:
+    for api in (library_system_api, reservation_system_api, rating_system_api):
+        await api.shutdown()
+
+
+def get_apis_stats() -> Dict[str, Dict]:
+    return {
+        api.__class__.__name__: api.stats()
+        for api in (library_system_api, reservation_system_api, rating_system_api)
+    }
@@ -0,0 +1,135 @@
+import logging
+from functools import partial
+from typing import Any, Dict, Hashable
+
+from httpx import AsyncClient, Limits, Request, Response, Timeout
+
+from gateway_service.bulkhead import Bulkhead
+from gateway_service.circuit_breaker import CircuitBreaker
+from gateway_service.config import SystemConfig
+from gateway_service.deadline import DEADLINE_HEADER, get_remaining_time
+from gateway_service.exceptions import BulkheadFullError
+from gateway_service.retry import RetryPolicy
+from gateway_service.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSystemAPI:
+    def __init__(self, config: SystemConfig) -> None:
+        self._host = config.host
+        self._port = config.port
+        self._config = config
+
+        self._client: AsyncClient | None = None
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self._bulkhead: Bulkhead = Bulkhead(
+            name=self.__class__.__name__,
+            max_concurrent=config.bulkhead_max_concurrent,
+            max_wait=config.bulkhead_max_wait,
+        )
+        self._single_flight: SingleFlight[Response | None] = SingleFlight(name=self.__class__.__name__)
+        self._retry_policy: RetryPolicy = RetryPolicy(name=self.__class__.__name__)
+
+    @property
+    def client(self) -> AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f'{self.__class__.__name__} is not started')
+        return self._client
+
+    async def startup(self) -> None:
+        """
+        Создает общий для всех запросов к сервису клиент с пулом keep-alive соединений.
+        """
+        if self._client is not None:
+            return
+
+        self._client = AsyncClient(
+            base_url=f'http://{self._host}:{self._port}',
+            limits=Limits(
+                max_connections=self._config.max_connections,
+                max_keepalive_connections=self._config.max_keepalive_connections,
+                keepalive_expiry=self._config.keepalive_expiry,
+            ),
+            timeout=Timeout(self._config.read_timeout, connect=self._config.connect_timeout),
+        )
+
+    async def shutdown(self) -> None:
+        if self._client is None:
+            return
+
+        await self._client.aclose()
+        self._client = None
+
+    def get_circuit_breaker(self, method: str, route: str) -> CircuitBreaker:
+        """
+        Возвращает circuit breaker для пары (метод, шаблон пути), создавая его при первом обращении.
+        """
+        key = f'{method} {route}'
+        circuit_breaker: CircuitBreaker | None = self._circuit_breakers.get(key)
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker(name=f'{self.__class__.__name__} {key}')
+            self._circuit_breakers[key] = circuit_breaker
+        return circuit_breaker
+
+    def retry_after(self) -> float:
+        """
+        Сколько секунд осталось до проверки сервиса, если открыт хотя бы один из его circuit breaker.
+        """
+        return max((breaker.retry_after() for breaker in self._circuit_breakers.values()), default=0.0)
+
+    def stats(self) -> Dict:
+        return {
+            'bulkhead': self._bulkhead.stats(),
+            'circuit_breakers': {key: breaker.stats() for key, breaker in self._circuit_breakers.items()},
+            'single_flight': self._single_flight.stats(),
+            'retry': self._retry_policy.stats(),
+        }
+
+    async def _request(
+        self, method: str, route: str, path_params: Dict[str, Any] | None = None, **kwargs: Any
+    ) -> Response | None:
+        """
+        Выполняет запрос к сервису через bulkhead сервиса и circuit breaker маршрута.
+        Одинаковые GET-запросы, выполняющиеся одновременно, объединяются в один и при ошибке повторяются,
+        а circuit breaker учитывает только итог всех попыток.
+        Таймауты запроса ограничиваются оставшимся сроком, который также передается сервису в заголовке.
+        :param route: Шаблон пути, по которому выбирается circuit breaker, например `/libraries/{library_uid}`.
+        :param path_params: Значения для подстановки в шаблон пути.
+        :return: Ответ сервиса или None, если сервис недоступен.
+        """
+        url = route.format(**path_params) if path_params else route
+
+        remaining_time: float | None = get_remaining_time()
+        if remaining_time is not None:
+            if remaining_time <= 0:
+                logger.info(f'{self.__class__.__name__}: deadline exceeded, {method} {url} is not sent')
+                return None
+
+            kwargs['timeout'] = Timeout(
+                min(self._config.read_timeout, remaining_time),
+                connect=min(self._config.connect_timeout, remaining_time),
+            )
+            kwargs['headers'] = {**kwargs.get('headers', {}), DEADLINE_HEADER: f'{remaining_time:.3f}'}
+
+        request: Request = self.client.build_request(method, url, **kwargs)
+        circuit_breaker: CircuitBreaker = self.get_circuit_breaker(method, route)
+
+        if method != 'GET':
+            return await self._send(request, circuit_breaker)
+
+        # Оставшийся срок у одинаковых запросов разный, поэтому в ключ он не входит.
+        headers = sorted((name, value) for name, value in request.headers.items() if name != DEADLINE_HEADER.lower())
+        key: Hashable = (str(request.url), tuple(headers))
+        return await self._single_flight.do(key, partial(self._send, request, circuit_breaker))
+
+    async def _send(self, request: Request, circuit_breaker: CircuitBreaker) -> Response | None:
+        send = partial(self.client.send, request)
+        if request.method == 'GET':
+            send = partial(self._retry_policy.call, send)
+
+        try:
+            async with self._bulkhead.acquire():
+                return await circuit_breaker.request(send)
+        except BulkheadFullError:
+            return None
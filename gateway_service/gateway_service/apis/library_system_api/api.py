@@ -1,97 +1,194 @@
-from typing import Awaitable
+from typing import Dict, List, Tuple
 from uuid import UUID
 
-from httpx import AsyncClient, Response
+from httpx import Response
 
+from gateway_service.apis.base_api import BaseSystemAPI
 from gateway_service.apis.library_system_api.schemas import (
+    BatchModel,
     BookModel,
     BooksPagination,
     LibrariesPagination,
     LibraryModel,
 )
-from gateway_service.circuit_breaker import CircuitBreaker
-from gateway_service.config import LIBRARY_SYSTEM_CONFIG
-from gateway_service.exceptions import ServiceNotAvailableError
+from gateway_service.cache import TTLCache
+from gateway_service.config import CACHE_CONFIG, LIBRARY_SYSTEM_CONFIG, CacheConfig, LibraryConfig
+from gateway_service.exceptions import ServiceNotAvailableError, ValidationError
 from gateway_service.validators import json_dump
 
 
-class LibrarySystemAPI:
-    def __init__(self, host: str = LIBRARY_SYSTEM_CONFIG.host, port: int = LIBRARY_SYSTEM_CONFIG.port) -> None:
-        self._host = host
-        self._port = port
+class LibrarySystemAPI(BaseSystemAPI):
+    """
+    Клиент library_system. Библиотеки и книги, полученные от сервиса, кэшируются по UID.
+    Fallback-модели, возвращаемые при недоступности сервиса, в кэш не попадают.
+    """
 
-        self._circuit_breaker: CircuitBreaker = CircuitBreaker(name=self.__class__.__name__)
+    def __init__(self, config: LibraryConfig = LIBRARY_SYSTEM_CONFIG, cache_config: CacheConfig = CACHE_CONFIG) -> None:
+        super().__init__(config)
 
-    async def get_libraries(self, city: str, page: int, size: int) -> LibrariesPagination | None:
+        self._libraries_cache: TTLCache[UUID, LibraryModel] = TTLCache(
+            'libraries', ttl=cache_config.ttl, max_size=cache_config.max_size
+        )
+        self._books_cache: TTLCache[UUID, BookModel] = TTLCache(
+            'books', ttl=cache_config.ttl, max_size=cache_config.max_size
+        )
+
+    def invalidate_library(self, library_uid: UUID) -> None:
+        self._libraries_cache.invalidate(library_uid)
+
+    def invalidate_book(self, book_uid: UUID) -> None:
+        self._books_cache.invalidate(book_uid)
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        return {cache.name: cache.stats() for cache in (self._libraries_cache, self._books_cache)}
+
+    async def get_libraries(
+        self, city: str, page: int, size: int, cursor: str | None = None
+    ) -> LibrariesPagination | None:
         params = {'city': city, 'page': page, 'size': size}
-        async with AsyncClient() as client:
-            func: Awaitable = client.get(f'http://{self._host}:{self._port}/libraries', params=params)
-            response: Response | None = await self._circuit_breaker.request(func)
+        if cursor is not None:
+            params['cursor'] = cursor
+        response: Response | None = await self._request('GET', '/libraries', params=params)
 
         if response is not None:
+            if response.status_code == 400:
+                raise ValidationError('Invalid cursor')
             return LibrariesPagination(**response.json())
         return None
 
     async def get_library(self, library_uid: UUID) -> LibraryModel:
-        library: LibraryModel
+        library: LibraryModel | None = self._libraries_cache.get(library_uid)
+        if library is not None:
+            return library
 
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/libraries/{library_uid}')
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request(
+            'GET',
+            '/libraries/{library_uid}',
+            path_params={'library_uid': library_uid},
+        )
 
         if response is not None:
             library = LibraryModel(**response.json())
+            self._libraries_cache.set(library_uid, library)
         else:
             library = LibraryModel(libraryUid=library_uid)
 
         return library
 
-    async def get_books(self, library_uid: UUID, page: int, size: int, show_all: bool) -> BooksPagination | None:
+    async def get_books(
+        self, library_uid: UUID, page: int, size: int, show_all: bool, cursor: str | None = None
+    ) -> BooksPagination | None:
         params = {'page': page, 'size': size, 'show_all': show_all}
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/libraries/{library_uid}/books', params=params)
-            response: Response | None = await self._circuit_breaker.request(func)
+        if cursor is not None:
+            params['cursor'] = cursor
+        response: Response | None = await self._request(
+            'GET',
+            '/libraries/{library_uid}/books',
+            path_params={'library_uid': library_uid},
+            params=params,
+        )
 
         if response is not None:
+            if response.status_code == 400:
+                raise ValidationError('Invalid cursor')
             return BooksPagination(**response.json())
         return None
 
     async def get_book(self, library_uid: UUID, book_uid: UUID) -> BookModel:
-        book: BookModel
+        book: BookModel | None = self._books_cache.get(book_uid)
+        if book is not None:
+            return book
 
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/libraries/{library_uid}/books/{book_uid}')
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request(
+            'GET',
+            '/libraries/{library_uid}/books/{book_uid}',
+            path_params={'library_uid': library_uid, 'book_uid': book_uid},
+        )
 
         if response is not None:
             book = BookModel(**response.json())
+            self._books_cache.set(book_uid, book)
         else:
             book = BookModel(bookUid=book_uid)
 
         return book
 
-    async def reserve_book(self, library_uid: UUID, book_uid: UUID) -> None:
+    async def get_batch(
+        self, library_uids: List[UUID], book_uids: List[UUID]
+    ) -> Tuple[Dict[UUID, LibraryModel], Dict[UUID, BookModel]]:
+        """
+        Получает библиотеки и книги по списку UID. Отсутствующие в кэше запрашиваются одним запросом.
+        Для ненайденных или недоступных объектов возвращается fallback-модель только с UID.
+        """
+        libraries: Dict[UUID, LibraryModel] = self._libraries_cache.get_many(library_uids)
+        books: Dict[UUID, BookModel] = self._books_cache.get_many(book_uids)
+
+        cold_library_uids = [library_uid for library_uid in library_uids if library_uid not in libraries]
+        cold_book_uids = [book_uid for book_uid in book_uids if book_uid not in books]
+
+        if cold_library_uids or cold_book_uids:
+            body = {
+                'libraryUids': [str(library_uid) for library_uid in cold_library_uids],
+                'bookUids': [str(book_uid) for book_uid in cold_book_uids],
+            }
+            response: Response | None = await self._request('POST', '/libraries/batch', json=body)
+
+            if response is not None:
+                batch: BatchModel = BatchModel(**response.json())
+                for library in batch.libraries:
+                    self._libraries_cache.set(library.libraryUid, library)
+                    libraries[library.libraryUid] = library
+                for book in batch.books:
+                    self._books_cache.set(book.bookUid, book)
+                    books[book.bookUid] = book
+
+        for library_uid in library_uids:
+            libraries.setdefault(library_uid, LibraryModel(libraryUid=library_uid))
+        for book_uid in book_uids:
+            books.setdefault(book_uid, BookModel(bookUid=book_uid))
+
+        return libraries, books
+
+    async def reserve_book(self, library_uid: UUID, book_uid: UUID, idempotency_key: str | None = None) -> None:
         body = json_dump({'library_uid': library_uid, 'book_uid': book_uid})
-        async with AsyncClient() as client:
-            func = client.post(
-                f'http://{self._host}:{self._port}/libraries/{library_uid}/books/{book_uid}/reserve',
-                json=body,
-            )
-            response: Response | None = await self._circuit_breaker.request(func)
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key is not None else {}
+        response: Response | None = await self._request(
+            'POST',
+            '/libraries/{library_uid}/books/{book_uid}/reserve',
+            path_params={'library_uid': library_uid, 'book_uid': book_uid},
+            headers=headers,
+            json=body,
+        )
 
         if response is None or response.status_code != 200:
             raise ServiceNotAvailableError
         return None
 
-    async def return_book(self, library_uid: UUID, book_uid: UUID) -> None:
+    async def return_book(self, library_uid: UUID, book_uid: UUID, idempotency_key: str | None = None) -> None:
         body = json_dump({'library_uid': library_uid, 'book_uid': book_uid})
-        async with AsyncClient() as client:
-            func = client.post(
-                f'http://{self._host}:{self._port}/libraries/{library_uid}/books/{book_uid}/return',
-                json=body,
-            )
-            response: Response | None = await self._circuit_breaker.request(func)
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key is not None else {}
+        response: Response | None = await self._request(
+            'POST',
+            '/libraries/{library_uid}/books/{book_uid}/return',
+            path_params={'library_uid': library_uid, 'book_uid': book_uid},
+            headers=headers,
+            json=body,
+        )
 
         if response is None or response.status_code != 200:
             raise ServiceNotAvailableError
         return None
+
+    async def revert_operation(self, idempotency_key: str) -> None:
+        """
+        Отменяет выполненную с ключом `idempotency_key` операцию с книгой, если она была выполнена.
+        """
+        response: Response | None = await self._request(
+            'DELETE',
+            '/operations/{idempotency_key}',
+            path_params={'idempotency_key': idempotency_key},
+        )
+
+        if response is None or response.status_code != 204:
+            raise ServiceNotAvailableError
+        return None
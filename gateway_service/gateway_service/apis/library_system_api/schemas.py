@@ -34,7 +34,8 @@ class BookInfo(BookModel):
 class Pagination(BaseModel):
     page: int
     pageSize: int
-    totalElements: int
+    totalElements: int | None
+    nextCursor: str | None = None
 
 
 class LibrariesPagination(Pagination):
@@ -43,3 +44,8 @@ class LibrariesPagination(Pagination):
 
 class BooksPagination(Pagination):
     items: List[BookInfo]
+
+
+class BatchModel(BaseModel):
+    libraries: List[LibraryModel] = []
+    books: List[BookModel] = []
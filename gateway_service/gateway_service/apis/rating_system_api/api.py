@@ -1,24 +1,19 @@
-from httpx import AsyncClient, Response
+from httpx import Response
 
+from gateway_service.apis.base_api import BaseSystemAPI
 from gateway_service.apis.rating_system_api.schemas import UserRating
-from gateway_service.circuit_breaker import CircuitBreaker
-from gateway_service.config import RATING_SYSTEM_CONFIG
+from gateway_service.config import RATING_SYSTEM_CONFIG, RatingConfig
 from gateway_service.exceptions import ServiceNotAvailableError
 from gateway_service.validators import json_dump
 
 
-class RatingSystemAPI:
-    def __init__(self, host: str = RATING_SYSTEM_CONFIG.host, port: int = RATING_SYSTEM_CONFIG.port) -> None:
-        self._host = host
-        self._port = port
-
-        self._circuit_breaker: CircuitBreaker = CircuitBreaker(name=self.__class__.__name__)
+class RatingSystemAPI(BaseSystemAPI):
+    def __init__(self, config: RatingConfig = RATING_SYSTEM_CONFIG) -> None:
+        super().__init__(config)
 
     async def get_rating(self, username: str) -> UserRating | None:
         headers = {'X-User-Name': username}
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/rating', headers=headers)
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request('GET', '/rating', headers=headers)
 
         if response is not None:
             return UserRating(**response.json())
@@ -28,9 +23,7 @@ class RatingSystemAPI:
     async def update_rating(self, username: str, new_stars: int) -> UserRating | None:
         headers = {'X-User-Name': username}
         body = json_dump(UserRating(stars=new_stars).dict())
-        async with AsyncClient() as client:
-            func = client.post(f'http://{self._host}:{self._port}/rating', headers=headers, json=body)
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request('POST', '/rating', headers=headers, json=body)
 
         if response is not None:
             return UserRating(**response.json())
@@ -1,32 +1,27 @@
 from typing import Dict, List
 from uuid import UUID
 
-from httpx import AsyncClient, Response
+from httpx import Response
 
+from gateway_service.apis.base_api import BaseSystemAPI
 from gateway_service.apis.reservation_system.schemas import (
     RentedBooks,
     ReservationBookInput,
     ReservationModel,
     ReservationUpdate,
 )
-from gateway_service.circuit_breaker import CircuitBreaker
-from gateway_service.config import RESERVATION_SYSTEM_CONFIG
+from gateway_service.config import RESERVATION_SYSTEM_CONFIG, ReservationConfig
 from gateway_service.exceptions import ServiceNotAvailableError
 from gateway_service.validators import json_dump
 
 
-class ReservationSystemAPI:
-    def __init__(self, host: str = RESERVATION_SYSTEM_CONFIG.host, port: int = RESERVATION_SYSTEM_CONFIG.port) -> None:
-        self._host = host
-        self._port = port
-
-        self._circuit_breaker: CircuitBreaker = CircuitBreaker(name=self.__class__.__name__)
+class ReservationSystemAPI(BaseSystemAPI):
+    def __init__(self, config: ReservationConfig = RESERVATION_SYSTEM_CONFIG) -> None:
+        super().__init__(config)
 
     async def get_reservations(self, username: str) -> List[ReservationModel] | None:
         headers = {'X-User-Name': username}
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/reservations', headers=headers)
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request('GET', '/reservations', headers=headers)
 
         if response is not None:
             dict_reservations: List[Dict] = response.json()
@@ -38,9 +33,12 @@ class ReservationSystemAPI:
 
     async def get_reservation(self, username: str, reservation_uid: UUID) -> ReservationModel | None:
         headers = {'X-User-Name': username}
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/reservations/{reservation_uid}', headers=headers)
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request(
+            'GET',
+            '/reservations/{reservation_uid}',
+            path_params={'reservation_uid': reservation_uid},
+            headers=headers,
+        )
 
         if response is not None:
             return ReservationModel(**response.json())
@@ -48,20 +46,20 @@ class ReservationSystemAPI:
 
     async def get_count_rented_books(self, username: str) -> RentedBooks | None:
         headers = {'X-User-Name': username}
-        async with AsyncClient() as client:
-            func = client.get(f'http://{self._host}:{self._port}/rented', headers=headers)
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request('GET', '/rented', headers=headers)
 
         if response is not None:
             return RentedBooks(**response.json())
         return None
 
-    async def reserve_book(self, username: str, reservation_book_input: ReservationBookInput) -> ReservationModel:
+    async def reserve_book(
+        self, username: str, reservation_book_input: ReservationBookInput, idempotency_key: str | None = None
+    ) -> ReservationModel:
         headers = {'X-User-Name': username}
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
         body: Dict = json_dump(reservation_book_input.dict())
-        async with AsyncClient() as client:
-            func = client.post(f'http://{self._host}:{self._port}/reservations', headers=headers, json=body)
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request('POST', '/reservations', headers=headers, json=body)
 
         if response is None:
             raise ServiceNotAvailableError
@@ -72,11 +70,13 @@ class ReservationSystemAPI:
     async def return_book(self, username: str, reservation_uid: UUID, reservation_update: ReservationUpdate) -> None:
         headers = {'X-User-Name': username}
         body = json_dump(reservation_update.dict())
-        async with AsyncClient() as client:
-            func = client.post(
-                f'http://{self._host}:{self._port}/reservations/{reservation_uid}/return', headers=headers, json=body,
-            )
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request(
+            'POST',
+            '/reservations/{reservation_uid}/return',
+            path_params={'reservation_uid': reservation_uid},
+            headers=headers,
+            json=body,
+        )
 
         if response is None or response.status_code != 204:
             raise ServiceNotAvailableError
@@ -84,11 +84,12 @@ class ReservationSystemAPI:
 
     async def delete_reserve(self, username: str, reservation_uid: UUID) -> None:
         headers = {'X-User-Name': username}
-        async with AsyncClient() as client:
-            func = client.delete(
-                f'http://{self._host}:{self._port}/reservations/{reservation_uid}', headers=headers,
-            )
-            response: Response | None = await self._circuit_breaker.request(func)
+        response: Response | None = await self._request(
+            'DELETE',
+            '/reservations/{reservation_uid}',
+            path_params={'reservation_uid': reservation_uid},
+            headers=headers,
+        )
 
         if response is None:
             raise ServiceNotAvailableError
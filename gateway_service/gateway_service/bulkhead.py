@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from gateway_service.exceptions import BulkheadFullError
+
+logger = logging.getLogger(__name__)
+
+
+class Bulkhead:
+    """
+    Ограничивает число одновременных запросов к одному сервису, чтобы медленный сервис не занял все ресурсы Gateway.
+    Запрос, не дождавшийся свободного места за `max_wait` секунд, отклоняется.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_wait: float) -> None:
+        self.name = name
+
+        self._max_concurrent: int = max_concurrent
+        self._max_wait: float = max_wait
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrent)
+
+        self._active: int = 0
+        self._waiting: int = 0
+        self._rejected: int = 0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        self._waiting += 1
+        try:
+            async with asyncio.timeout(self._max_wait):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self._rejected += 1
+            logger.info(f'Bulkhead {self.name} is full, request rejected')
+            raise BulkheadFullError
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            'max_concurrent': self._max_concurrent,
+            'active': self._active,
+            'waiting': self._waiting,
+            'rejected': self._rejected,
+        }
@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Tuple, TypeVar
+
+from gateway_service.config import STALE_RESPONSES_CONFIG
+
+KeyType = TypeVar('KeyType', bound=Hashable)
+ValueType = TypeVar('ValueType')
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    """
+    Кэш ограниченного размера: запись живет `ttl` секунд, при переполнении вытесняется самая давно использованная.
+    """
+
+    def __init__(self, name: str, ttl: float, max_size: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+
+        self._ttl: float = ttl
+        self._max_size: int = max_size
+        self._clock: Callable[[], float] = clock
+        self._items: OrderedDict[KeyType, Tuple[float, ValueType]] = OrderedDict()
+
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    def get(self, key: KeyType) -> ValueType | None:
+        item: Tuple[float, ValueType] | None = self._items.get(key)
+        if item is not None and item[0] <= self._clock():
+            del self._items[key]
+            item = None
+
+        if item is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._items.move_to_end(key)
+        return item[1]
+
+    def get_many(self, keys: Iterable[KeyType]) -> Dict[KeyType, ValueType]:
+        """
+        Возвращает найденные в кэше значения. Ключей, которых нет в результате, в кэше нет.
+        """
+        values: Dict[KeyType, ValueType] = {}
+        for key in keys:
+            value: ValueType | None = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set(self, key: KeyType, value: ValueType) -> None:
+        self._items[key] = (self._clock() + self._ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key: KeyType) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'size': len(self._items),
+            'max_size': self._max_size,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+        }
+
+
+class StaleStore(Generic[KeyType, ValueType]):
+    """
+    Последние успешные ответы, которые можно отдать, пока сервис недоступен.
+    Ответ старше `max_staleness` секунд не отдается.
+    """
+
+    def __init__(
+        self, name: str, max_staleness: float, max_size: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock: Callable[[], float] = clock
+        self._responses: TTLCache[KeyType, Tuple[float, ValueType]] = TTLCache(
+            name, ttl=max_staleness, max_size=max_size, clock=clock
+        )
+        self._served: int = 0
+
+    def set(self, key: KeyType, value: ValueType) -> None:
+        self._responses.set(key, (self._clock(), value))
+
+    def get(self, key: KeyType) -> Tuple[ValueType, float] | None:
+        """
+        :return: Сохраненный ответ и его возраст в секундах или None, если ответа нет или он слишком старый.
+        """
+        item: Tuple[float, ValueType] | None = self._responses.get(key)
+        if item is None:
+            return None
+
+        self._served += 1
+        stored_at, value = item
+        return value, self._clock() - stored_at
+
+    def stats(self) -> Dict:
+        return {**self._responses.stats(), 'served': self._served}
+
+
+STALE_RESPONSES: StaleStore[Tuple[Any, ...], Any] = StaleStore(
+    'stale responses', max_staleness=STALE_RESPONSES_CONFIG.max_staleness, max_size=STALE_RESPONSES_CONFIG.max_size
+)
+
+
+async def get_stale_responses() -> StaleStore[Tuple[Any, ...], Any]:
+    return STALE_RESPONSES
@@ -1,10 +1,10 @@
-import asyncio
 import enum
 import logging
-from asyncio import Task
-from typing import Awaitable
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Tuple
 
-from httpx import ConnectTimeout, Response
+from httpx import Response, TransportError
 
 from gateway_service.config import CIRCUIT_BREAKER_CONFIG
 
@@ -18,83 +18,160 @@ class CircuitBreakerStatus(enum.Enum):
 
 
 class CircuitBreaker:
+    """
+    Circuit Breaker, переключение состояний которого определяется часами, а не фоновыми задачами.
+
+    В состоянии CLOSED результаты запросов накапливаются в скользящем окне из секундных корзин. Если за окно набралось
+    не меньше `failure_threshold` ошибок и их доля не меньше `failure_rate_threshold`, breaker переходит в OPEN
+    и запоминает момент `opened_at`. По истечении `timeout` секунд состояние при очередном обращении лениво
+    меняется на HALF_OPEN, в котором одновременно пропускается не более `half_open_max_calls` пробных запросов.
+    """
+
     def __init__(
         self,
         name: str,
         failure_threshold: int = CIRCUIT_BREAKER_CONFIG.failure_threshold,
+        failure_rate_threshold: float = CIRCUIT_BREAKER_CONFIG.failure_rate_threshold,
         success_threshold: int = CIRCUIT_BREAKER_CONFIG.success_threshold,
-        timeout: int = CIRCUIT_BREAKER_CONFIG.timeout
+        half_open_max_calls: int = CIRCUIT_BREAKER_CONFIG.half_open_max_calls,
+        window: int = CIRCUIT_BREAKER_CONFIG.window,
+        timeout: float = CIRCUIT_BREAKER_CONFIG.timeout,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
         self._status: CircuitBreakerStatus = CircuitBreakerStatus.CLOSED
         self.name = name
 
-        self._failure_count: int = 0
-        self._success_count: int = 0
-
         self._failure_threshold: int = failure_threshold
+        self._failure_rate_threshold: float = failure_rate_threshold
         self._success_threshold: int = success_threshold
-
-        self._timeout: int = timeout
-        self._wait_timeout_task: Task | None = None
-
-    async def wait_timeout(self):
-        await asyncio.sleep(self._timeout)
-        self._status = CircuitBreakerStatus.HALF_OPEN
-        self._success_count = 0
-
-    async def request(self, func: Awaitable) -> Response | None:
-        response: Response
-        match self._status:
-            case CircuitBreakerStatus.CLOSED:
-                try:
-                    response = await func
-                except ConnectTimeout as exc:
-                    logger.info(f'ConnectTimeout ERROR: {exc}')
-                    self._failure_count += 1
-                    if self._failure_count >= self._failure_threshold:
-                        self._status = CircuitBreakerStatus.OPEN
-                        self._wait_timeout_task = await asyncio.create_task(self.wait_timeout(), name='wait timeout')
-                    return None
-                except Exception as exc:
-                    logger.info(f'SOME ERROR: {exc}')
-                    return None
-
-                if 500 <= response.status_code < 600:
-                    self._failure_count += 1
-                    if self._failure_count >= self._failure_threshold:
-                        self._status = CircuitBreakerStatus.OPEN
-                        self._wait_timeout_task = await asyncio.create_task(self.wait_timeout(), name='wait timeout')
-                    return None
-
-                return response
-
+        self._half_open_max_calls: int = half_open_max_calls
+        self._window: int = window
+        self._timeout: float = timeout
+        self._clock: Callable[[], float] = clock
+
+        # Корзины скользящего окна: [начало секунды, число запросов, число ошибок]
+        self._buckets: Deque[List[int]] = deque()
+        self._opened_at: float | None = None
+        self._success_count: int = 0
+        self._half_open_calls: int = 0
+
+    @property
+    def status(self) -> CircuitBreakerStatus:
+        if self._status == CircuitBreakerStatus.OPEN and self._clock() - self._opened_at >= self._timeout:
+            self._status = CircuitBreakerStatus.HALF_OPEN
+            self._success_count = 0
+            logger.info(f'Circuit breaker {self.name} is HALF_OPEN')
+        return self._status
+
+    @property
+    def opened_at(self) -> float | None:
+        return self._opened_at
+
+    def retry_after(self) -> float:
+        """
+        Сколько секунд осталось до перехода из OPEN в HALF_OPEN.
+        """
+        if self.status != CircuitBreakerStatus.OPEN:
+            return 0.0
+        return max(self._timeout - (self._clock() - self._opened_at), 0.0)
+
+    def stats(self) -> Dict:
+        self._prune_window(int(self._clock()))
+        calls, failures = self._window_counts()
+        return {
+            'status': self.status.value,
+            'retry_after': self.retry_after(),
+            'window_calls': calls,
+            'window_failures': failures,
+            'half_open_calls': self._half_open_calls,
+        }
+
+    async def request(self, func: Callable[[], Awaitable[Response]]) -> Response | None:
+        match self.status:
             case CircuitBreakerStatus.OPEN:
                 return None
 
             case CircuitBreakerStatus.HALF_OPEN:
-                try:
-                    response = await func
-                except ConnectTimeout as exc:
-                    logger.info(f'ConnectTimeout ERROR: {exc}')
-                    self._failure_count += 1
-                    if self._failure_count >= self._failure_threshold:
-                        self._status = CircuitBreakerStatus.OPEN
-                        self._wait_timeout_task = await asyncio.create_task(self.wait_timeout(), name='wait timeout')
-                    return None
-                except Exception as exc:
-                    logger.info(f'SOME ERROR: {exc}')
+                if self._half_open_calls >= self._half_open_max_calls:
                     return None
 
-                if 200 <= response.status_code < 300:
-                    self._success_count += 1
-                    if self._success_count >= self._success_threshold:
-                        self._status = CircuitBreakerStatus.CLOSED
-                        self._failure_count = 0
+                self._half_open_calls += 1
+                try:
+                    response: Response | None = await self._call(func)
+                finally:
+                    self._half_open_calls -= 1
 
-                elif 500 <= response.status_code < 600:
-                    self._status = CircuitBreakerStatus.OPEN
-                    self._wait_timeout_task = await asyncio.create_task(self.wait_timeout(), name='wait timeout')
-                    return None
+                self._on_probe_result(response is not None)
+                return response
 
+            case CircuitBreakerStatus.CLOSED:
+                response = await self._call(func)
+                self._on_result(response is not None)
                 return response
 
+    async def _call(self, func: Callable[[], Awaitable[Response]]) -> Response | None:
+        """
+        Выполняет запрос. Таймауты, ошибки соединения и ответы 5xx считаются неудачей и возвращают None.
+        """
+        try:
+            response: Response = await func()
+        except TransportError as exc:
+            logger.info(f'{self.name}: {exc.__class__.__name__} ERROR: {exc}')
+            return None
+        except Exception as exc:
+            logger.exception(f'{self.name}: SOME ERROR: {exc}')
+            return None
+
+        if 500 <= response.status_code < 600:
+            logger.info(f'{self.name}: got {response.status_code} response')
+            return None
+
+        return response
+
+    def _on_result(self, success: bool) -> None:
+        if self._status != CircuitBreakerStatus.CLOSED:
+            # Состояние могло смениться, пока выполнялся запрос.
+            return
+
+        now = int(self._clock())
+        self._prune_window(now)
+
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        self._buckets[-1][1] += 1
+        self._buckets[-1][2] += 0 if success else 1
+
+        if success:
+            return
+
+        calls, failures = self._window_counts()
+        if failures >= self._failure_threshold and failures / calls >= self._failure_rate_threshold:
+            self._open()
+
+    def _prune_window(self, now: int) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self._window:
+            self._buckets.popleft()
+
+    def _window_counts(self) -> Tuple[int, int]:
+        return sum(bucket[1] for bucket in self._buckets), sum(bucket[2] for bucket in self._buckets)
+
+    def _on_probe_result(self, success: bool) -> None:
+        if self._status != CircuitBreakerStatus.HALF_OPEN:
+            return
+
+        if not success:
+            self._open()
+            return
+
+        self._success_count += 1
+        if self._success_count >= self._success_threshold:
+            self._status = CircuitBreakerStatus.CLOSED
+            self._buckets.clear()
+            self._opened_at = None
+            logger.info(f'Circuit breaker {self.name} is CLOSED')
+
+    def _open(self) -> None:
+        self._status = CircuitBreakerStatus.OPEN
+        self._opened_at = self._clock()
+        self._buckets.clear()
+        logger.info(f'Circuit breaker {self.name} is OPEN')
@@ -1,34 +1,135 @@
 from pydantic import BaseSettings, Field
 
 
-class RatingConfig(BaseSettings):
-    host: str = Field(env='RATING_SYSTEM_HOST', default='rating_system')
-    port: int = Field(env='RATING_SYSTEM_PORT', default=8050)
+class SystemConfig(BaseSettings):
+    host: str
+    port: int
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry: float
+    connect_timeout: float
+    read_timeout: float
+    bulkhead_max_concurrent: int
+    bulkhead_max_wait: float
 
     class Config:
         validate_assignment = True
 
 
-class LibraryConfig(BaseSettings):
+class RatingConfig(SystemConfig):
+    host: str = Field(env='RATING_SYSTEM_HOST', default='rating_system')
+    port: int = Field(env='RATING_SYSTEM_PORT', default=8050)
+    max_connections: int = Field(env='RATING_SYSTEM_MAX_CONNECTIONS', default=100)
+    max_keepalive_connections: int = Field(env='RATING_SYSTEM_MAX_KEEPALIVE_CONNECTIONS', default=20)
+    keepalive_expiry: float = Field(env='RATING_SYSTEM_KEEPALIVE_EXPIRY', default=30.0)
+    connect_timeout: float = Field(env='RATING_SYSTEM_CONNECT_TIMEOUT', default=5.0)
+    read_timeout: float = Field(env='RATING_SYSTEM_READ_TIMEOUT', default=5.0)
+    bulkhead_max_concurrent: int = Field(env='RATING_SYSTEM_BULKHEAD_MAX_CONCURRENT', default=50)
+    bulkhead_max_wait: float = Field(env='RATING_SYSTEM_BULKHEAD_MAX_WAIT', default=1.0)
+
+
+class LibraryConfig(SystemConfig):
     host: str = Field(env='LIBRARY_SYSTEM_HOST', default='library_system')
     port: int = Field(env='LIBRARY_SYSTEM_PORT', default=8060)
+    max_connections: int = Field(env='LIBRARY_SYSTEM_MAX_CONNECTIONS', default=100)
+    max_keepalive_connections: int = Field(env='LIBRARY_SYSTEM_MAX_KEEPALIVE_CONNECTIONS', default=20)
+    keepalive_expiry: float = Field(env='LIBRARY_SYSTEM_KEEPALIVE_EXPIRY', default=30.0)
+    connect_timeout: float = Field(env='LIBRARY_SYSTEM_CONNECT_TIMEOUT', default=5.0)
+    read_timeout: float = Field(env='LIBRARY_SYSTEM_READ_TIMEOUT', default=5.0)
+    bulkhead_max_concurrent: int = Field(env='LIBRARY_SYSTEM_BULKHEAD_MAX_CONCURRENT', default=50)
+    bulkhead_max_wait: float = Field(env='LIBRARY_SYSTEM_BULKHEAD_MAX_WAIT', default=1.0)
+
+
+class ReservationConfig(SystemConfig):
+    host: str = Field(env='RESERVATION_SYSTEM_HOST', default='reservation_system')
+    port: int = Field(env='RESERVATION_SYSTEM_PORT', default=8070)
+    max_connections: int = Field(env='RESERVATION_SYSTEM_MAX_CONNECTIONS', default=100)
+    max_keepalive_connections: int = Field(env='RESERVATION_SYSTEM_MAX_KEEPALIVE_CONNECTIONS', default=20)
+    keepalive_expiry: float = Field(env='RESERVATION_SYSTEM_KEEPALIVE_EXPIRY', default=30.0)
+    connect_timeout: float = Field(env='RESERVATION_SYSTEM_CONNECT_TIMEOUT', default=5.0)
+    read_timeout: float = Field(env='RESERVATION_SYSTEM_READ_TIMEOUT', default=5.0)
+    bulkhead_max_concurrent: int = Field(env='RESERVATION_SYSTEM_BULKHEAD_MAX_CONCURRENT', default=50)
+    bulkhead_max_wait: float = Field(env='RESERVATION_SYSTEM_BULKHEAD_MAX_WAIT', default=1.0)
+
+
+class CircuitBreakerConfig(BaseSettings):
+    failure_threshold: int = Field(env='CIRCUIT_BREAKER_FAILURE_THRESHOLD', default=2)
+    failure_rate_threshold: float = Field(env='CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD', default=0.5)
+    success_threshold: int = Field(env='CIRCUIT_BREAKER_SUCCESS_THRESHOLD', default=1)
+    half_open_max_calls: int = Field(env='CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS', default=1)
+    window: int = Field(env='CIRCUIT_BREAKER_WINDOW', default=30)
+    timeout: float = Field(env='CIRCUIT_BREAKER_TIMEOUT', default=15)
 
     class Config:
         validate_assignment = True
 
 
-class ReservationConfig(BaseSettings):
-    host: str = Field(env='RESERVATION_SYSTEM_HOST', default='reservation_system')
-    port: int = Field(env='RESERVATION_SYSTEM_PORT', default=8070)
+class QueueConfig(BaseSettings):
+    path: str = Field(env='QUEUE_DB_PATH', default='data/queue.sqlite3')
+    flush_interval: float = Field(env='QUEUE_FLUSH_INTERVAL', default=0.005)
+    compact_threshold: int = Field(env='QUEUE_COMPACT_THRESHOLD', default=1000)
+    workers: int = Field(env='QUEUE_WORKERS', default=4)
+    retry_base_delay: float = Field(env='QUEUE_RETRY_BASE_DELAY', default=0.5)
+    retry_max_delay: float = Field(env='QUEUE_RETRY_MAX_DELAY', default=30.0)
+    capacity: int = Field(env='QUEUE_CAPACITY', default=10000)
+    high_watermark: int = Field(env='QUEUE_HIGH_WATERMARK', default=8000)
+    low_watermark: int = Field(env='QUEUE_LOW_WATERMARK', default=6000)
+    drain_rate_window: int = Field(env='QUEUE_DRAIN_RATE_WINDOW', default=60)
+    max_retry_after: int = Field(env='QUEUE_MAX_RETRY_AFTER', default=60)
 
     class Config:
         validate_assignment = True
 
 
-class CircuitBreakerConfig(BaseSettings):
-    failure_threshold: int = Field(env='CIRCUIT_BREAKER_FAILURE_THRESHOLD', default=2)
-    success_threshold: int = Field(env='CIRCUIT_BREAKER_SUCCESS_THRESHOLD', default=1)
-    timeout: int = Field(env='CIRCUIT_BREAKER_TIMEOUT', default=15)
+class RetryConfig(BaseSettings):
+    max_attempts: int = Field(env='RETRY_MAX_ATTEMPTS', default=3)
+    base_delay: float = Field(env='RETRY_BASE_DELAY', default=0.05)
+    max_delay: float = Field(env='RETRY_MAX_DELAY', default=1.0)
+    budget_ratio: float = Field(env='RETRY_BUDGET_RATIO', default=0.1)
+    budget_max_tokens: float = Field(env='RETRY_BUDGET_MAX_TOKENS', default=10.0)
+    hedge: bool = Field(env='RETRY_HEDGE', default=False)
+    hedge_quantile: float = Field(env='RETRY_HEDGE_QUANTILE', default=0.95)
+    hedge_min_delay: float = Field(env='RETRY_HEDGE_MIN_DELAY', default=0.05)
+    latency_window: int = Field(env='RETRY_LATENCY_WINDOW', default=200)
+    latency_min_samples: int = Field(env='RETRY_LATENCY_MIN_SAMPLES', default=20)
+
+    class Config:
+        validate_assignment = True
+
+
+class CacheConfig(BaseSettings):
+    ttl: float = Field(env='METADATA_CACHE_TTL', default=300.0)
+    max_size: int = Field(env='METADATA_CACHE_MAX_SIZE', default=10000)
+
+    class Config:
+        validate_assignment = True
+
+
+class StaleResponsesConfig(BaseSettings):
+    max_staleness: float = Field(env='STALE_RESPONSES_MAX_STALENESS', default=600.0)
+    max_size: int = Field(env='STALE_RESPONSES_MAX_SIZE', default=1000)
+
+    class Config:
+        validate_assignment = True
+
+
+class DeadlineConfig(BaseSettings):
+    request_timeout: float = Field(env='REQUEST_TIMEOUT', default=10.0)
+
+    class Config:
+        validate_assignment = True
+
+
+class WorkflowConfig(BaseSettings):
+    timeout: float = Field(env='WORKFLOW_TIMEOUT', default=10.0)
+
+    class Config:
+        validate_assignment = True
+
+
+class IdempotencyConfig(BaseSettings):
+    ttl: float = Field(env='IDEMPOTENCY_TTL', default=24 * 60 * 60)
+    max_size: int = Field(env='IDEMPOTENCY_MAX_SIZE', default=10000)
 
     class Config:
         validate_assignment = True
@@ -38,3 +139,10 @@ RATING_SYSTEM_CONFIG: RatingConfig = RatingConfig()
 LIBRARY_SYSTEM_CONFIG: LibraryConfig = LibraryConfig()
 RESERVATION_SYSTEM_CONFIG: ReservationConfig = ReservationConfig()
 CIRCUIT_BREAKER_CONFIG: CircuitBreakerConfig = CircuitBreakerConfig()
+QUEUE_CONFIG: QueueConfig = QueueConfig()
+RETRY_CONFIG: RetryConfig = RetryConfig()
+CACHE_CONFIG: CacheConfig = CacheConfig()
+STALE_RESPONSES_CONFIG: StaleResponsesConfig = StaleResponsesConfig()
+DEADLINE_CONFIG: DeadlineConfig = DeadlineConfig()
+WORKFLOW_CONFIG: WorkflowConfig = WorkflowConfig()
+IDEMPOTENCY_CONFIG: IdempotencyConfig = IdempotencyConfig()
@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# Заголовок, в котором сервису передается оставшийся бюджет запроса в секундах.
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+_deadline: ContextVar[float | None] = ContextVar('deadline', default=None)
+
+
+@contextmanager
+def deadline(timeout: float, detach: bool = False) -> Iterator[None]:
+    """
+    Ограничивает все запросы к сервисам внутри блока общим сроком `timeout` секунд.
+    Вложенный блок не может продлить срок внешнего, если только он не отвязан от него через `detach`,
+    как, например, компенсации, которые должны выполниться и после истечения срока запроса.
+    """
+    new_deadline = time.monotonic() + timeout
+    current_deadline: float | None = _deadline.get()
+    if current_deadline is not None and not detach:
+        new_deadline = min(new_deadline, current_deadline)
+
+    token = _deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_remaining_time() -> float | None:
+    """
+    Сколько секунд осталось до истечения срока или None, если срок не задан.
+    """
+    current_deadline: float | None = _deadline.get()
+    if current_deadline is None:
+        return None
+    return current_deadline - time.monotonic()
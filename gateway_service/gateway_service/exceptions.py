@@ -8,3 +8,13 @@ class ServiceNotAvailableError(Exception):
 
 class ServiceTemporaryNotAvailableError(Exception):
     pass
+
+
+class BulkheadFullError(Exception):
+    pass
+
+
+class QueueOverloadedError(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f'Deferred operations queue is overloaded, retry after {retry_after} seconds')
+        self.retry_after = retry_after
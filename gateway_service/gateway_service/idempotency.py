@@ -0,0 +1,56 @@
+import time
+from typing import Any, Callable, Dict
+from uuid import NAMESPACE_URL, uuid5
+
+from fastapi import Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from gateway_service.cache import TTLCache
+from gateway_service.config import IDEMPOTENCY_CONFIG
+
+
+class IdempotentResult(BaseModel):
+    status_code: int
+    content: Any = None
+
+    def to_response(self) -> Response:
+        if self.status_code == status.HTTP_204_NO_CONTENT:
+            return Response(status_code=self.status_code)
+        return JSONResponse(status_code=self.status_code, content=self.content)
+
+
+class IdempotencyStore:
+    """
+    Результаты выполненных запросов по их ключам идемпотентности.
+    Результат хранится `ttl` секунд, при переполнении вытесняется самый давно использованный.
+    """
+
+    def __init__(self, ttl: float, max_size: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self._results: TTLCache[str, IdempotentResult] = TTLCache(
+            'idempotent results', ttl=ttl, max_size=max_size, clock=clock
+        )
+
+    def get(self, key: str) -> IdempotentResult | None:
+        return self._results.get(key)
+
+    def set(self, key: str, status_code: int, content: Any = None) -> None:
+        self._results.set(key, IdempotentResult(status_code=status_code, content=content))
+
+    def stats(self) -> Dict:
+        return self._results.stats()
+
+
+def derive_idempotency_key(idempotency_key: str, username: str, operation: str) -> str:
+    """
+    Ключ, по которому операция пользователя выполняется в сервисах не более одного раза.
+    Ключи разных пользователей и разных операций не пересекаются, даже если клиенты прислали одинаковые ключи.
+    """
+    return str(uuid5(NAMESPACE_URL, f'{username}/{operation}/{idempotency_key}'))
+
+
+IDEMPOTENCY_STORE: IdempotencyStore = IdempotencyStore(IDEMPOTENCY_CONFIG.ttl, IDEMPOTENCY_CONFIG.max_size)
+
+
+async def get_idempotency_store() -> IdempotencyStore:
+    return IDEMPOTENCY_STORE
@@ -2,22 +2,43 @@ import asyncio
 import logging
 import os
 from asyncio import Task
+from typing import Dict, List
 
 import uvicorn
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 
 from gateway_service import cancel_and_stop_task
-from gateway_service.exceptions import ServiceNotAvailableError
-from gateway_service.queue_processor import QUEUE, queue_processor
-from gateway_service.routers import router
+from gateway_service.apis import get_apis_stats, library_system_api, shutdown_apis, startup_apis
+from gateway_service.cache import STALE_RESPONSES
+from gateway_service.config import DEADLINE_CONFIG, QUEUE_CONFIG
+from gateway_service.deadline import DEADLINE_HEADER, deadline
+from gateway_service.exceptions import QueueOverloadedError, ServiceNotAvailableError, ValidationError
+from gateway_service.idempotency import IDEMPOTENCY_STORE
+from gateway_service.queue_processor import OUTBOX, queue_processor
+from gateway_service.routers import OPERATION_HANDLERS, router
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 app.include_router(router, prefix='/api/v1', tags=['Gateway API'])
 
-queue_task: Task
+queue_tasks: List[Task] = []
+
+
+@app.middleware('http')
+async def deadline_middleware(request: Request, call_next):
+    """
+    Ограничивает обработку запроса общим сроком. Клиент может сократить срок заголовком X-Request-Timeout.
+    """
+    timeout: float = DEADLINE_CONFIG.request_timeout
+    try:
+        timeout = min(timeout, float(request.headers.get(DEADLINE_HEADER, timeout)))
+    except ValueError:
+        pass
+
+    with deadline(timeout):
+        return await call_next(request)
 
 
 @app.get('/manage/health', status_code=status.HTTP_200_OK)
@@ -25,18 +46,46 @@ async def check_health():
     return None
 
 
+@app.get('/manage/resilience', status_code=status.HTTP_200_OK)
+async def get_resilience_state() -> Dict[str, Dict]:
+    return get_apis_stats()
+
+
+@app.get('/manage/metrics', status_code=status.HTTP_200_OK)
+async def get_metrics() -> Dict[str, Dict]:
+    return {
+        'queue': OUTBOX.stats(),
+        'caches': library_system_api.cache_stats(),
+        'stale_responses': STALE_RESPONSES.stats(),
+        'idempotent_results': IDEMPOTENCY_STORE.stats(),
+    }
+
+
 @app.on_event('startup')
 async def startup_event() -> None:
-    global queue_task
-    queue_task = asyncio.create_task(queue_processor(QUEUE))
-    logger.info('Queue processor is started')
+    await startup_apis()
+    logger.info('Downstream API clients are started')
+
+    await OUTBOX.open()
+    for number in range(QUEUE_CONFIG.workers):
+        queue_tasks.append(
+            asyncio.create_task(queue_processor(OUTBOX, OPERATION_HANDLERS), name=f'queue processor {number}')
+        )
+    logger.info(f'Queue processor is started with {QUEUE_CONFIG.workers} workers')
 
 
 @app.on_event('shutdown')
 async def shutdown_event() -> None:
-    await cancel_and_stop_task(queue_task)
+    for task in queue_tasks:
+        await cancel_and_stop_task(task)
+    queue_tasks.clear()
     logger.info('Queue processor is stopped')
 
+    await OUTBOX.close()
+
+    await shutdown_apis()
+    logger.info('Downstream API clients are stopped')
+
 
 @app.exception_handler(ServiceNotAvailableError)
 async def unicorn_exception_handler(request: Request, exc: ServiceNotAvailableError):
@@ -46,6 +95,20 @@ async def unicorn_exception_handler(request: Request, exc: ServiceNotAvailableEr
     )
 
 
+@app.exception_handler(ValidationError)
+async def validation_exception_handler(request: Request, exc: ValidationError):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={'message': str(exc)})
+
+
+@app.exception_handler(QueueOverloadedError)
+async def queue_overloaded_exception_handler(request: Request, exc: QueueOverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'message': 'Service is overloaded, try again later'},
+        headers={'Retry-After': str(exc.retry_after)},
+    )
+
+
 if __name__ == "__main__":
     port = os.environ.get('PORT')
     if port is None:
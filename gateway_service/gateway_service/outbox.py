@@ -0,0 +1,345 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import time
+from asyncio import Future, Task
+from collections import deque
+from itertools import count
+from typing import Any, Deque, Dict, Iterator, List, Set, Tuple
+
+import aiosqlite
+from pydantic import BaseModel
+
+from gateway_service import cancel_and_stop_task
+from gateway_service.exceptions import QueueOverloadedError
+
+logger = logging.getLogger(__name__)
+
+
+class Operation(BaseModel):
+    """
+    Отложенная операция: имя обработчика и его JSON-сериализуемые аргументы.
+    Операции с одинаковым `key` выполняются строго по очереди, в порядке добавления.
+    """
+
+    id: int | None = None
+    name: str
+    key: str = ''
+    args: Dict[str, Any]
+    attempts: int = 0
+    next_attempt: float = 0.0
+
+
+class Outbox:
+    """
+    Очередь отложенных операций, сохраняемая в SQLite (WAL) и переживающая перезапуск Gateway.
+
+    Записи, добавленные за `flush_interval` секунд, и подтверждения выполненных операций фиксируются одной транзакцией,
+    то есть одним fsync. После каждых `compact_threshold` подтверждений WAL-журнал сбрасывается в базу и усекается.
+
+    Выдача операций упорядочена по времени следующей попытки. Из каждой цепочки операций с одинаковым `key`
+    в обработке находится не более одной операции - первая в цепочке.
+
+    Размер очереди ограничен `capacity`. Когда в очереди набирается `high_watermark` операций, новые операции
+    не принимаются, пока очередь не разберется до `low_watermark`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float,
+        compact_threshold: int,
+        capacity: int,
+        high_watermark: int,
+        low_watermark: int,
+        drain_rate_window: int,
+        max_retry_after: int,
+    ) -> None:
+        self._path: str = path
+        self._flush_interval: float = flush_interval
+        self._compact_threshold: int = compact_threshold
+        self._capacity: int = capacity
+        self._high_watermark: int = min(high_watermark, capacity)
+        self._low_watermark: int = min(low_watermark, self._high_watermark)
+        self._drain_rate_window: int = drain_rate_window
+        self._max_retry_after: int = max_retry_after
+
+        self._db: aiosqlite.Connection | None = None
+
+        self._chains: Dict[str, Deque[Operation]] = {}
+        # Куча из первых операций цепочек, ожидающих выполнения: (время следующей попытки, порядковый номер, key)
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._sequence: Iterator[int] = count()
+        self._in_progress: Set[str] = set()
+        self._size: int = 0
+        self._changed: asyncio.Event = asyncio.Event()
+
+        self._pending: List[Tuple[Operation, Future]] = []
+        self._pending_acks: List[int] = []
+        self._pending_retries: Dict[int, Operation] = {}
+        self._flush_event: asyncio.Event = asyncio.Event()
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+        self._flush_task: Task | None = None
+        self._acks_since_compaction: int = 0
+
+        self._shedding: bool = False
+        self._shed: int = 0
+        # Корзины подтвержденных операций: [начало секунды, число подтверждений]
+        self._drained: Deque[List[int]] = deque()
+
+    async def open(self) -> None:
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = await aiosqlite.connect(self._path)
+        await self._db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        await self._db.execute('PRAGMA journal_mode = WAL')
+        await self._db.execute('PRAGMA synchronous = FULL')
+        await self._db.execute(
+            'CREATE TABLE IF NOT EXISTS operations ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, args TEXT NOT NULL)'
+        )
+        async with self._db.execute('PRAGMA table_info(operations)') as cursor:
+            columns: Set[str] = {row[1] async for row in cursor}
+        for column, definition in (
+            ('key', "TEXT NOT NULL DEFAULT ''"),
+            ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+            ('next_attempt', 'REAL NOT NULL DEFAULT 0'),
+        ):
+            if column not in columns:
+                await self._db.execute(f'ALTER TABLE operations ADD COLUMN {column} {definition}')
+        await self._db.commit()
+
+        query = 'SELECT id, name, key, args, attempts, next_attempt FROM operations ORDER BY id'
+        async with self._db.execute(query) as cursor:
+            async for operation_id, name, key, args, attempts, next_attempt in cursor:
+                self._push(
+                    Operation(
+                        id=operation_id,
+                        name=name,
+                        key=key,
+                        args=json.loads(args),
+                        attempts=attempts,
+                        next_attempt=next_attempt,
+                    )
+                )
+
+        logger.info(f'Outbox {self._path} is opened, {self._size} operations to replay')
+        self._flush_task = asyncio.create_task(self._flusher(), name='outbox flusher')
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            await cancel_and_stop_task(self._flush_task)
+            self._flush_task = None
+
+        if self._db is not None:
+            await self._flush()
+            await self._db.close()
+            self._db = None
+
+    def qsize(self) -> int:
+        return self._size + len(self._pending)
+
+    def drain_rate(self) -> float:
+        """
+        Среднее число выполненных операций в секунду за последние `drain_rate_window` секунд.
+        """
+        self._prune_drained(int(time.time()))
+        return sum(bucket[1] for bucket in self._drained) / self._drain_rate_window
+
+    def retry_after(self) -> int:
+        """
+        Через сколько секунд очередь при текущей скорости разбора опустится до `low_watermark`.
+        """
+        drain_rate = self.drain_rate()
+        if not drain_rate:
+            return self._max_retry_after
+        backlog = max(self.qsize() - self._low_watermark, 1)
+        return min(max(math.ceil(backlog / drain_rate), 1), self._max_retry_after)
+
+    def admit(self) -> None:
+        """
+        Проверяет, примет ли очередь новую операцию.
+        :raises QueueOverloadedError: Если очередь заполнена выше `high_watermark` и еще не разобрана до `low_watermark`.
+        """
+        depth = self.qsize()
+        if self._shedding and depth <= self._low_watermark:
+            self._shedding = False
+            logger.info(f'Outbox {self._path} accepts operations again, {depth} operations in queue')
+        elif not self._shedding and depth >= self._high_watermark:
+            self._shedding = True
+            logger.warning(f'Outbox {self._path} is overloaded, {depth} operations in queue')
+
+        if self._shedding or depth >= self._capacity:
+            self._shed += 1
+            raise QueueOverloadedError(self.retry_after())
+
+    def stats(self) -> Dict:
+        return {
+            'depth': self.qsize(),
+            'capacity': self._capacity,
+            'high_watermark': self._high_watermark,
+            'low_watermark': self._low_watermark,
+            'shedding': self._shedding,
+            'shed': self._shed,
+            'drain_rate': self.drain_rate(),
+        }
+
+    async def put(self, operation: Operation) -> None:
+        """
+        Сохраняет операцию. Управление возвращается только после фиксации записи на диске.
+        :raises QueueOverloadedError: Если очередь не принимает новые операции.
+        """
+        self.admit()
+        future: Future = asyncio.get_running_loop().create_future()
+        self._pending.append((operation, future))
+        self._flush_event.set()
+        await future
+
+    async def get(self) -> Operation:
+        """
+        Ожидает первую операцию, время следующей попытки которой уже наступило.
+        """
+        while True:
+            if self._schedule and self._schedule[0][0] <= time.time():
+                _, _, key = heapq.heappop(self._schedule)
+                self._in_progress.add(key)
+                return self._chains[key][0]
+
+            timeout: float | None = self._schedule[0][0] - time.time() if self._schedule else None
+            self._changed.clear()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._changed.wait()
+            except TimeoutError:
+                pass
+
+    async def ack(self, operation: Operation) -> None:
+        """
+        Удаляет выполненную операцию. Удаление фиксируется вместе со следующей группой записей.
+        """
+        chain: Deque[Operation] = self._chains[operation.key]
+        chain.popleft()
+        self._size -= 1
+        self._in_progress.discard(operation.key)
+
+        if chain:
+            self._schedule_head(operation.key)
+        else:
+            del self._chains[operation.key]
+
+        self._pending_retries.pop(operation.id, None)
+        self._pending_acks.append(operation.id)
+        self._flush_event.set()
+
+        now = int(time.time())
+        self._prune_drained(now)
+        if not self._drained or self._drained[-1][0] != now:
+            self._drained.append([now, 0])
+        self._drained[-1][1] += 1
+
+    async def retry(self, operation: Operation, delay: float) -> None:
+        """
+        Откладывает операцию на `delay` секунд. Следующие операции с тем же `key` ждут ее выполнения.
+        """
+        operation.next_attempt = time.time() + delay
+        self._in_progress.discard(operation.key)
+        self._schedule_head(operation.key)
+
+        self._pending_retries[operation.id] = operation
+        self._flush_event.set()
+
+    def _prune_drained(self, now: int) -> None:
+        while self._drained and self._drained[0][0] <= now - self._drain_rate_window:
+            self._drained.popleft()
+
+    def _push(self, operation: Operation) -> None:
+        chain: Deque[Operation] | None = self._chains.get(operation.key)
+        if chain is None:
+            chain = self._chains[operation.key] = deque()
+
+        chain.append(operation)
+        self._size += 1
+        if len(chain) == 1:
+            self._schedule_head(operation.key)
+
+    def _schedule_head(self, key: str) -> None:
+        head: Operation = self._chains[key][0]
+        heapq.heappush(self._schedule, (head.next_attempt, next(self._sequence), key))
+        self._changed.set()
+
+    async def _flusher(self) -> None:
+        while True:
+            await self._flush_event.wait()
+            await asyncio.sleep(self._flush_interval)
+            self._flush_event.clear()
+            # Начатая запись на диск должна завершиться, даже если очередь закрывается.
+            await asyncio.shield(self._flush())
+
+    async def _flush(self) -> None:
+        async with self._flush_lock:
+            await self._write()
+
+    async def _write(self) -> None:
+        batch, self._pending = self._pending, []
+        acks, self._pending_acks = self._pending_acks, []
+        retries, self._pending_retries = self._pending_retries, {}
+        if not batch and not acks and not retries:
+            return
+
+        try:
+            for operation, _ in batch:
+                cursor = await self._db.execute(
+                    'INSERT INTO operations (name, key, args, attempts, next_attempt) VALUES (?, ?, ?, ?, ?)',
+                    (
+                        operation.name,
+                        operation.key,
+                        json.dumps(operation.args),
+                        operation.attempts,
+                        operation.next_attempt,
+                    ),
+                )
+                operation.id = cursor.lastrowid
+            await self._db.executemany(
+                'UPDATE operations SET attempts = ?, next_attempt = ? WHERE id = ?',
+                [(operation.attempts, operation.next_attempt, operation.id) for operation in retries.values()],
+            )
+            await self._db.executemany('DELETE FROM operations WHERE id = ?', [(operation_id,) for operation_id in acks])
+            await self._db.commit()
+        except Exception as exc:
+            logger.exception('Outbox flush failed:')
+            await self._db.rollback()
+            self._pending_acks.extend(acks)
+            # Отложенная за время записи попытка новее той, что не удалось записать.
+            for operation_id, operation in retries.items():
+                self._pending_retries.setdefault(operation_id, operation)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for operation, future in batch:
+            self._push(operation)
+            if not future.done():
+                future.set_result(None)
+
+        self._acks_since_compaction += len(acks)
+        if self._acks_since_compaction >= self._compact_threshold:
+            await self._compact()
+
+    async def _compact(self) -> None:
+        self._acks_since_compaction = 0
+        try:
+            # incremental_vacuum освобождает по странице на каждую строку результата, поэтому результат читается
+            # целиком. Незавершенный запрос блокирует таблицу, и сброс WAL-журнала не выполняется.
+            await self._db.execute_fetchall('PRAGMA incremental_vacuum')
+            await self._db.execute_fetchall('PRAGMA wal_checkpoint(TRUNCATE)')
+        except Exception:
+            # Операции уже зафиксированы, поэтому ошибка сжатия не должна останавливать запись в очередь.
+            logger.exception(f'Outbox {self._path} compaction failed:')
+            return
+        logger.debug(f'Outbox {self._path} is compacted')
@@ -1,36 +1,78 @@
 import logging
-from asyncio import Queue
-from typing import Callable, Tuple
+import random
+from typing import Any, Awaitable, Callable, Dict, List
 
 from pydantic import BaseModel
 
 from gateway_service import run_forever
+from gateway_service.apis.base_api import BaseSystemAPI
+from gateway_service.config import DEADLINE_CONFIG, QUEUE_CONFIG
+from gateway_service.deadline import deadline
 from gateway_service.exceptions import ServiceNotAvailableError, ServiceTemporaryNotAvailableError
+from gateway_service.outbox import Operation, Outbox
 
 logger = logging.getLogger(__name__)
 
-QUEUE = Queue()
+OUTBOX: Outbox = Outbox(
+    QUEUE_CONFIG.path,
+    flush_interval=QUEUE_CONFIG.flush_interval,
+    compact_threshold=QUEUE_CONFIG.compact_threshold,
+    capacity=QUEUE_CONFIG.capacity,
+    high_watermark=QUEUE_CONFIG.high_watermark,
+    low_watermark=QUEUE_CONFIG.low_watermark,
+    drain_rate_window=QUEUE_CONFIG.drain_rate_window,
+    max_retry_after=QUEUE_CONFIG.max_retry_after,
+)
 
 
-class Func(BaseModel):
-    name: Callable
-    args: Tuple
+class OperationHandler(BaseModel):
+    func: Callable[[Dict[str, Any]], Awaitable[Any]]
+    apis: List[BaseSystemAPI]
 
+    class Config:
+        arbitrary_types_allowed = True
 
-async def get_queue() -> Queue:
-    return QUEUE
+
+async def get_outbox() -> Outbox:
+    return OUTBOX
+
+
+def get_retry_delay(attempts: int) -> float:
+    """
+    Экспоненциальная задержка перед следующей попыткой со случайной составляющей (equal jitter).
+    """
+    delay = min(QUEUE_CONFIG.retry_max_delay, QUEUE_CONFIG.retry_base_delay * 2 ** attempts)
+    return delay / 2 + random.uniform(0, delay / 2)
 
 
 @run_forever()
-async def queue_processor(queue: Queue) -> None:
-    func: Func = await queue.get()
+async def queue_processor(outbox: Outbox, handlers: Dict[str, OperationHandler]) -> None:
+    operation: Operation = await outbox.get()
+    handler: OperationHandler | None = handlers.get(operation.name)
+    if handler is None:
+        # Операцию нечем выполнить, например после удаления ее обработчика. Она удаляется из очереди,
+        # иначе следующие операции того же пользователя никогда не будут выданы.
+        logger.error(f'Operation {operation} is dropped: unknown operation name')
+        await outbox.ack(operation)
+        return
+
+    retry_after: float = max(api.retry_after() for api in handler.apis)
+    if retry_after > 0:
+        logger.debug(f'Operation {operation.id} is postponed for {retry_after} seconds: circuit breaker is open')
+        await outbox.retry(operation, delay=retry_after)
+        return
 
-    logger.info(f'Gotten func={func}')
+    logger.info(f'Gotten operation={operation}')
 
     try:
-        await func.name(*func.args)
+        with deadline(DEADLINE_CONFIG.request_timeout):
+            await handler.func(operation.args)
     except (ServiceNotAvailableError, ServiceTemporaryNotAvailableError) as exc:
         logger.debug(f'Gotten exception again: {exc}')
-        await queue.put(func)
+        operation.attempts += 1
+        await outbox.retry(operation, delay=get_retry_delay(operation.attempts))
+        return
+    except Exception:
+        logger.exception(f'Operation {operation} is dropped:')
 
-    queue.task_done()
+    await outbox.ack(operation)
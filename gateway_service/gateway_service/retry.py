@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import random
+import time
+from asyncio import Task
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Set
+
+from httpx import Response, TransportError
+
+from gateway_service.config import RETRY_CONFIG, RetryConfig
+from gateway_service.deadline import get_remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """
+    Ограничивает долю повторных запросов: каждый запрос добавляет `ratio` токена, каждый повтор забирает один токен.
+    Поэтому при массовых ошибках повторов не больше `ratio` от числа запросов и сервис не добивается повторами.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float) -> None:
+        self._ratio: float = ratio
+        self._max_tokens: float = max_tokens
+        self._tokens: float = max_tokens
+        self._exhausted: int = 0
+
+    def deposit(self) -> None:
+        self._tokens = min(self._tokens + self._ratio, self._max_tokens)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            self._exhausted += 1
+            return False
+
+        self._tokens -= 1
+        return True
+
+    def stats(self) -> Dict:
+        return {'tokens': self._tokens, 'exhausted': self._exhausted}
+
+
+class LatencyTracker:
+    """
+    Время ответа последних `size` успешных запросов.
+    """
+
+    def __init__(self, size: int, min_samples: int) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._min_samples: int = min_samples
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def quantile(self, quantile: float) -> float | None:
+        if len(self._samples) < self._min_samples:
+            return None
+
+        samples = sorted(self._samples)
+        return samples[min(int(len(samples) * quantile), len(samples) - 1)]
+
+
+class RetryPolicy:
+    """
+    Повторяет идемпотентные запросы, завершившиеся ошибкой соединения или ответом 5xx, с экспоненциальной
+    задержкой со случайной составляющей (full jitter). Повтор выполняется, только если его разрешает бюджет повторов
+    и до истечения срока запроса остается больше времени, чем задержка.
+
+    Если включено хеджирование, то при отсутствии ответа дольше квантиля `hedge_quantile` времени ответа
+    отправляется второй такой же запрос, и используется первый успешный ответ.
+    """
+
+    def __init__(self, name: str, config: RetryConfig = RETRY_CONFIG) -> None:
+        self.name = name
+
+        self._max_attempts: int = config.max_attempts
+        self._base_delay: float = config.base_delay
+        self._max_delay: float = config.max_delay
+        self._hedge: bool = config.hedge
+        self._hedge_quantile: float = config.hedge_quantile
+        self._hedge_min_delay: float = config.hedge_min_delay
+
+        self._budget: RetryBudget = RetryBudget(config.budget_ratio, config.budget_max_tokens)
+        self._latency: LatencyTracker = LatencyTracker(config.latency_window, config.latency_min_samples)
+
+        self._calls: int = 0
+        self._retries: int = 0
+        self._hedged: int = 0
+
+    async def call(self, func: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Выполняет запрос с повторами. Возвращает первый успешный ответ или результат последней попытки:
+        ответ 5xx либо исключение.
+        """
+        self._calls += 1
+        self._budget.deposit()
+
+        attempt = 1
+        while True:
+            error: TransportError | None = None
+            try:
+                response: Response = await self._attempt(func)
+            except TransportError as exc:
+                logger.debug(f'{self.name}: attempt {attempt} failed: {exc.__class__.__name__} {exc}')
+                error = exc
+            else:
+                if not self._is_retryable(response):
+                    return response
+                logger.debug(f'{self.name}: attempt {attempt} got {response.status_code} response')
+
+            if not self._can_retry(attempt):
+                if error is not None:
+                    raise error
+                return response
+
+            await asyncio.sleep(self._get_delay(attempt))
+            attempt += 1
+            self._retries += 1
+
+    def stats(self) -> Dict:
+        return {
+            'calls': self._calls,
+            'retries': self._retries,
+            'hedged': self._hedged,
+            'budget': self._budget.stats(),
+            'hedge_delay': self._get_hedge_delay(),
+        }
+
+    def _can_retry(self, attempt: int) -> bool:
+        if attempt >= self._max_attempts:
+            return False
+
+        remaining_time: float | None = get_remaining_time()
+        if remaining_time is not None and remaining_time <= self._get_delay_cap(attempt):
+            return False
+
+        return self._budget.withdraw()
+
+    def _get_delay_cap(self, attempt: int) -> float:
+        return min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+
+    def _get_delay(self, attempt: int) -> float:
+        return random.uniform(0, self._get_delay_cap(attempt))
+
+    def _get_hedge_delay(self) -> float | None:
+        if not self._hedge:
+            return None
+
+        latency: float | None = self._latency.quantile(self._hedge_quantile)
+        if latency is None:
+            return None
+        return max(latency, self._hedge_min_delay)
+
+    async def _attempt(self, func: Callable[[], Awaitable[Response]]) -> Response:
+        hedge_delay: float | None = self._get_hedge_delay()
+        if hedge_delay is None:
+            return await self._timed(func)
+
+        tasks: Set[Task] = {asyncio.create_task(self._timed(func))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done or not self._budget.withdraw():
+                return await next(iter(tasks))
+
+            self._hedged += 1
+            tasks.add(asyncio.create_task(self._timed(func)))
+
+            pending: Set[Task] = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and not self._is_retryable(task.result()):
+                        return task.result()
+                if not pending:
+                    return task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _timed(self, func: Callable[[], Awaitable[Response]]) -> Response:
+        started_at = time.monotonic()
+        response: Response = await func()
+        if not self._is_retryable(response):
+            self._latency.add(time.monotonic() - started_at)
+        return response
+
+    @staticmethod
+    def _is_retryable(response: Response) -> bool:
+        return 500 <= response.status_code < 600
@@ -1,10 +1,11 @@
 import logging
-from asyncio import Queue
-from typing import List
-from uuid import UUID
+from typing import Any, Dict, List, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, Header, Response, status
+from fastapi.encoders import jsonable_encoder
 
+from gateway_service import apis
 from gateway_service.apis import (
     LibrarySystemAPI,
     RatingSystemAPI,
@@ -13,7 +14,12 @@ from gateway_service.apis import (
     get_rating_system_api,
     get_reservation_system_api,
 )
-from gateway_service.apis.library_system_api.schemas import BookModel, BooksPagination, Condition, LibrariesPagination
+from gateway_service.apis.library_system_api.schemas import (
+    BookModel,
+    BooksPagination,
+    Condition,
+    LibrariesPagination,
+)
 from gateway_service.apis.rating_system_api.schemas import UserRating
 from gateway_service.apis.reservation_system.schemas import (
     RentedBooks,
@@ -25,14 +31,22 @@ from gateway_service.apis.reservation_system.schemas import (
     ReturnBookInput,
     Status,
 )
+from gateway_service.cache import StaleStore, get_stale_responses
+from gateway_service.config import WORKFLOW_CONFIG
 from gateway_service.exceptions import ServiceNotAvailableError, ServiceTemporaryNotAvailableError
-from gateway_service.queue_processor import Func, get_queue
+from gateway_service.idempotency import IdempotencyStore, derive_idempotency_key, get_idempotency_store
+from gateway_service.outbox import Operation, Outbox
+from gateway_service.queue_processor import OperationHandler, get_outbox
 from gateway_service.validators import validate_page_size_params
+from gateway_service.workflow import Step, StepResults, Workflow
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+RESERVE_BOOK_OPERATION = 'reserve_book'
+RETURN_BOOK_OPERATION = 'return_book'
+
 
 @router.get(
     '/libraries',
@@ -41,14 +55,26 @@ router = APIRouter()
     summary='Получить список библиотек в городе',
 )
 async def get_libraries(
-    city: str, page: int = 0, size: int = 100, library_system_api: LibrarySystemAPI = Depends(get_library_system_api)
+    response: Response,
+    city: str,
+    page: int = 0,
+    size: int = 100,
+    cursor: str | None = None,
+    library_system_api: LibrarySystemAPI = Depends(get_library_system_api),
+    stale_responses: StaleStore = Depends(get_stale_responses),
 ) -> LibrariesPagination:
+    """
+    С параметром `cursor` библиотеки возвращаются после курсора из `nextCursor` предыдущей страницы без подсчета
+    общего числа, пустой `cursor` означает первую страницу.
+    """
     validate_page_size_params(page, size)
-    libraries: LibrariesPagination | None = await library_system_api.get_libraries(city, page, size)
+    libraries: LibrariesPagination | None = await library_system_api.get_libraries(city, page, size, cursor)
 
+    key = ('libraries', city, page, size, cursor)
     if libraries is None:
-        raise ServiceNotAvailableError
+        return _get_stale_response(response, stale_responses, key)
 
+    stale_responses.set(key, libraries)
     return libraries
 
 
@@ -59,21 +85,46 @@ async def get_libraries(
     summary='Получить список книг в выбранной библиотеке',
 )
 async def get_books(
+    response: Response,
     library_uid: UUID,
     page: int = 0,
     size: int = 100,
     show_all: bool = False,
+    cursor: str | None = None,
     library_system_api: LibrarySystemAPI = Depends(get_library_system_api),
+    stale_responses: StaleStore = Depends(get_stale_responses),
 ) -> BooksPagination:
+    """
+    С параметром `cursor` книги возвращаются после курсора из `nextCursor` предыдущей страницы без подсчета
+    общего числа, пустой `cursor` означает первую страницу.
+    """
     validate_page_size_params(page, size)
-    books: BooksPagination | None = await library_system_api.get_books(library_uid, page, size, show_all)
+    books: BooksPagination | None = await library_system_api.get_books(library_uid, page, size, show_all, cursor)
 
+    key = ('books', library_uid, page, size, show_all, cursor)
     if books is None:
-        raise ServiceNotAvailableError
+        return _get_stale_response(response, stale_responses, key)
 
+    stale_responses.set(key, books)
     return books
 
 
+def _get_stale_response(response: Response, stale_responses: StaleStore, key: Tuple[Any, ...]) -> Any:
+    """
+    Возвращает последний успешный ответ на такой же запрос, помечая его заголовками `Warning` и `Age`.
+    :raises ServiceNotAvailableError: Если подходящего ответа нет.
+    """
+    stale_response: Tuple[Any, float] | None = stale_responses.get(key)
+    if stale_response is None:
+        raise ServiceNotAvailableError
+
+    content, age = stale_response
+    logger.info(f'Serving stale response for {key}, age {age:.1f}s')
+    response.headers['Warning'] = '110 - "Response is Stale"'
+    response.headers['Age'] = str(int(age))
+    return content
+
+
 @router.get(
     '/reservations',
     status_code=status.HTTP_200_OK,
@@ -90,11 +141,16 @@ async def get_reservations(
     if reservations is None:
         raise ServiceNotAvailableError
 
+    libraries, books = await library_system_api.get_batch(
+        list({reservation.libraryUid for reservation in reservations}),
+        list({reservation.bookUid for reservation in reservations}),
+    )
+
     return [
         ReservationResponse(
-            **reservation.dict(exclude={'library_uid', 'book_uid'}),
-            book=(await library_system_api.get_book(reservation.libraryUid, reservation.bookUid)),
-            library=(await library_system_api.get_library(reservation.libraryUid)),
+            **reservation.dict(exclude={'bookUid', 'libraryUid'}),
+            book=books[reservation.bookUid],
+            library=libraries[reservation.libraryUid],
         )
         for reservation in reservations
     ]
@@ -102,42 +158,79 @@ async def get_reservations(
 
 async def _reserve_book(
     reservation_book_input: ReservationBookInput,
-    x_user_name: str = Header(),
-    reservation_system_api: ReservationSystemAPI = Depends(get_reservation_system_api),
-    rating_system_api: RatingSystemAPI = Depends(get_rating_system_api),
-    library_system_api: LibrarySystemAPI = Depends(get_library_system_api),
+    x_user_name: str,
+    reservation_system_api: ReservationSystemAPI,
+    rating_system_api: RatingSystemAPI,
+    library_system_api: LibrarySystemAPI,
+    idempotency_key: str,
 ) -> ReservationBookResponse:
-    rented_books: RentedBooks | None = await reservation_system_api.get_count_rented_books(x_user_name)
-    user_rating: UserRating | None = await rating_system_api.get_rating(x_user_name)
-
-    if rented_books is None or user_rating is None:
-        logger.info(f'RESERVING BOOK: raising ServiceNotAvailableError')
-        raise ServiceNotAvailableError
-
-    if rented_books.count >= user_rating.stars:
-        logger.info(f'RESERVING BOOK: raising PermissionError')
-        raise PermissionError
-
-    try:
-        reservation: ReservationModel = await reservation_system_api.reserve_book(x_user_name, reservation_book_input)
-    except ServiceNotAvailableError:
-        logger.info(f'RESERVING BOOK: raising ServiceTemporaryNotAvailableError 1 step')
-        raise ServiceTemporaryNotAvailableError
+    async def create_reservation(results: StepResults) -> ReservationModel:
+        rented_books: RentedBooks | None = results['rented_books']
+        user_rating: UserRating | None = results['user_rating']
+
+        if rented_books is None or user_rating is None:
+            logger.info(f'RESERVING BOOK: raising ServiceNotAvailableError')
+            raise ServiceNotAvailableError
+
+        if rented_books.count >= user_rating.stars:
+            logger.info(f'RESERVING BOOK: raising PermissionError')
+            raise PermissionError
+
+        try:
+            return await reservation_system_api.reserve_book(x_user_name, reservation_book_input, idempotency_key)
+        except ServiceNotAvailableError:
+            logger.info(f'RESERVING BOOK: raising ServiceTemporaryNotAvailableError 1 step')
+            raise ServiceTemporaryNotAvailableError
+
+    async def delete_reservation(results: StepResults) -> None:
+        await reservation_system_api.delete_reserve(x_user_name, results['reservation'].reservationUid)
+
+    async def reserve_library_book(results: StepResults) -> None:
+        reservation: ReservationModel = results['reservation']
+        try:
+            await library_system_api.reserve_book(reservation.libraryUid, reservation.bookUid, idempotency_key)
+        except ServiceNotAvailableError:
+            logger.info(f'RESERVING BOOK: raising ServiceTemporaryNotAvailableError 2 step')
+            raise ServiceTemporaryNotAvailableError
+
+    workflow = Workflow(
+        'reserve book',
+        [
+            Step(name='rented_books', func=lambda _: reservation_system_api.get_count_rented_books(x_user_name)),
+            Step(name='user_rating', func=lambda _: rating_system_api.get_rating(x_user_name)),
+            Step(
+                name='metadata',
+                func=lambda _: library_system_api.get_batch(
+                    [reservation_book_input.libraryUid], [reservation_book_input.bookUid]
+                ),
+            ),
+            Step(
+                name='reservation',
+                func=create_reservation,
+                depends_on=['rented_books', 'user_rating'],
+                compensate=delete_reservation,
+            ),
+            Step(name='library_book', func=reserve_library_book, depends_on=['reservation']),
+        ],
+        timeout=WORKFLOW_CONFIG.timeout,
+    )
 
     try:
-        await library_system_api.reserve_book(reservation.libraryUid, reservation.bookUid)
-    except ServiceNotAvailableError:
-        await reservation_system_api.delete_reserve(x_user_name, reservation.reservationUid)
-        logger.info(f'RESERVING BOOK: raising ServiceTemporaryNotAvailableError 2 step')
+        results: StepResults = await workflow.run()
+    except TimeoutError:
+        logger.info(f'RESERVING BOOK: raising ServiceTemporaryNotAvailableError on timeout')
         raise ServiceTemporaryNotAvailableError
 
     logger.info(f'RESERVING BOOK: all done')
 
+    reservation: ReservationModel = results['reservation']
+    libraries, books = results['metadata']
+
     return ReservationBookResponse(
         **reservation.dict(exclude={'bookUid', 'libraryUid'}),
-        book=(await library_system_api.get_book(reservation.libraryUid, reservation.bookUid)),
-        library=(await library_system_api.get_library(reservation.libraryUid)),
-        rating=user_rating,
+        book=books[reservation.bookUid],
+        library=libraries[reservation.libraryUid],
+        rating=results['user_rating'],
     )
 
 
@@ -150,76 +243,184 @@ async def _reserve_book(
 async def reserve_book_handler(
     reservation_book_input: ReservationBookInput,
     x_user_name: str = Header(),
+    idempotency_key: str | None = Header(default=None),
     reservation_system_api: ReservationSystemAPI = Depends(get_reservation_system_api),
     rating_system_api: RatingSystemAPI = Depends(get_rating_system_api),
     library_system_api: LibrarySystemAPI = Depends(get_library_system_api),
-    queue: Queue = Depends(get_queue),
+    outbox: Outbox = Depends(get_outbox),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store),
 ) -> ReservationBookResponse | Response:
-    func_name = _reserve_book
-    func_args = (
-        reservation_book_input, x_user_name, reservation_system_api, rating_system_api, library_system_api
-    )
-
-    logger.info(f'QUEUE SIZE RESERVING BOOK before: {queue.qsize()}')
+    # Без ключа от клиента ключ все равно нужен, чтобы повторы из очереди не дублировали записи в сервисах.
+    operation_key = derive_idempotency_key(idempotency_key or str(uuid4()), x_user_name, RESERVE_BOOK_OPERATION)
+    idempotent_result = idempotency_store.get(operation_key)
+    if idempotent_result is not None:
+        return idempotent_result.to_response()
+
+    logger.info(f'QUEUE SIZE RESERVING BOOK before: {outbox.qsize()}')
+    # Пока очередь отложенных операций перегружена, новые запросы отклоняются до обращения к сервисам.
+    outbox.admit()
     try:
-        reservation_response: ReservationBookResponse = await func_name(*func_args)
+        reservation_response: ReservationBookResponse = await _reserve_book(
+            reservation_book_input,
+            x_user_name,
+            reservation_system_api,
+            rating_system_api,
+            library_system_api,
+            operation_key,
+        )
     except ServiceTemporaryNotAvailableError:
         logger.info(f'RESERVING BOOK: catch ServiceTemporaryNotAvailableError')
-        await queue.put(Func(name=func_name, args=func_args))
-        logger.info(f'QUEUE SIZE RESERVING BOOK after: {queue.qsize()}')
+        operation_args = {
+            'reservation_book_input': jsonable_encoder(reservation_book_input),
+            'x_user_name': x_user_name,
+            'idempotency_key': operation_key,
+        }
+        await outbox.put(Operation(name=RESERVE_BOOK_OPERATION, key=x_user_name, args=operation_args))
+        logger.info(f'QUEUE SIZE RESERVING BOOK after: {outbox.qsize()}')
+        if idempotency_key is not None:
+            idempotency_store.set(operation_key, status.HTTP_204_NO_CONTENT)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-    logger.info(f'QUEUE SIZE RESERVING BOOK after: {queue.qsize()}')
+    logger.info(f'QUEUE SIZE RESERVING BOOK after: {outbox.qsize()}')
+    if idempotency_key is not None:
+        idempotency_store.set(operation_key, status.HTTP_200_OK, jsonable_encoder(reservation_response))
     return reservation_response
 
 
+class _ReturnBookSteps:
+    """
+    Шаги сценария возврата книги с общими для них параметрами запроса.
+    """
+
+    def __init__(
+        self,
+        reservation_uid: UUID,
+        return_book_input: ReturnBookInput,
+        x_user_name: str,
+        reservation_system_api: ReservationSystemAPI,
+        library_system_api: LibrarySystemAPI,
+        rating_system_api: RatingSystemAPI,
+        idempotency_key: str,
+    ) -> None:
+        self.reservation_uid = reservation_uid
+        self.return_book_input = return_book_input
+        self.x_user_name = x_user_name
+        self.reservation_system_api = reservation_system_api
+        self.library_system_api = library_system_api
+        self.rating_system_api = rating_system_api
+        self.idempotency_key = idempotency_key
+
+    async def get_reservation(self, _: StepResults) -> ReservationModel:
+        reservation: ReservationModel | None = await self.reservation_system_api.get_reservation(
+            self.x_user_name, self.reservation_uid
+        )
+        if reservation is None:
+            logger.info(f'RETURNING BOOK: raising ServiceNotAvailableError')
+            raise ServiceNotAvailableError
+        return reservation
+
+    async def get_book(self, results: StepResults) -> BookModel:
+        reservation: ReservationModel = results['reservation']
+        book: BookModel = await self.library_system_api.get_book(reservation.libraryUid, reservation.bookUid)
+        if book.condition == Condition.UNKNOWN:
+            logger.info(f'RETURNING BOOK: raising ServiceNotAvailableError')
+            raise ServiceNotAvailableError
+        return book
+
+    def get_change_stars(self, results: StepResults) -> int:
+        reservation: ReservationModel = results['reservation']
+        book: BookModel = results['book']
+
+        change_stars = 0
+        if book.condition != self.return_book_input.condition:
+            change_stars -= 10
+        if self.return_book_input.date > reservation.tillDate:
+            change_stars -= 10
+        return change_stars if change_stars else 1
+
+    async def return_library_book(self, results: StepResults) -> None:
+        reservation: ReservationModel = results['reservation']
+        try:
+            await self.library_system_api.return_book(reservation.libraryUid, reservation.bookUid, self.idempotency_key)
+        except ServiceNotAvailableError:
+            logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError on library return')
+            raise ServiceTemporaryNotAvailableError
+
+    async def revert_library_book(self, _: StepResults) -> None:
+        await self.library_system_api.revert_operation(self.idempotency_key)
+
+    async def update_reservation(self, results: StepResults) -> None:
+        reservation: ReservationModel = results['reservation']
+        return_status = Status.EXPIRED if self.return_book_input.date > reservation.tillDate else Status.RETURNED
+        try:
+            await self.reservation_system_api.return_book(
+                self.x_user_name, self.reservation_uid, ReservationUpdate(status=return_status)
+            )
+        except ServiceNotAvailableError:
+            logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError on reservation update')
+            raise ServiceTemporaryNotAvailableError
+
+    async def revert_reservation(self, _: StepResults) -> None:
+        await self.reservation_system_api.return_book(
+            self.x_user_name, self.reservation_uid, ReservationUpdate(status=Status.RENTED)
+        )
+
+    async def update_rating(self, results: StepResults) -> None:
+        try:
+            await self.rating_system_api.update_rating(self.x_user_name, self.get_change_stars(results))
+        except ServiceNotAvailableError:
+            logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError on rating update')
+            raise ServiceTemporaryNotAvailableError
+
+    def workflow(self) -> Workflow:
+        return Workflow(
+            'return book',
+            [
+                Step(name='reservation', func=self.get_reservation),
+                Step(name='book', func=self.get_book, depends_on=['reservation']),
+                Step(
+                    name='library_book',
+                    func=self.return_library_book,
+                    depends_on=['book'],
+                    compensate=self.revert_library_book,
+                ),
+                Step(
+                    name='reservation_update',
+                    func=self.update_reservation,
+                    depends_on=['book'],
+                    compensate=self.revert_reservation,
+                ),
+                # Рейтинг ограничен диапазоном [1, 100], поэтому его изменение нельзя точно откатить:
+                # оно выполняется последним, только после успешного возврата книги и обновления резервирования.
+                Step(name='rating', func=self.update_rating, depends_on=['library_book', 'reservation_update']),
+            ],
+            timeout=WORKFLOW_CONFIG.timeout,
+        )
+
+
 async def _return_book(
     reservation_uid: UUID,
     return_book_input: ReturnBookInput,
-    x_user_name: str = Header(),
-    reservation_system_api: ReservationSystemAPI = Depends(get_reservation_system_api),
-    library_system_api: LibrarySystemAPI = Depends(get_library_system_api),
-    rating_system_api: RatingSystemAPI = Depends(get_rating_system_api),
+    x_user_name: str,
+    reservation_system_api: ReservationSystemAPI,
+    library_system_api: LibrarySystemAPI,
+    rating_system_api: RatingSystemAPI,
+    idempotency_key: str,
 ) -> None:
-    reservation: ReservationModel | None = await reservation_system_api.get_reservation(x_user_name, reservation_uid)
-    book: BookModel = await library_system_api.get_book(reservation.libraryUid, reservation.bookUid)
-
-    if reservation is None or book.condition == Condition.UNKNOWN:
-        logger.info(f'RETURNING BOOK: raising ServiceNotAvailableError')
-        raise ServiceNotAvailableError
-
-    change_stars = 0
-    if book.condition != return_book_input.condition:
-        change_stars -= 10
-
-    if return_book_input.date > reservation.tillDate:
-        return_status = Status.EXPIRED
-        change_stars -= 10
-    else:
-        return_status = Status.RETURNED
-    reservation_update = ReservationUpdate(status=return_status)
-    change_stars = change_stars if change_stars else 1
-
-    try:
-        await library_system_api.return_book(reservation.libraryUid, reservation.bookUid)
-    except ServiceNotAvailableError:
-        logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError 1 step')
-        raise ServiceTemporaryNotAvailableError
-
-    try:
-        await reservation_system_api.return_book(x_user_name, reservation_uid, reservation_update)
-    except ServiceNotAvailableError:
-        await library_system_api.reserve_book(reservation.libraryUid, reservation.bookUid)
-        logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError 2 step')
-        raise ServiceTemporaryNotAvailableError
+    steps = _ReturnBookSteps(
+        reservation_uid,
+        return_book_input,
+        x_user_name,
+        reservation_system_api,
+        library_system_api,
+        rating_system_api,
+        idempotency_key,
+    )
 
     try:
-        await rating_system_api.update_rating(x_user_name, change_stars)
-    except ServiceNotAvailableError:
-        undo_reservation_update = ReservationUpdate(status=Status.RENTED)
-        await reservation_system_api.return_book(x_user_name, reservation_uid, undo_reservation_update)
-        await library_system_api.reserve_book(reservation.libraryUid, reservation.bookUid)
-        logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError 3 step')
+        await steps.workflow().run()
+    except TimeoutError:
+        logger.info(f'RETURNING BOOK: raising ServiceTemporaryNotAvailableError on timeout')
         raise ServiceTemporaryNotAvailableError
 
     logger.info(f'RETURNING BOOK: all done')
@@ -230,24 +431,43 @@ async def return_book_handler(
     reservation_uid: UUID,
     return_book_input: ReturnBookInput,
     x_user_name: str = Header(),
+    idempotency_key: str | None = Header(default=None),
     reservation_system_api: ReservationSystemAPI = Depends(get_reservation_system_api),
     library_system_api: LibrarySystemAPI = Depends(get_library_system_api),
     rating_system_api: RatingSystemAPI = Depends(get_rating_system_api),
-    queue: Queue = Depends(get_queue),
-) -> None:
-    func_name = _return_book
-    func_args = (
-        reservation_uid, return_book_input, x_user_name, reservation_system_api, library_system_api, rating_system_api
-    )
-
-    logger.info(f'QUEUE SIZE RETURNING BOOK before: {queue.qsize()}')
+    outbox: Outbox = Depends(get_outbox),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store),
+) -> Response | None:
+    operation_key = derive_idempotency_key(idempotency_key or str(uuid4()), x_user_name, RETURN_BOOK_OPERATION)
+    idempotent_result = idempotency_store.get(operation_key)
+    if idempotent_result is not None:
+        return idempotent_result.to_response()
+
+    logger.info(f'QUEUE SIZE RETURNING BOOK before: {outbox.qsize()}')
+    outbox.admit()
     try:
-        await func_name(*func_args)
+        await _return_book(
+            reservation_uid,
+            return_book_input,
+            x_user_name,
+            reservation_system_api,
+            library_system_api,
+            rating_system_api,
+            operation_key,
+        )
     except ServiceTemporaryNotAvailableError:
         logger.info(f'RETURNING BOOK: catch ServiceTemporaryNotAvailableError')
-        await queue.put(Func(name=func_name, args=func_args))
-
-    logger.info(f'QUEUE SIZE RETURNING BOOK after: {queue.qsize()}')
+        operation_args = {
+            'reservation_uid': jsonable_encoder(reservation_uid),
+            'return_book_input': jsonable_encoder(return_book_input),
+            'x_user_name': x_user_name,
+            'idempotency_key': operation_key,
+        }
+        await outbox.put(Operation(name=RETURN_BOOK_OPERATION, key=x_user_name, args=operation_args))
+
+    logger.info(f'QUEUE SIZE RETURNING BOOK after: {outbox.qsize()}')
+    if idempotency_key is not None:
+        idempotency_store.set(operation_key, status.HTTP_204_NO_CONTENT)
     return None
 
 
@@ -261,3 +481,46 @@ async def get_rating(
         raise ServiceNotAvailableError
 
     return user_rating
+
+
+async def _replay_reserve_book(args: Dict[str, Any]) -> None:
+    await _reserve_book(
+        ReservationBookInput(**args['reservation_book_input']),
+        args['x_user_name'],
+        await get_reservation_system_api(),
+        await get_rating_system_api(),
+        await get_library_system_api(),
+        _get_replay_idempotency_key(args, RESERVE_BOOK_OPERATION),
+    )
+
+
+async def _replay_return_book(args: Dict[str, Any]) -> None:
+    await _return_book(
+        UUID(args['reservation_uid']),
+        ReturnBookInput(**args['return_book_input']),
+        args['x_user_name'],
+        await get_reservation_system_api(),
+        await get_library_system_api(),
+        await get_rating_system_api(),
+        _get_replay_idempotency_key(args, RETURN_BOOK_OPERATION),
+    )
+
+
+def _get_replay_idempotency_key(args: Dict[str, Any], operation: str) -> str:
+    # Операции, сохраненные до появления ключей идемпотентности, получают новый ключ.
+    idempotency_key: str | None = args.get('idempotency_key')
+    if idempotency_key is None:
+        idempotency_key = derive_idempotency_key(str(uuid4()), args['x_user_name'], operation)
+    return idempotency_key
+
+
+OPERATION_HANDLERS: Dict[str, OperationHandler] = {
+    RESERVE_BOOK_OPERATION: OperationHandler(
+        func=_replay_reserve_book,
+        apis=[apis.reservation_system_api, apis.rating_system_api, apis.library_system_api],
+    ),
+    RETURN_BOOK_OPERATION: OperationHandler(
+        func=_replay_return_book,
+        apis=[apis.reservation_system_api, apis.library_system_api, apis.rating_system_api],
+    ),
+}
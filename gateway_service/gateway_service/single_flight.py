@@ -0,0 +1,75 @@
+import asyncio
+import copy
+import logging
+from asyncio import Task
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+ResultType = TypeVar('ResultType')
+
+
+class _Call:
+    def __init__(self, task: Task) -> None:
+        self.task: Task = task
+        self.waiters: int = 0
+
+
+class SingleFlight(Generic[ResultType]):
+    """
+    Объединяет одновременные одинаковые вызовы: пока вызов с ключом `key` выполняется, остальные вызовы с тем же
+    ключом дожидаются его результата, а не выполняются повторно.
+
+    Отмена одного из ожидающих не отменяет общий вызов, пока его ждет кто-то еще. Каждый ожидающий получает
+    собственную копию исключения, чтобы трассировки разных ожидающих не смешивались.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+        self._calls: Dict[Hashable, _Call] = {}
+
+        self._executed: int = 0
+        self._coalesced: int = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[ResultType]]) -> ResultType:
+        call: _Call | None = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(func(), name=f'{self.name} {key}'))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self._calls[key] = call
+            self._executed += 1
+        else:
+            self._coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except Exception as exc:
+            raise self._copy_exception(exc) from None
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Отменяемый вызов сразу убирается, чтобы новый вызов с тем же ключом не присоединился к нему.
+                self._forget(key, call)
+                call.task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._calls),
+            'executed': self._executed,
+            'coalesced': self._coalesced,
+        }
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    @staticmethod
+    def _copy_exception(exc: Exception) -> Exception:
+        try:
+            exc_copy: Exception = copy.copy(exc)
+        except Exception:
+            logger.debug(f'Exception {exc!r} can not be copied')
+            return exc
+        return exc_copy.with_traceback(exc.__traceback__)
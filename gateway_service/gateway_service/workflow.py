@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from asyncio import Task
+from typing import Any, Awaitable, Callable, Dict, List
+
+from pydantic import BaseModel
+
+from gateway_service.deadline import deadline, get_remaining_time
+
+logger = logging.getLogger(__name__)
+
+StepResults = Dict[str, Any]
+
+
+class Step(BaseModel):
+    """
+    Шаг сценария. `func` и `compensate` получают результаты уже выполненных шагов по их именам.
+    """
+
+    name: str
+    func: Callable[[StepResults], Awaitable[Any]]
+    depends_on: List[str] = []
+    compensate: Callable[[StepResults], Awaitable[Any]] | None = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class Workflow:
+    """
+    Сценарий из шагов, связанных зависимостями. Шаг запускается, как только выполнены все шаги, от которых он зависит,
+    поэтому независимые шаги выполняются параллельно. Весь сценарий ограничен общим сроком `timeout` секунд,
+    но не дольше срока самого запроса.
+
+    Если шаг завершился ошибкой или истек срок, незавершенные шаги отменяются, для выполненных шагов вызываются
+    компенсации в порядке, обратном порядку их завершения, а исходная ошибка пробрасывается дальше.
+    """
+
+    def __init__(self, name: str, steps: List[Step], timeout: float) -> None:
+        self.name = name
+        self._steps: Dict[str, Step] = {step.name: step for step in steps}
+        self._timeout: float = timeout
+
+        for step in steps:
+            unknown = set(step.depends_on) - self._steps.keys()
+            if unknown:
+                raise ValueError(f'Step {step.name} of workflow {name} depends on unknown steps {unknown}')
+
+    async def run(self) -> StepResults:
+        results: StepResults = {}
+        completed: List[Step] = []
+        pending: Dict[str, Step] = dict(self._steps)
+        running: Dict[Task, Step] = {}
+
+        try:
+            with deadline(self._timeout):
+                async with asyncio.timeout(get_remaining_time()):
+                    await self._run(pending, running, results, completed)
+
+        except BaseException as exc:
+            logger.info(f'Workflow {self.name} failed: {exc.__class__.__name__} {exc}')
+            completed.extend(await self._cancel(running, results))
+            # Компенсации должны выполниться, даже если отменен сам запрос или истек его срок.
+            with deadline(self._timeout, detach=True):
+                await asyncio.shield(self._compensate(completed, results))
+            raise
+
+        return results
+
+    async def _run(
+        self, pending: Dict[str, Step], running: Dict[Task, Step], results: StepResults, completed: List[Step]
+    ) -> None:
+        while pending or running:
+            for step in [step for step in pending.values() if all(name in results for name in step.depends_on)]:
+                del pending[step.name]
+                running[asyncio.create_task(step.func(results), name=f'{self.name} {step.name}')] = step
+
+            if not running:
+                raise ValueError(f'Workflow {self.name} has cyclic dependencies: {list(pending)}')
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = running.pop(task)
+                results[step.name] = task.result()
+                completed.append(step)
+
+    async def _cancel(self, running: Dict[Task, Step], results: StepResults) -> List[Step]:
+        """
+        Отменяет выполняющиеся шаги и возвращает те из них, которые успели завершиться успешно.
+        """
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+        completed: List[Step] = []
+        for task, step in running.items():
+            if not task.cancelled() and task.exception() is None:
+                results[step.name] = task.result()
+                completed.append(step)
+        return completed
+
+    async def _compensate(self, completed: List[Step], results: StepResults) -> None:
+        for step in reversed(completed):
+            if step.compensate is None:
+                continue
+
+            try:
+                await step.compensate(results)
+            except Exception as exc:
+                # Повтор операции из очереди идемпотентен, поэтому неудачная компенсация не прерывает остальные.
+                logger.warning(f'Workflow {self.name}: compensation of step {step.name} failed: {exc!r}')
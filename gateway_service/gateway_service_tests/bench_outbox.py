@@ -0,0 +1,118 @@
+"""
+Пропускная способность очереди отложенных операций: запись операций одновременными производителями, каждый из
+которых ждет фиксации операции на диске, и разбор очереди после перезапуска вплоть до фиксации подтверждений.
+
+Запуск из каталога с пакетами сервиса и тестов:
+    python -m gateway_service_tests.bench_outbox --operations 5000 --producers 1 10 100 --workers 1 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from gateway_service import cancel_and_stop_task
+from gateway_service.config import QUEUE_CONFIG
+from gateway_service.outbox import Operation, Outbox
+
+USERS = 100
+
+
+def make_outbox(path: str, operations: int, flush_interval: float) -> Outbox:
+    return Outbox(
+        path,
+        flush_interval=flush_interval,
+        compact_threshold=QUEUE_CONFIG.compact_threshold,
+        capacity=operations,
+        high_watermark=operations,
+        low_watermark=operations,
+        drain_rate_window=QUEUE_CONFIG.drain_rate_window,
+        max_retry_after=QUEUE_CONFIG.max_retry_after,
+    )
+
+
+async def enqueue(outbox: Outbox, operations: int, producers: int) -> str:
+    numbers = iter(range(operations))
+    latencies: List[float] = []
+
+    async def producer() -> None:
+        for number in numbers:
+            # Операции сотни пользователей, чтобы обработчики не ждали друг друга в одной цепочке.
+            operation = Operation(name='reserve_book', key=f'user-{number % USERS}', args={'number': number})
+            started: float = time.perf_counter()
+            await outbox.put(operation)
+            latencies.append(time.perf_counter() - started)
+
+    started: float = time.perf_counter()
+    await asyncio.gather(*(producer() for _ in range(producers)))
+    elapsed: float = time.perf_counter() - started
+
+    percentiles: List[float] = statistics.quantiles(latencies, n=100, method='inclusive')
+    return (
+        f'{operations / elapsed:8.0f} put/s, put p50 {percentiles[49] * 1000:6.2f} ms, '
+        f'p99 {percentiles[98] * 1000:6.2f} ms'
+    )
+
+
+async def dequeue(outbox: Outbox, operations: int, workers: int) -> str:
+    remaining: int = operations
+    drained = asyncio.Event()
+
+    async def worker() -> None:
+        nonlocal remaining
+        while True:
+            operation: Operation = await outbox.get()
+            await outbox.ack(operation)
+            remaining -= 1
+            if not remaining:
+                drained.set()
+
+    started: float = time.perf_counter()
+    tasks: List[asyncio.Task] = [asyncio.create_task(worker()) for _ in range(workers)]
+    await drained.wait()
+    for task in tasks:
+        await cancel_and_stop_task(task)
+    # Подтверждения фиксируются на диске при закрытии очереди.
+    await outbox.close()
+    elapsed: float = time.perf_counter() - started
+
+    return f'{operations / elapsed:8.0f} get+ack/s'
+
+
+async def run(operations: int, producers: int, workers: int, flush_interval: float) -> str:
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, 'queue.sqlite3')
+
+        outbox: Outbox = make_outbox(path, operations, flush_interval)
+        await outbox.open()
+        enqueue_result: str = await enqueue(outbox, operations, producers)
+        await outbox.close()
+
+        # Разбор после перезапуска: операции читаются из файла.
+        outbox = make_outbox(path, operations, flush_interval)
+        started: float = time.perf_counter()
+        await outbox.open()
+        replay_time: float = time.perf_counter() - started
+        dequeue_result: str = await dequeue(outbox, operations, workers)
+
+    return f'{enqueue_result}; replay {replay_time * 1000:6.1f} ms; {dequeue_result}'
+
+
+async def main(operations: int, producers_counts: List[int], workers_counts: List[int], flush_interval: float) -> None:
+    for producers in producers_counts:
+        for workers in workers_counts:
+            result: str = await run(operations, producers, workers, flush_interval)
+            print(f'{operations} operations, {producers:3} producers, {workers:2} workers: {result}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operations', type=int, default=5000)
+    parser.add_argument('--producers', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, QUEUE_CONFIG.workers])
+    parser.add_argument('--flush-interval', type=float, default=QUEUE_CONFIG.flush_interval)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.operations, args.producers, args.workers, args.flush_interval))
@@ -0,0 +1,193 @@
+"""
+Задержка GET /api/v1/reservations Gateway при обращении к заглушкам сервисов по TCP.
+Сравниваются общий клиент с пулом keep-alive соединений, общий клиент без keep-alive, который открывает новое
+соединение для каждого обращения к сервису, и новый клиент на каждое обращение, как было до общего клиента.
+
+Запуск из каталога с пакетами сервиса и тестов:
+    python -m gateway_service_tests.bench_reservations --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+from datetime import date
+from multiprocessing import Process
+from typing import Any, Dict, List, Tuple
+from uuid import UUID, uuid4
+
+import uvicorn
+from httpx import AsyncClient, Request, Response
+from starlette.applications import Starlette
+from starlette.requests import Request as StubRequest
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from gateway_service.apis import get_library_system_api, get_reservation_system_api
+from gateway_service.apis.library_system_api.api import LibrarySystemAPI
+from gateway_service.apis.reservation_system.api import ReservationSystemAPI
+from gateway_service.config import LibraryConfig, ReservationConfig
+from gateway_service.main import app
+
+LIBRARY_UIDS: List[UUID] = [uuid4() for _ in range(3)]
+BOOK_UIDS: List[UUID] = [uuid4() for _ in range(10)]
+RESERVATIONS_PER_USER = 5
+
+
+async def get_reservations(_: StubRequest) -> JSONResponse:
+    return JSONResponse(
+        [
+            {
+                'reservationUid': str(uuid4()),
+                'status': 'RENTED',
+                'startDate': date(2026, 10, 1).isoformat(),
+                'tillDate': date(2026, 11, 1).isoformat(),
+                'bookUid': str(BOOK_UIDS[i]),
+                'libraryUid': str(LIBRARY_UIDS[i % len(LIBRARY_UIDS)]),
+            }
+            for i in range(RESERVATIONS_PER_USER)
+        ]
+    )
+
+
+async def get_batch(request: StubRequest) -> JSONResponse:
+    body: Dict = await request.json()
+    return JSONResponse(
+        {
+            'libraries': [
+                {'libraryUid': uid, 'name': 'Библиотека', 'city': 'Москва', 'address': 'ул. Льва Толстого, д.1'}
+                for uid in body['libraryUids']
+            ],
+            'books': [
+                {'bookUid': uid, 'name': 'Книга', 'author': 'Автор', 'genre': 'Жанр', 'condition': 'EXCELLENT'}
+                for uid in body['bookUids']
+            ],
+        }
+    )
+
+
+reservation_system_stub = Starlette(routes=[Route('/reservations', get_reservations)])
+library_system_stub = Starlette(routes=[Route('/libraries/batch', get_batch, methods=['POST'])])
+
+
+class ClientPerCall:
+    """
+    Клиент, который, как прежние API, создает новый AsyncClient и новое соединение на каждый запрос.
+    """
+
+    def __init__(self, client: AsyncClient) -> None:
+        self._client: AsyncClient = client
+
+    def build_request(self, *args: Any, **kwargs: Any) -> Request:
+        return self._client.build_request(*args, **kwargs)
+
+    async def send(self, request: Request, **kwargs: Any) -> Response:
+        async with AsyncClient() as client:
+            return await client.send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def serve(stub: Starlette) -> Tuple[Process, int]:
+    """
+    Запускает заглушку сервиса на свободном порту в отдельном процессе, чтобы она не делила цикл событий с Gateway.
+    """
+    # С протоколом IPPROTO_TCP asyncio включает TCP_NODELAY на принятых соединениях, как у сервиса,
+    # запущенного uvicorn на хосте и порту. Без него ответы на keep-alive соединениях ждут задержанного ACK.
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(stub, log_level='warning', access_log=False))
+    process = Process(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    process.start()
+    return process, sock.getsockname()[1]
+
+
+async def wait_started(port: int) -> None:
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        await writer.wait_closed()
+        return
+
+
+async def run(
+    reservation_port: int,
+    library_port: int,
+    keepalive_connections: int,
+    client_per_call: bool,
+    requests: int,
+    concurrency: int,
+) -> str:
+    reservation_system_api = ReservationSystemAPI(
+        ReservationConfig(host='127.0.0.1', port=reservation_port, max_keepalive_connections=keepalive_connections)
+    )
+    library_system_api = LibrarySystemAPI(
+        LibraryConfig(host='127.0.0.1', port=library_port, max_keepalive_connections=keepalive_connections)
+    )
+    app.dependency_overrides[get_reservation_system_api] = lambda: reservation_system_api
+    app.dependency_overrides[get_library_system_api] = lambda: library_system_api
+    for api in (reservation_system_api, library_system_api):
+        await api.startup()
+        if client_per_call:
+            api._client = ClientPerCall(api.client)
+
+    usernames = iter(range(requests))
+    latencies: List[float] = []
+
+    async def worker(client: AsyncClient) -> None:
+        # Разные пользователи, чтобы одновременные запросы не объединялись в один.
+        for number in usernames:
+            started: float = time.perf_counter()
+            response = await client.get('/api/v1/reservations', headers={'X-User-Name': f'user-{number}'})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+            assert len(response.json()) == RESERVATIONS_PER_USER
+
+    try:
+        async with AsyncClient(app=app, base_url='http://gateway') as client:
+            started: float = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed: float = time.perf_counter() - started
+    finally:
+        await reservation_system_api.shutdown()
+        await library_system_api.shutdown()
+        app.dependency_overrides.clear()
+
+    percentiles: List[float] = statistics.quantiles(latencies, n=100, method='inclusive')
+    return (
+        f'{requests / elapsed:6.0f} requests/s, p50 {percentiles[49] * 1000:6.2f} ms, '
+        f'p99 {percentiles[98] * 1000:6.2f} ms'
+    )
+
+
+async def main(reservation_port: int, library_port: int, requests: int, concurrency: int, rounds: int) -> None:
+    await wait_started(reservation_port)
+    await wait_started(library_port)
+
+    modes = [('keep-alive pool', 20, False), ('new connection per call', 0, False), ('new client per call', 0, True)]
+    for name, keepalive_connections, client_per_call in modes:
+        for _ in range(rounds):
+            result: str = await run(
+                reservation_port, library_port, keepalive_connections, client_per_call, requests, concurrency
+            )
+            print(f'{name:24}: {result}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    stubs: List[Tuple[Process, int]] = [serve(reservation_system_stub), serve(library_system_stub)]
+    try:
+        asyncio.run(main(stubs[0][1], stubs[1][1], args.requests, args.concurrency, args.rounds))
+    finally:
+        for process, _ in stubs:
+            process.terminate()
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from httpx import ConnectError, Request, Response
+
+from gateway_service.circuit_breaker import CircuitBreaker, CircuitBreakerStatus
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+async def ok() -> Response:
+    return Response(200)
+
+
+async def server_error() -> Response:
+    return Response(503)
+
+
+async def connect_error() -> Response:
+    raise ConnectError('refused', request=Request('GET', 'http://test'))
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        'test',
+        failure_threshold=2,
+        failure_rate_threshold=0.5,
+        success_threshold=2,
+        half_open_max_calls=1,
+        window=10,
+        timeout=15,
+        clock=clock,
+    )
+
+
+async def open_breaker(breaker: CircuitBreaker) -> None:
+    await breaker.request(server_error)
+    await breaker.request(connect_error)
+    assert breaker.status == CircuitBreakerStatus.OPEN
+
+
+@pytest.mark.asyncio
+async def test_full_cycle(breaker: CircuitBreaker, clock: FakeClock):
+    assert breaker.status == CircuitBreakerStatus.CLOSED
+
+    await open_breaker(breaker)
+    assert breaker.opened_at == clock.now
+
+    clock.advance(15)
+    assert breaker.status == CircuitBreakerStatus.HALF_OPEN
+
+    assert (await breaker.request(ok)).status_code == 200
+    assert breaker.status == CircuitBreakerStatus.HALF_OPEN
+
+    assert (await breaker.request(ok)).status_code == 200
+    assert breaker.status == CircuitBreakerStatus.CLOSED
+    assert breaker.opened_at is None
+
+
+@pytest.mark.asyncio
+async def test_failure_rate_below_threshold_keeps_closed(breaker: CircuitBreaker):
+    for _ in range(3):
+        await breaker.request(ok)
+    await breaker.request(server_error)
+    await breaker.request(server_error)
+
+    assert breaker.status == CircuitBreakerStatus.CLOSED
+    assert breaker.stats()['window_failures'] == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_expire_with_window_buckets(breaker: CircuitBreaker, clock: FakeClock):
+    await breaker.request(server_error)
+    clock.advance(9)
+    assert breaker.stats()['window_failures'] == 1
+
+    clock.advance(1)
+    assert breaker.stats()['window_failures'] == 0
+
+    await breaker.request(server_error)
+    assert breaker.status == CircuitBreakerStatus.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_open_rejects_until_cooldown(breaker: CircuitBreaker, clock: FakeClock):
+    await open_breaker(breaker)
+    called: bool = False
+
+    async def func() -> Response:
+        nonlocal called
+        called = True
+        return Response(200)
+
+    clock.advance(14.5)
+    assert await breaker.request(func) is None
+    assert not called
+    assert breaker.retry_after() == pytest.approx(0.5)
+
+    clock.advance(0.5)
+    assert breaker.retry_after() == 0.0
+    assert await breaker.request(func) is not None
+    assert called
+
+
+@pytest.mark.asyncio
+async def test_half_open_limits_probes(breaker: CircuitBreaker, clock: FakeClock):
+    await open_breaker(breaker)
+    clock.advance(15)
+
+    release = asyncio.Event()
+
+    async def slow_ok() -> Response:
+        await release.wait()
+        return Response(200)
+
+    probe = asyncio.create_task(breaker.request(slow_ok))
+    await asyncio.sleep(0)
+    assert breaker.stats()['half_open_calls'] == 1
+
+    assert await breaker.request(ok) is None
+
+    release.set()
+    assert (await probe).status_code == 200
+    assert breaker.stats()['half_open_calls'] == 0
+    assert breaker.status == CircuitBreakerStatus.HALF_OPEN
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens(breaker: CircuitBreaker, clock: FakeClock):
+    await open_breaker(breaker)
+    clock.advance(15)
+    assert breaker.status == CircuitBreakerStatus.HALF_OPEN
+
+    assert await breaker.request(server_error) is None
+    assert breaker.status == CircuitBreakerStatus.OPEN
+    assert breaker.opened_at == clock.now
+    assert breaker.retry_after() == 15
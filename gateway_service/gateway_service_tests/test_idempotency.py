@@ -0,0 +1,40 @@
+from gateway_service.idempotency import IdempotencyStore
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_result_expires_after_ttl():
+    clock = FakeClock()
+    store = IdempotencyStore(ttl=10, max_size=10, clock=clock)
+
+    store.set('key', 200, {'reservationUid': 'uid'})
+    clock.advance(9)
+    result = store.get('key')
+    assert result is not None
+    assert (result.status_code, result.content) == (200, {'reservationUid': 'uid'})
+
+    clock.advance(1)
+    assert store.get('key') is None
+
+
+def test_least_recently_used_result_is_evicted():
+    store = IdempotencyStore(ttl=10, max_size=2, clock=FakeClock())
+
+    store.set('first', 204)
+    store.set('second', 204)
+    store.get('first')
+    store.set('third', 204)
+
+    assert store.get('second') is None
+    assert store.get('first') is not None
+    assert store.get('third') is not None
+    assert store.stats()['evictions'] == 1
@@ -0,0 +1,95 @@
+import asyncio
+import os
+from typing import Any, Dict, List
+
+import pytest
+
+from gateway_service.outbox import Operation, Outbox
+from gateway_service.queue_processor import OperationHandler, queue_processor
+
+
+def make_outbox(path: str, compact_threshold: int = 1000) -> Outbox:
+    return Outbox(
+        path,
+        flush_interval=0,
+        compact_threshold=compact_threshold,
+        capacity=1000,
+        high_watermark=1000,
+        low_watermark=500,
+        drain_rate_window=60,
+        max_retry_after=60,
+    )
+
+
+async def put_operations(outbox: Outbox, count: int, payload: str = '') -> None:
+    for number in range(count):
+        operation = Operation(name='reserve_book', key=f'user-{number}', args={'number': number, 'payload': payload})
+        await outbox.put(operation)
+
+
+@pytest.mark.asyncio
+async def test_operations_are_replayed_after_restart(tmp_path):
+    path = os.path.join(tmp_path, 'queue.sqlite3')
+    outbox = make_outbox(path)
+    await outbox.open()
+    await put_operations(outbox, 3)
+    await outbox.ack(await outbox.get())
+    await outbox.close()
+
+    outbox = make_outbox(path)
+    await outbox.open()
+    numbers: List[int] = [(await outbox.get()).args['number'] for _ in range(2)]
+    await outbox.close()
+
+    assert sorted(numbers) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_compaction_after_acks(tmp_path):
+    path = os.path.join(tmp_path, 'queue.sqlite3')
+    outbox = make_outbox(path, compact_threshold=100)
+    await outbox.open()
+
+    for _ in range(3):
+        # Удаленные операции освобождают страницы, которые сжатие возвращает файловой системе.
+        await put_operations(outbox, 200, payload='x' * 1000)
+        for _ in range(200):
+            await outbox.ack(await outbox.get())
+        await outbox._flush()
+        assert os.path.getsize(f'{path}-wal') == 0
+
+    await put_operations(outbox, 1)
+    await outbox.close()
+
+    outbox = make_outbox(path)
+    await outbox.open()
+    assert outbox.qsize() == 1
+    await outbox.close()
+
+
+class AvailableAPI:
+    def retry_after(self) -> float:
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_operation_does_not_stall_user_operations(tmp_path):
+    outbox = make_outbox(os.path.join(tmp_path, 'queue.sqlite3'))
+    await outbox.open()
+    await outbox.put(Operation(name='removed_operation', key='user', args={}))
+    await outbox.put(Operation(name='reserve_book', key='user', args={'number': 1}))
+
+    replayed: List[Dict[str, Any]] = []
+
+    async def replay(args: Dict[str, Any]) -> None:
+        replayed.append(args)
+
+    handlers = {'reserve_book': OperationHandler.construct(func=replay, apis=[AvailableAPI()])}
+    try:
+        for _ in range(2):
+            await asyncio.wait_for(queue_processor.__wrapped__(outbox, handlers), timeout=5)
+    finally:
+        await outbox.close()
+
+    assert replayed == [{'number': 1}]
+    assert outbox.qsize() == 0
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from gateway_service.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    single_flight: SingleFlight[int] = SingleFlight('test')
+    calls: int = 0
+
+    async def func() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(single_flight.do('key', func) for _ in range(5)))
+
+    assert results == [42] * 5
+    assert calls == 1
+    assert single_flight.stats() == {'in_flight': 0, 'executed': 1, 'coalesced': 4}
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancellation_does_not_cancel_shared_call():
+    single_flight: SingleFlight[int] = SingleFlight('test')
+
+    async def func() -> int:
+        await asyncio.sleep(0.01)
+        return 42
+
+    first = asyncio.create_task(single_flight.do('key', func))
+    second = asyncio.create_task(single_flight.do('key', func))
+    await asyncio.sleep(0)
+
+    first.cancel()
+
+    assert await second == 42
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_call_joined_after_last_waiter_left_is_not_cancelled():
+    single_flight: SingleFlight[int] = SingleFlight('test')
+    calls: int = 0
+
+    async def func() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    leaving = asyncio.create_task(single_flight.do('key', func))
+    await asyncio.sleep(0)
+
+    # Последний ожидающий уходит, и общий вызов отменяется; done-callback отмененной задачи еще не выполнился.
+    leaving.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
+
+    assert await single_flight.do('key', func) == 2
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_each_waiter_gets_own_exception():
+    single_flight: SingleFlight[int] = SingleFlight('test')
+
+    async def func() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    results = await asyncio.gather(*(single_flight.do('key', func) for _ in range(2)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert results[0] is not results[1]
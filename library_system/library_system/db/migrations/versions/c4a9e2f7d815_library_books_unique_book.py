@@ -0,0 +1,61 @@
+"""Library books unique book
+
+Revision ID: c4a9e2f7d815
+Revises: 7b2e4d91c3a8
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e2f7d815'
+down_revision = '7b2e4d91c3a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Повторяющиеся записи книги в библиотеке объединяются в запись с наименьшим id, иначе уникальный индекс не создать.
+    op.execute(
+        """
+        UPDATE library_books AS kept SET available_count = duplicates.available_count
+        FROM (
+            SELECT min(id) AS id, sum(available_count) AS available_count
+            FROM library_books GROUP BY library_id, book_id HAVING count(*) > 1
+        ) AS duplicates
+        WHERE kept.id = duplicates.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE library_book_operations AS operation SET library_book_id = library_book.kept_id
+        FROM (
+            SELECT id, min(id) OVER (PARTITION BY library_id, book_id) AS kept_id FROM library_books
+        ) AS library_book
+        WHERE operation.library_book_id = library_book.id AND library_book.id <> library_book.kept_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM library_books AS duplicate USING library_books AS kept
+        WHERE kept.library_id = duplicate.library_id AND kept.book_id = duplicate.book_id AND kept.id < duplicate.id
+        """
+    )
+
+    # Индекс строится без блокировки записи в таблицу, поэтому вне транзакции миграции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'library_books_library_id_book_id_key',
+            'library_books',
+            ['library_id', 'book_id'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+    op.execute(
+        'ALTER TABLE library_books ADD CONSTRAINT library_books_library_id_book_id_key '
+        'UNIQUE USING INDEX library_books_library_id_book_id_key'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('library_books_library_id_book_id_key', 'library_books', type_='unique')
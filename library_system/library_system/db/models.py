@@ -2,7 +2,7 @@ import enum
 import uuid
 
 from library_system.db.db_config import Base
-from sqlalchemy import Column, Enum, ForeignKey, Integer, String
+from sqlalchemy import Column, Enum, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 
 
@@ -21,6 +21,8 @@ class Library(Base):
     city = Column(String(255), nullable=False)
     address = Column(String(255), nullable=False)
 
+    __table_args__ = (Index('ix_library_city_name_id', 'city', 'name', 'id'),)
+
 
 class Book(Base):
     __tablename__ = 'books'
@@ -40,3 +42,17 @@ class LibraryBooks(Base):
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
     library_id = Column(Integer, ForeignKey("library.id"), nullable=False)
     available_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_library_books_library_id_id', 'library_id', 'id'),
+        UniqueConstraint('library_id', 'book_id', name='library_books_library_id_book_id_key'),
+    )
+
+
+class LibraryBookOperation(Base):
+    __tablename__ = 'library_book_operations'
+
+    id = Column(Integer, autoincrement=True, primary_key=True)
+    idempotency_key = Column(String(64), nullable=False, unique=True)
+    library_book_id = Column(Integer, ForeignKey("library_books.id"), nullable=False)
+    change_count = Column(Integer, nullable=False)
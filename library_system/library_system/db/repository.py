@@ -1,31 +1,138 @@
-from typing import Dict, List
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Tuple
 from uuid import UUID
 
 from library_system.db.db_config import async_session
-from library_system.db.models import Book, Library, LibraryBooks
+from library_system.db.models import Book, Library, LibraryBookOperation, LibraryBooks
+from library_system.db.unit_of_work import get_current_session
 from library_system.exceptions import NoFoundBook, NoFoundLibrary, NoFoundLibraryBook
-from library_system.service.schemas import BookInfo, BookInput, BookModel, LibraryInput, LibraryModel, LibraryUpdate
+from library_system.service.schemas import (
+    BookInfoResponse,
+    BookInput,
+    BookModel,
+    LibraryInput,
+    LibraryModel,
+    LibraryResponse,
+    LibraryUpdate,
+)
+from sqlalchemy import and_, delete, func, join, literal, outerjoin, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session
-from sqlalchemy.future import select
+from sqlalchemy.future import Select, select
+from sqlalchemy.sql import Update
+
+
+# Списки отдаются из выбранных столбцов без создания ORM-объектов.
+LIBRARY_RESPONSE_COLUMNS = (Library.name, Library.city, Library.address, Library.library_uid.label('libraryUid'))
+
+
+def to_library_response(row: Row) -> LibraryResponse:
+    """
+    Ответ из строки выборки `LIBRARY_RESPONSE_COLUMNS` без повторной валидации.
+    """
+    return LibraryResponse.construct(name=row.name, city=row.city, address=row.address, libraryUid=row.libraryUid)
+
+
+def to_book_info_response(row: Row) -> BookInfoResponse:
+    """
+    Ответ из строки выборки книг библиотеки без повторной валидации.
+    """
+    return BookInfoResponse.construct(
+        name=row.name,
+        author=row.author,
+        genre=row.genre,
+        condition=row.condition,
+        bookUid=row.bookUid,
+        availableCount=row.availableCount,
+    )
+
+
+def get_page_offset(page: int, size: int, total: int) -> int | None:
+    """
+    Смещение страницы в выборке из `total` записей.
+    Если записей меньше размера страницы, отдается первая страница со всеми записями.
+    :return: Смещение или None, если страница заведомо пуста.
+    """
+    if total < size:
+        return 0
+    if page < 1:
+        return None
+    return (page - 1) * size
 
 
 class LibraryRepository:
     def __init__(self, session_factory: async_scoped_session) -> None:
         self._session_factory: async_scoped_session = session_factory
 
-    async def get_libraries(self, city: str) -> List[LibraryModel]:
-        session: AsyncSession = self._session_factory()
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Сессия текущей единицы работы, а вне ее, например при запуске сервиса, отдельная сессия со своей транзакцией.
+        """
+        session: AsyncSession | None = get_current_session()
+        if session is not None:
+            yield session
+            return
+
+        session = self._session_factory()
         async with session, session.begin():
-            result = await session.execute(select(Library).where(Library.city == city))
+            yield session
 
-        libraries: List[Library] = result.scalars().all()
+    async def get_libraries(self, city: str, page: int, size: int) -> Tuple[List[LibraryResponse], int]:
+        """
+        Возвращает страницу библиотек города и общее число библиотек в городе.
+        """
+        async with self._session() as session:
+            result = await session.execute(select(func.count(Library.id)).where(Library.city == city))
+            total: int = result.scalar_one()
 
-        return [LibraryModel.from_orm(library) for library in libraries]
+            offset: int | None = get_page_offset(page, size, total)
+            if offset is None:
+                return [], total
+
+            result = await session.execute(
+                select(*LIBRARY_RESPONSE_COLUMNS)
+                .where(Library.city == city)
+                .order_by(Library.id)
+                .limit(size)
+                .offset(offset)
+            )
+
+        return [to_library_response(row) for row in result], total
+
+    async def get_libraries_after(
+        self, city: str, size: int, after: Tuple[str, int] | None
+    ) -> Tuple[List[LibraryResponse], Tuple[str, int] | None]:
+        """
+        Возвращает `size` библиотек города, следующих в порядке (name, id) за ключом `after`.
+        :return: Библиотеки и ключ последней из них или None, если библиотек больше нет.
+        """
+        async with self._session() as session:
+            result = await session.execute(self._get_libraries_after_query(city, size, after))
+
+        rows: List[Row] = result.all()
+
+        next_key: Tuple[str, int] | None = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_key = (rows[-1].name, rows[-1].id)
+
+        return [to_library_response(row) for row in rows], next_key
+
+    @staticmethod
+    def _get_libraries_after_query(city: str, size: int, after: Tuple[str, int] | None) -> Select:
+        """
+        На одну библиотеку больше страницы, чтобы узнать, есть ли следующая. Читается по индексу (city, name, id).
+        """
+        libraries_query = select(*LIBRARY_RESPONSE_COLUMNS, Library.id).where(Library.city == city)
+        if after is not None:
+            libraries_query = libraries_query.where(tuple_(Library.name, Library.id) > tuple_(*after))
+        return libraries_query.order_by(Library.name, Library.id).limit(size + 1)
 
     async def get_library(self, library_uid: UUID) -> LibraryModel:
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             library_query = select(Library).where(Library.library_uid == library_uid)
             result = await session.execute(library_query)
 
@@ -36,6 +143,17 @@ class LibraryRepository:
 
         return LibraryModel.from_orm(library)
 
+    async def get_libraries_by_uids(self, library_uids: List[UUID]) -> List[LibraryModel]:
+        if not library_uids:
+            return []
+
+        async with self._session() as session:
+            result = await session.execute(select(Library).where(Library.library_uid.in_(library_uids)))
+
+        libraries: List[Library] = result.scalars().all()
+
+        return [LibraryModel.from_orm(library) for library in libraries]
+
     async def create_library(self, library: LibraryInput) -> LibraryModel:
         if library.library_uid is not None:
             try:
@@ -46,8 +164,7 @@ class LibraryRepository:
 
         new_library = Library(**library.dict())
 
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             session.add(new_library)
             await session.flush()
             await session.refresh(new_library)
@@ -55,8 +172,7 @@ class LibraryRepository:
         return LibraryModel.from_orm(new_library)
 
     async def update_library(self, library_uid: UUID, library: LibraryUpdate) -> LibraryModel:
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             result = await session.execute(select(Library).where(Library.library_uid == library_uid).with_for_update())
 
             try:
@@ -73,31 +189,86 @@ class LibraryRepository:
 
         return LibraryModel.from_orm(updated_library)
 
-    async def get_books(self, library_uid: UUID, show_all: bool = False) -> List[BookInfo]:
-        library: LibraryModel = await self.get_library(library_uid)
-
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
-            library_books_query = select(LibraryBooks).where(LibraryBooks.library_id == library.id)
-            if not show_all:
-                library_books_query.where(LibraryBooks.available_count > 0)
-
-            result = await session.execute(library_books_query)
-            library_books: List[LibraryBooks] = result.scalars().all()
-            books_count: Dict[int, int] = {
-                library_book.book_id: library_book.available_count for library_book in library_books
-            }
-
-            books_query = select(Book).where(Book.id.in_(books_count.keys()))
-            result = await session.execute(books_query)
+    async def get_books(
+        self, library_uid: UUID, page: int, size: int, show_all: bool = False
+    ) -> Tuple[List[BookInfoResponse], int]:
+        """
+        Возвращает страницу книг библиотеки и общее число книг в библиотеке.
+        Без `show_all` учитываются только книги, доступные для выдачи.
+        """
+        library_books_query = self._get_library_books_query(library_uid, show_all)
 
-        books: List[Book] = result.scalars().all()
+        async with self._session() as session:
+            result = await session.execute(
+                library_books_query.with_only_columns(func.count(LibraryBooks.id)).group_by(Library.id)
+            )
+            total: int | None = result.scalar_one_or_none()
+            if total is None:
+                raise NoFoundLibrary
 
-        return [BookInfo(**BookModel.from_orm(book).dict(), availableCount=books_count[book.id]) for book in books]
+            offset: int | None = get_page_offset(page, size, total)
+            if offset is None:
+                return [], total
+
+            result = await session.execute(library_books_query.order_by(LibraryBooks.id).limit(size).offset(offset))
+
+        return [to_book_info_response(row) for row in result if row.library_book_id is not None], total
+
+    async def get_books_after(
+        self, library_uid: UUID, size: int, after: Tuple[int] | None, show_all: bool = False
+    ) -> Tuple[List[BookInfoResponse], Tuple[int] | None]:
+        """
+        Возвращает `size` книг библиотеки, следующих в порядке library_books.id за ключом `after`.
+        :return: Книги и ключ последней из них или None, если книг больше нет.
+        """
+        conditions = [LibraryBooks.id > after[0]] if after is not None else []
+        library_books_query = self._get_library_books_query(library_uid, show_all, *conditions)
+
+        async with self._session() as session:
+            result = await session.execute(library_books_query.order_by(LibraryBooks.id).limit(size + 1))
+
+        rows = result.all()
+        if not rows:
+            raise NoFoundLibrary
+
+        rows = [row for row in rows if row.library_book_id is not None]
+
+        next_key: Tuple[int] | None = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_key = (rows[-1].library_book_id,)
+
+        return [to_book_info_response(row) for row in rows], next_key
+
+    @staticmethod
+    def _get_library_books_query(library_uid: UUID, show_all: bool, *conditions: Any) -> Select:
+        """
+        Книги библиотеки с числом доступных экземпляров одним запросом.
+        Книги присоединяются к библиотеке внешним соединением, поэтому для библиотеки без подходящих книг
+        запрос возвращает одну строку с пустыми полями книги, а для несуществующей библиотеки ни одной строки.
+        """
+        library_books_conditions = [LibraryBooks.library_id == Library.id, *conditions]
+        if not show_all:
+            library_books_conditions.append(LibraryBooks.available_count > 0)
+
+        library_books = join(LibraryBooks, Book, LibraryBooks.book_id == Book.id)
+
+        return (
+            select(
+                LibraryBooks.id.label('library_book_id'),
+                Book.book_uid.label('bookUid'),
+                Book.name,
+                Book.author,
+                Book.genre,
+                Book.condition,
+                LibraryBooks.available_count.label('availableCount'),
+            )
+            .select_from(outerjoin(Library, library_books, and_(*library_books_conditions)))
+            .where(Library.library_uid == library_uid)
+        )
 
     async def get_book(self, book_uid: UUID) -> BookModel:
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             book_query = select(Book).where(Book.book_uid == book_uid)
             result = await session.execute(book_query)
 
@@ -108,6 +279,17 @@ class LibraryRepository:
 
         return BookModel.from_orm(book)
 
+    async def get_books_by_uids(self, book_uids: List[UUID]) -> List[BookModel]:
+        if not book_uids:
+            return []
+
+        async with self._session() as session:
+            result = await session.execute(select(Book).where(Book.book_uid.in_(book_uids)))
+
+        books: List[Book] = result.scalars().all()
+
+        return [BookModel.from_orm(book) for book in books]
+
     async def create_book(self, library_uid: UUID, book: BookInput) -> BookModel:
         library: LibraryModel = await self.get_library(library_uid)
 
@@ -121,8 +303,7 @@ class LibraryRepository:
 
         new_book = Book(**book.dict())
 
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             session.add(new_book)
             await session.flush()
             await session.refresh(new_book)
@@ -145,8 +326,7 @@ class LibraryRepository:
         return BookModel.from_orm(new_book)
 
     async def update_book(self, book_uid: UUID, book: BookInput) -> BookModel:
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             result = await session.execute(select(Book).where(Book.book_uid == book_uid).with_for_update())
 
             try:
@@ -168,8 +348,7 @@ class LibraryRepository:
             LibraryBooks.library_id == library_id, LibraryBooks.book_id == book_id
         )
 
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
+        async with self._session() as session:
             result = await session.execute(library_book_query)
 
             try:
@@ -179,29 +358,125 @@ class LibraryRepository:
 
         return LibraryBooks.from_orm(library_book)
 
-    async def update_library_book(self, library_id: int, book_id: int, change_count: int) -> None:
-        library_book_query = (
-            select(LibraryBooks)
-            .where(LibraryBooks.library_id == library_id, LibraryBooks.book_id == book_id)
-            .with_for_update()
+    async def update_library_book(
+        self, library_uid: UUID, book_uid: UUID, change_count: int, idempotency_key: str | None = None
+    ) -> None:
+        """
+        Изменяет число доступных экземпляров книги в библиотеке одним условным UPDATE без явной блокировки строки.
+        Уменьшение применяется, только если число экземпляров не станет отрицательным.
+        :param idempotency_key: Ключ операции. Повторная операция с тем же ключом ничего не меняет.
+        :raises NoFoundLibraryBook: Если книги нет в библиотеке.
+        :raises PermissionError: Если доступных экземпляров не хватает.
+        """
+        library_book_conditions = self._get_library_book_conditions(library_uid, book_uid)
+        update_query: Update = self._change_available_count_query(change_count)
+
+        if idempotency_key is None:
+            async with self._session() as session:
+                result = await session.execute(
+                    update_query.where(*library_book_conditions).returning(LibraryBooks.id)
+                )
+                if result.scalar_one_or_none() is None:
+                    await self._check_library_book_not_updated(session, library_uid, book_uid)
+            return
+
+        # Операция записывается тем же запросом. Если ключ уже есть, вставка ничего не возвращает
+        # и число экземпляров не меняется.
+        operation = (
+            insert(LibraryBookOperation)
+            .from_select(
+                ['idempotency_key', 'library_book_id', 'change_count'],
+                select(literal(idempotency_key), LibraryBooks.id, literal(change_count)).where(
+                    *library_book_conditions
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=[LibraryBookOperation.idempotency_key])
+            .returning(LibraryBookOperation.library_book_id)
+            .cte('operation')
+        )
+        updated = (
+            update_query.where(LibraryBooks.id == operation.c.library_book_id).returning(LibraryBooks.id).cte('updated')
         )
 
-        session: AsyncSession = self._session_factory()
-        async with session, session.begin():
-            result = await session.execute(library_book_query)
-
-            try:
-                updated_library_book: LibraryBooks = result.scalar_one()
-            except NoResultFound:
-                raise NoFoundLibraryBook
-
-            if change_count < 0 and updated_library_book.available_count < 1:
+        async with self._session() as session:
+            result = await session.execute(
+                select(
+                    select(func.count()).select_from(operation).scalar_subquery().label('inserted'),
+                    select(func.count()).select_from(updated).scalar_subquery().label('updated'),
+                )
+            )
+            counts = result.one()
+            if counts.updated:
+                return
+            if counts.inserted:
+                # Операция записана, но экземпляров не хватило: запись откатывается вместе с транзакцией.
                 raise PermissionError
 
-            updated_library_book.available_count += change_count
+            # Повтор уже выполненной операции ошибкой не считается.
+            result = await session.execute(
+                select(LibraryBookOperation.id).where(LibraryBookOperation.idempotency_key == idempotency_key)
+            )
+            if result.scalar_one_or_none() is None:
+                await self._check_library_book_not_updated(session, library_uid, book_uid)
+
+    async def _check_library_book_not_updated(self, session: AsyncSession, library_uid: UUID, book_uid: UUID) -> None:
+        """
+        Выясняет, почему число экземпляров не изменилось.
+        """
+        result = await session.execute(
+            select(LibraryBooks.id).where(*self._get_library_book_conditions(library_uid, book_uid))
+        )
+        if result.scalar_one_or_none() is None:
+            raise NoFoundLibraryBook
+        raise PermissionError
+
+    @staticmethod
+    def _change_available_count_query(change_count: int) -> Update:
+        """
+        Изменение числа доступных экземпляров. Уменьшение применяется, только если число не станет отрицательным.
+        """
+        update_query = (
+            update(LibraryBooks)
+            .values(available_count=LibraryBooks.available_count + change_count)
+            .execution_options(synchronize_session=False)
+        )
+        if change_count < 0:
+            update_query = update_query.where(LibraryBooks.available_count >= -change_count)
+        return update_query
+
+    @staticmethod
+    def _get_library_book_conditions(library_uid: UUID, book_uid: UUID) -> List[Any]:
+        return [
+            LibraryBooks.library_id == Library.id,
+            LibraryBooks.book_id == Book.id,
+            Library.library_uid == library_uid,
+            Book.book_uid == book_uid,
+        ]
+
+    async def revert_library_book_operation(self, idempotency_key: str) -> None:
+        """
+        Отменяет операцию с книгой по ее ключу, после чего операцию с тем же ключом можно выполнить снова.
+        Если операции с таким ключом нет, ничего не меняет.
+        :raises PermissionError: Если отмена сделает число доступных экземпляров отрицательным. Операция остается.
+        """
+        async with self._session() as session:
+            result = await session.execute(
+                delete(LibraryBookOperation)
+                .where(LibraryBookOperation.idempotency_key == idempotency_key)
+                .returning(LibraryBookOperation.library_book_id, LibraryBookOperation.change_count)
+            )
+            operation = result.one_or_none()
+            if operation is None:
+                return
 
-            await session.flush()
-            await session.refresh(updated_library_book)
+            # Экземпляры, возвращенные операцией, могли быть уже снова выданы. Тогда удаление операции откатывается.
+            result = await session.execute(
+                self._change_available_count_query(-operation.change_count)
+                .where(LibraryBooks.id == operation.library_book_id)
+                .returning(LibraryBooks.id)
+            )
+            if result.scalar_one_or_none() is None:
+                raise PermissionError
 
 
 library_repository: LibraryRepository = LibraryRepository(async_session)
@@ -0,0 +1,37 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+
+from library_system.db.db_config import async_session, read_only_async_session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_session: ContextVar[AsyncSession | None] = ContextVar('session', default=None)
+
+
+@asynccontextmanager
+async def unit_of_work(read_only: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    Выполняет все запросы репозиториев внутри блока в одной сессии и одной транзакции, то есть на одном соединении
+    из пула. Транзакция фиксируется при выходе из блока и откатывается при ошибке.
+    Вложенный блок использует транзакцию внешнего.
+    :param read_only: Открыть транзакцию только для чтения.
+    """
+    session: AsyncSession | None = _session.get()
+    if session is not None:
+        yield session
+        return
+
+    session = (read_only_async_session if read_only else async_session)()
+    token = _session.set(session)
+    try:
+        async with session, session.begin():
+            yield session
+    finally:
+        _session.reset(token)
+
+
+def get_current_session() -> AsyncSession | None:
+    """
+    Сессия текущей единицы работы или None вне ее.
+    """
+    return _session.get()
@@ -8,3 +8,7 @@ class NoFoundBook(Exception):
 
 class NoFoundLibraryBook(Exception):
     pass
+
+
+class InvalidCursor(Exception):
+    pass
@@ -0,0 +1,38 @@
+import base64
+import binascii
+import json
+from typing import Any, Tuple
+
+from library_system.exceptions import InvalidCursor
+
+
+def encode_cursor(key: Tuple[Any, ...]) -> str:
+    """
+    Кодирует ключ сортировки последней записи страницы в непрозрачный курсор.
+    """
+    return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode()).decode()
+
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> Tuple[Any, ...] | None:
+    """
+    Декодирует курсор, полученный от клиента.
+    :param types: Ожидаемые типы значений ключа сортировки.
+    :return: Ключ сортировки или None для пустого курсора, то есть для первой страницы.
+    :raises InvalidCursor: Если курсор поврежден или получен для другой сортировки.
+    """
+    if not cursor:
+        return None
+
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor
+
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        or not all(isinstance(value, value_type) for value, value_type in zip(key, types))
+    ):
+        raise InvalidCursor
+
+    return tuple(key)
@@ -1,11 +1,12 @@
 from typing import Dict, List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, status
 from library_system.db.repository import LibraryRepository, get_library_repository
+from library_system.service.cursors import decode_cursor, encode_cursor
 from library_system.service.schemas import (
-    BookInfo,
-    BookInfoResponse,
+    BatchRequest,
+    BatchResponse,
     BookModel,
     BookResponse,
     BooksResponse,
@@ -22,25 +23,48 @@ async def get_libraries(
     city: str,
     page: int = 1,
     size: int = 100,
+    cursor: str | None = None,
     repository: LibraryRepository = Depends(get_library_repository),
 ) -> LibrariesResponse:
-    libraries: List[LibraryModel] = await repository.get_libraries(city)
-    libraries_response: List[LibraryResponse] = [
-        LibraryResponse(**library.dict(exclude={'id', 'library_uid'}), libraryUid=library.library_uid)
-        for library in libraries
-    ]
-
-    result_count = len(libraries_response)
+    """
+    Без `cursor` возвращает страницу `page` с общим числом библиотек. С `cursor` возвращает библиотеки после курсора
+    в порядке (name, id) без подсчета общего числа, пустой `cursor` означает первую страницу.
+    """
+    if cursor is not None:
+        libraries, next_key = await repository.get_libraries_after(city, size, decode_cursor(cursor, (str, int)))
+        return LibrariesResponse.construct(
+            page=page,
+            pageSize=len(libraries),
+            totalElements=None,
+            items=libraries,
+            nextCursor=encode_cursor(next_key) if next_key is not None else None,
+        )
+
+    libraries, result_count = await repository.get_libraries(city, page, size)
 
     if result_count < size:
         size = result_count
         page = 1
-    else:
-        lower_bound = (page - 1) * size
-        upper_bound = page * size
-        libraries_response = libraries_response[lower_bound:upper_bound]
 
-    return LibrariesResponse(page=page, pageSize=size, totalElements=result_count, items=libraries_response)
+    return LibrariesResponse.construct(
+        page=page, pageSize=size, totalElements=result_count, items=libraries, nextCursor=None
+    )
+
+
+@router.post('/libraries/batch', status_code=status.HTTP_200_OK, response_model=BatchResponse)
+async def get_batch(
+    batch_request: BatchRequest,
+    repository: LibraryRepository = Depends(get_library_repository),
+) -> BatchResponse:
+    libraries: List[LibraryModel] = await repository.get_libraries_by_uids(batch_request.libraryUids)
+    books: List[BookModel] = await repository.get_books_by_uids(batch_request.bookUids)
+    return BatchResponse(
+        libraries=[
+            LibraryResponse(**library.dict(exclude={'id', 'library_uid'}), libraryUid=library.library_uid)
+            for library in libraries
+        ],
+        books=[BookResponse(**book.dict(exclude={'id', 'book_uid'}), bookUid=book.book_uid) for book in books],
+    )
 
 
 @router.get('/libraries/{library_uid}', status_code=status.HTTP_200_OK, response_model=LibraryResponse)
@@ -58,24 +82,30 @@ async def get_books(
     show_all: bool,
     page: int = 1,
     size: int = 100,
+    cursor: str | None = None,
     repository: LibraryRepository = Depends(get_library_repository),
 ) -> BooksResponse:
-    books: List[BookInfo] = await repository.get_books(library_uid, show_all)
-    books_response: List[BookInfoResponse] = [
-        BookInfoResponse(**book.dict(exclude={'id', 'book_uid'}), bookUid=book.book_uid) for book in books
-    ]
-
-    result_count = len(books_response)
+    """
+    Без `cursor` возвращает страницу `page` с общим числом книг. С `cursor` возвращает книги после курсора
+    без подсчета общего числа, пустой `cursor` означает первую страницу.
+    """
+    if cursor is not None:
+        books, next_key = await repository.get_books_after(library_uid, size, decode_cursor(cursor, (int,)), show_all)
+        return BooksResponse.construct(
+            page=page,
+            pageSize=len(books),
+            totalElements=None,
+            items=books,
+            nextCursor=encode_cursor(next_key) if next_key is not None else None,
+        )
+
+    books, result_count = await repository.get_books(library_uid, page, size, show_all)
 
     if result_count < size:
         size = result_count
         page = 1
-    else:
-        lower_bound = (page - 1) * size
-        upper_bound = page * size
-        books_response = books_response[lower_bound:upper_bound]
 
-    return BooksResponse(page=page, pageSize=size, totalElements=result_count, items=books_response)
+    return BooksResponse.construct(page=page, pageSize=size, totalElements=result_count, items=books, nextCursor=None)
 
 
 @router.get('/libraries/{library_uid}/books/{book_uid}', status_code=status.HTTP_200_OK, response_model=BookResponse)
@@ -93,20 +123,26 @@ async def reserve_book(
     library_uid: UUID,
     book_uid: UUID,
     body: Dict,
+    idempotency_key: str | None = Header(default=None),
     repository: LibraryRepository = Depends(get_library_repository),
 ) -> None:
-    library: LibraryModel = await repository.get_library(library_uid)
-    book: BookModel = await repository.get_book(book_uid)
-    await repository.update_library_book(library.id, book.id, change_count=-1)
+    await repository.update_library_book(library_uid, book_uid, change_count=-1, idempotency_key=idempotency_key)
 
 
 @router.post('/libraries/{library_uid}/books/{book_uid}/return', status_code=status.HTTP_200_OK)
-async def reserve_book(
+async def return_book(
     library_uid: UUID,
     book_uid: UUID,
     body: Dict,
+    idempotency_key: str | None = Header(default=None),
     repository: LibraryRepository = Depends(get_library_repository),
 ) -> None:
-    library: LibraryModel = await repository.get_library(library_uid)
-    book: BookModel = await repository.get_book(book_uid)
-    await repository.update_library_book(library.id, book.id, change_count=1)
+    await repository.update_library_book(library_uid, book_uid, change_count=1, idempotency_key=idempotency_key)
+
+
+@router.delete('/operations/{idempotency_key}', status_code=status.HTTP_204_NO_CONTENT)
+async def revert_operation(
+    idempotency_key: str,
+    repository: LibraryRepository = Depends(get_library_repository),
+) -> None:
+    await repository.revert_library_book_operation(idempotency_key)
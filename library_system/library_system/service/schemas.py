@@ -71,8 +71,9 @@ class BookResponse(BookInput):
 class ListResponse(BaseModel):
     page: int
     pageSize: int
-    totalElements: int
+    totalElements: int | None
     items: List
+    nextCursor: str | None = None
 
 
 class LibrariesResponse(ListResponse):
@@ -81,3 +82,13 @@ class LibrariesResponse(ListResponse):
 
 class BooksResponse(ListResponse):
     items: List[BookInfoResponse]
+
+
+class BatchRequest(BaseModel):
+    libraryUids: List[UUID] = []
+    bookUids: List[UUID] = []
+
+
+class BatchResponse(BaseModel):
+    libraries: List[LibraryResponse]
+    books: List[BookResponse]
@@ -0,0 +1,144 @@
+"""
+Число запросов и транзакций и задержка получения книг библиотеки, доступных для выдачи. Сравнивается соединение
+библиотеки, книг библиотеки и книг одним запросом - страница с общим числом и страница после курсора -
+с прежней схемой: поиск библиотеки в отдельной сессии, затем книг библиотеки и книг по списку идентификаторов.
+
+Запуск из каталога с пакетами сервиса и тестов при доступной БД сервиса:
+    python -m library_system_tests.bench_books_query --books 10 100 1000
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from uuid import UUID, uuid4
+
+from library_system.config import DB_CONFIG
+from library_system.db.db_config import async_session, engine
+from library_system.db.models import Book, LibraryBooks
+from library_system.db.repository import LibraryRepository
+from library_system.main import run_db_migrations
+from library_system.service.schemas import BookInfo, BookModel, LibraryInput, LibraryModel
+from sqlalchemy import event, text
+from sqlalchemy.future import select
+
+from library_system_tests.utils import MIGRATIONS_PATH, delete_library, describe_latencies
+
+PAGE_SIZE = 100
+
+GetBooks = Callable[[], Awaitable[List[Any]]]
+
+
+async def legacy_get_books(repository: LibraryRepository, library_uid: UUID, show_all: bool) -> List[BookInfo]:
+    library: LibraryModel = await repository.get_library(library_uid)
+
+    async with async_session() as session, session.begin():
+        library_books_query = select(LibraryBooks).where(LibraryBooks.library_id == library.id)
+        if not show_all:
+            # Как и прежде, результат условия теряется, и выбираются все книги.
+            library_books_query.where(LibraryBooks.available_count > 0)
+
+        result = await session.execute(library_books_query)
+        books_count: Dict[int, int] = {
+            library_book.book_id: library_book.available_count for library_book in result.scalars().all()
+        }
+
+        result = await session.execute(select(Book).where(Book.id.in_(books_count.keys())))
+
+    return [
+        BookInfo(**BookModel.from_orm(book).dict(), availableCount=books_count[book.id])
+        for book in result.scalars().all()
+    ]
+
+
+async def create_library_with_books(repository: LibraryRepository, books: int) -> LibraryModel:
+    """
+    Библиотека в отдельном городе с `books` книгами, доступна из них каждая вторая.
+    """
+    library: LibraryModel = await repository.create_library(
+        LibraryInput(name='Библиотека', city=f'bench-{uuid4()}', address='Тестовая ул., д.1')
+    )
+    async with async_session() as session, session.begin():
+        await session.execute(
+            text(
+                """
+                WITH books AS (
+                    INSERT INTO books (book_uid, name, author, genre, condition)
+                    SELECT gen_random_uuid(), 'Книга ' || i, 'Автор', 'Жанр', 'EXCELLENT'
+                    FROM generate_series(1, :books) AS i
+                    RETURNING id
+                )
+                INSERT INTO library_books (library_id, book_id, available_count)
+                SELECT :library_id, id, id % 2 FROM books
+                """
+            ),
+            {'library_id': library.id, 'books': books},
+        )
+        for table in ['books', 'library_books']:
+            await session.execute(text(f'ANALYZE {table}'))
+    return library
+
+
+async def measure(get_books: GetBooks, repeats: int) -> str:
+    statements: int = 0
+    transactions: int = 0
+
+    def count_statement(*_: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    def count_transaction(*_: Any) -> None:
+        nonlocal transactions
+        transactions += 1
+
+    latencies: List[float] = []
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_statement)
+    event.listen(engine.sync_engine, 'begin', count_transaction)
+    try:
+        for _ in range(repeats):
+            started: float = time.perf_counter()
+            items: List[Any] = await get_books()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', count_statement)
+        event.remove(engine.sync_engine, 'begin', count_transaction)
+
+    return (
+        f'{statements / repeats:3.0f} queries, {transactions / repeats:3.0f} transactions, {len(items):4} rows, '
+        f'{describe_latencies(latencies)}'
+    )
+
+
+async def first(page: Awaitable[Tuple[List[Any], Any]]) -> List[Any]:
+    items, _ = await page
+    return items
+
+
+async def main(books_counts: List[int], repeats: int) -> None:
+    repository = LibraryRepository(async_session)
+    try:
+        for books in books_counts:
+            library: LibraryModel = await create_library_with_books(repository, books)
+            try:
+                library_uid: UUID = library.library_uid
+                modes: List[Tuple[str, GetBooks]] = [
+                    ('page with total', lambda: first(repository.get_books(library_uid, 1, PAGE_SIZE))),
+                    ('page after cursor', lambda: first(repository.get_books_after(library_uid, PAGE_SIZE, None))),
+                    ('library, ids, IN', lambda: legacy_get_books(repository, library_uid, show_all=False)),
+                ]
+                for name, get_books in modes:
+                    result: str = await measure(get_books, repeats)
+                    print(f'{books:5} books, {name:17}: {result}')
+            finally:
+                await delete_library(library)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=100)
+    args = parser.parse_args()
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.run(main(args.books, args.repeats))
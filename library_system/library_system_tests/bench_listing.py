@@ -0,0 +1,127 @@
+"""
+Число строк в секунду при выдаче списков библиотек и книг из десятков тысяч строк: выборка и построение ответа,
+а затем и сериализация ответа по `response_model`, как ее выполняет FastAPI. Сравниваются выбранные столбцы
+с ответами без повторной валидации и прежняя цепочка: ORM-объект, модель из него, словарь модели, модель ответа.
+
+Запуск из каталога с пакетами сервиса и тестов при доступной БД сервиса:
+    python -m library_system_tests.bench_listing --rows 10000
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from uuid import UUID
+
+from fastapi.routing import APIRoute, serialize_response
+from library_system.config import DB_CONFIG
+from library_system.db.db_config import async_session, engine
+from library_system.db.models import Book, Library, LibraryBooks
+from library_system.db.repository import LibraryRepository
+from library_system.db.unit_of_work import get_current_session
+from library_system.main import app, run_db_migrations
+from library_system.service import routers
+from library_system.service.schemas import (
+    BookInfo,
+    BookInfoResponse,
+    BookModel,
+    BooksResponse,
+    LibrariesResponse,
+    LibraryModel,
+    LibraryResponse,
+)
+from sqlalchemy.future import select
+
+from library_system_tests.utils import MIGRATIONS_PATH, bulk_catalogue
+
+GetResponse = Callable[[], Awaitable[Any]]
+
+
+async def legacy_get_libraries(city: str) -> LibrariesResponse:
+    result = await get_current_session().execute(select(Library).where(Library.city == city))
+    libraries: List[LibraryModel] = [LibraryModel.from_orm(library) for library in result.scalars().all()]
+
+    items: List[LibraryResponse] = [
+        LibraryResponse(**library.dict(exclude={'id', 'library_uid'}), libraryUid=library.library_uid)
+        for library in libraries
+    ]
+    return LibrariesResponse(page=1, pageSize=len(items), totalElements=len(items), items=items)
+
+
+async def legacy_get_books(library_uid: UUID) -> BooksResponse:
+    session = get_current_session()
+    result = await session.execute(select(Library).where(Library.library_uid == library_uid))
+    library: LibraryModel = LibraryModel.from_orm(result.scalar_one())
+
+    result = await session.execute(select(LibraryBooks).where(LibraryBooks.library_id == library.id))
+    books_count: Dict[int, int] = {
+        library_book.book_id: library_book.available_count for library_book in result.scalars().all()
+    }
+    result = await session.execute(select(Book).where(Book.id.in_(books_count.keys())))
+    books: List[BookInfo] = [
+        BookInfo(**BookModel.from_orm(book).dict(), availableCount=books_count[book.id])
+        for book in result.scalars().all()
+    ]
+
+    items: List[BookInfoResponse] = [
+        BookInfoResponse(**book.dict(exclude={'id', 'book_uid'}), bookUid=book.book_uid) for book in books
+    ]
+    return BooksResponse(page=1, pageSize=len(items), totalElements=len(items), items=items)
+
+
+async def get_libraries(repository: LibraryRepository, city: str, rows: int) -> LibrariesResponse:
+    libraries, total = await repository.get_libraries(city, 1, rows)
+    return LibrariesResponse.construct(page=1, pageSize=rows, totalElements=total, items=libraries, nextCursor=None)
+
+
+async def get_books(repository: LibraryRepository, library_uid: UUID, rows: int) -> BooksResponse:
+    books, total = await repository.get_books(library_uid, 1, rows, show_all=True)
+    return BooksResponse.construct(page=1, pageSize=rows, totalElements=total, items=books, nextCursor=None)
+
+
+def get_route(endpoint: Callable) -> APIRoute:
+    return next(route for route in app.routes if isinstance(route, APIRoute) and route.endpoint is endpoint)
+
+
+async def measure(get_response: GetResponse, route: APIRoute, rows: int, repeats: int) -> str:
+    build_time: float = 0
+    serialize_time: float = 0
+    for _ in range(repeats):
+        started: float = time.perf_counter()
+        response = await get_response()
+        built: float = time.perf_counter()
+        content = await serialize_response(field=route.response_field, response_content=response)
+        serialize_time += time.perf_counter() - built
+        build_time += built - started
+        assert len(content['items']) == rows
+
+    return (
+        f'{rows * repeats / build_time:8.0f} rows/s to response, '
+        f'{rows * repeats / (build_time + serialize_time):8.0f} rows/s serialized'
+    )
+
+
+async def main(rows: int, repeats: int) -> None:
+    repository = LibraryRepository(async_session)
+    try:
+        async with bulk_catalogue(rows, rows) as (city, library_uid):
+            modes: List[Tuple[str, APIRoute, GetResponse]] = [
+                ('libraries, columns', get_route(routers.get_libraries), lambda: get_libraries(repository, city, rows)),
+                ('libraries, ORM', get_route(routers.get_libraries), lambda: legacy_get_libraries(city)),
+                ('books, columns', get_route(routers.get_books), lambda: get_books(repository, library_uid, rows)),
+                ('books, ORM', get_route(routers.get_books), lambda: legacy_get_books(library_uid)),
+            ]
+            for name, route, get_response in modes:
+                result: str = await measure(get_response, route, rows, repeats)
+                print(f'{rows} {name:18}: {result}')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.run(main(args.rows, args.repeats))
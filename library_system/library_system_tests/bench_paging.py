@@ -0,0 +1,170 @@
+"""
+Время получения первой и последней страницы библиотек города и книг библиотеки при разном объеме каталога.
+Сравнивается постраничная выборка репозитория - COUNT и LIMIT/OFFSET в запросе - с выборкой после курсора
+без подсчета общего числа и с прежней схемой: загрузка всех записей в ORM-объекты и модели и срез страницы из списка.
+
+Запуск из каталога с пакетами сервиса и тестов при доступной БД сервиса:
+    python -m library_system_tests.bench_paging --libraries 100 1000 10000 --books 1000 10000 100000
+"""
+import argparse
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from uuid import UUID
+
+from library_system.config import DB_CONFIG
+from library_system.db.db_config import async_session, engine
+from library_system.db.models import Book, Library, LibraryBooks
+from library_system.db.repository import LibraryRepository
+from library_system.db.unit_of_work import get_current_session
+from library_system.main import run_db_migrations
+from library_system.service.schemas import BookInfo, BookModel, LibraryModel, LibraryResponse
+from sqlalchemy.future import select
+
+from library_system_tests.utils import MIGRATIONS_PATH, bulk_catalogue, describe_latencies
+
+PAGE_SIZE = 100
+
+GetPage = Callable[[int], Awaitable[List[Any]]]
+
+
+async def legacy_get_libraries(city: str, page: int, size: int) -> List[LibraryResponse]:
+    result = await get_current_session().execute(select(Library).where(Library.city == city))
+    libraries: List[LibraryModel] = [LibraryModel.from_orm(library) for library in result.scalars().all()]
+
+    items: List[LibraryResponse] = [
+        LibraryResponse(**library.dict(exclude={'id', 'library_uid'}), libraryUid=library.library_uid)
+        for library in libraries
+    ]
+    return items[(page - 1) * size:page * size]
+
+
+async def legacy_get_books(library_uid: UUID, page: int, size: int) -> List[BookInfo]:
+    session = get_current_session()
+    result = await session.execute(select(Library).where(Library.library_uid == library_uid))
+    library: LibraryModel = LibraryModel.from_orm(result.scalar_one())
+
+    result = await session.execute(select(LibraryBooks).where(LibraryBooks.library_id == library.id))
+    books_count: Dict[int, int] = {
+        library_book.book_id: library_book.available_count for library_book in result.scalars().all()
+    }
+    result = await session.execute(select(Book).where(Book.id.in_(books_count.keys())))
+
+    items: List[BookInfo] = [
+        BookInfo(**BookModel.from_orm(book).dict(), availableCount=books_count[book.id])
+        for book in result.scalars().all()
+    ]
+    return items[(page - 1) * size:page * size]
+
+
+async def get_libraries_keys(city: str, last_page: int) -> Dict[int, Tuple[str, int] | None]:
+    """
+    Курсоры первой и последней страницы библиотек.
+    """
+    if last_page == 1:
+        return {1: None}
+
+    result = await get_current_session().execute(
+        select(Library.name, Library.id)
+        .where(Library.city == city)
+        .order_by(Library.name, Library.id)
+        .offset((last_page - 1) * PAGE_SIZE - 1)
+        .limit(1)
+    )
+    return {1: None, last_page: tuple(result.one())}
+
+
+async def get_books_keys(library_uid: UUID, last_page: int) -> Dict[int, Tuple[int] | None]:
+    """
+    Курсоры первой и последней страницы книг библиотеки.
+    """
+    if last_page == 1:
+        return {1: None}
+
+    result = await get_current_session().execute(
+        select(LibraryBooks.id)
+        .join(Library, LibraryBooks.library_id == Library.id)
+        .where(Library.library_uid == library_uid)
+        .order_by(LibraryBooks.id)
+        .offset((last_page - 1) * PAGE_SIZE - 1)
+        .limit(1)
+    )
+    return {1: None, last_page: tuple(result.one())}
+
+
+def get_last_page(total: int) -> int:
+    return max(math.ceil(total / PAGE_SIZE), 1)
+
+
+async def measure(get_page: GetPage, total: int, repeats: int) -> str:
+    """
+    Задержка первой и последней страницы.
+    """
+    descriptions: List[str] = []
+    for page in sorted({1, get_last_page(total)}):
+        latencies: List[float] = []
+        for _ in range(repeats):
+            started: float = time.perf_counter()
+            items: List[Any] = await get_page(page)
+            latencies.append(time.perf_counter() - started)
+        assert len(items) == min(PAGE_SIZE, total - (page - 1) * PAGE_SIZE), (page, len(items))
+        descriptions.append(f'page {page:4}: {describe_latencies(latencies)}')
+    return '; '.join(descriptions)
+
+
+async def first(page: Awaitable[Tuple[List[Any], Any]]) -> List[Any]:
+    items, _ = await page
+    return items
+
+
+async def main(libraries_counts: List[int], books_counts: List[int], repeats: int) -> None:
+    repository = LibraryRepository(async_session)
+    try:
+        for libraries in libraries_counts:
+            async with bulk_catalogue(libraries, 0) as (city, _):
+                libraries_keys = await get_libraries_keys(city, get_last_page(libraries))
+                modes: List[Tuple[str, GetPage]] = [
+                    ('LIMIT/OFFSET', lambda page: first(repository.get_libraries(city, page, PAGE_SIZE))),
+                    (
+                        'cursor',
+                        lambda page: first(repository.get_libraries_after(city, PAGE_SIZE, libraries_keys[page])),
+                    ),
+                    ('load all', lambda page: legacy_get_libraries(city, page, PAGE_SIZE)),
+                ]
+                for name, get_page in modes:
+                    result: str = await measure(get_page, libraries, repeats)
+                    print(f'{libraries:6} libraries, {name:12}: {result}')
+
+        for books in books_counts:
+            async with bulk_catalogue(1, books) as (_, library_uid):
+                books_keys = await get_books_keys(library_uid, get_last_page(books))
+                modes = [
+                    ('LIMIT/OFFSET', lambda page: first(repository.get_books(library_uid, page, PAGE_SIZE, True))),
+                    (
+                        'cursor',
+                        lambda page: first(repository.get_books_after(library_uid, PAGE_SIZE, books_keys[page], True)),
+                    ),
+                    ('load all', lambda page: legacy_get_books(library_uid, page, PAGE_SIZE)),
+                ]
+                for name, get_page in modes:
+                    try:
+                        result = await measure(get_page, books, repeats)
+                    except Exception as exc:
+                        # Прежний запрос книг передает все их идентификаторы параметрами и на больших библиотеках
+                        # упирается в ограничение протокола на число параметров.
+                        result = f'failed: {exc!r:.100}'
+                    print(f'{books:6} books,     {name:12}: {result}')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--libraries', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--books', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.run(main(args.libraries, args.books, args.repeats))
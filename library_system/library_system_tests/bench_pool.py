@@ -0,0 +1,94 @@
+"""
+Нагрузочный тест пула соединений: одновременные запросы страницы книг библиотеки, как при веерных обращениях
+Gateway, при разном размере пула без переполнения. Для каждого размера выводятся пропускная способность,
+задержка запросов и время ожидания соединения из пула.
+
+Запуск из каталога с пакетами сервиса и тестов при доступной БД сервиса:
+    python -m library_system_tests.bench_pool --pool-sizes 1 2 5 10 20 --concurrency 20 100
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+from uuid import UUID, uuid4
+
+from library_system.config import DB_CONFIG
+from library_system.db.db_config import DATABASE_URL, async_session, engine
+from library_system.db.repository import LibraryRepository
+from library_system.main import run_db_migrations
+from library_system.service.schemas import LibraryInput, LibraryModel
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from library_system_tests.utils import MIGRATIONS_PATH, add_book, delete_library, describe_latencies
+from share.db_pool import MeasuredQueuePool, warm_up_pool
+
+BOOKS = 20
+
+
+def get_total_wait_ms(wait_stats: Dict) -> float:
+    return (wait_stats['avg_wait_ms'] or 0) * wait_stats['waits']
+
+
+async def run(library_uid: UUID, pool_size: int, concurrency: int, requests: int) -> str:
+    pool_engine: AsyncEngine = create_async_engine(
+        DATABASE_URL, poolclass=MeasuredQueuePool, pool_size=pool_size, max_overflow=0, pool_timeout=60
+    )
+    repository = LibraryRepository(sessionmaker(pool_engine, class_=AsyncSession, expire_on_commit=False))
+    try:
+        await warm_up_pool(pool_engine, pool_size)
+        pool: MeasuredQueuePool = pool_engine.sync_engine.pool
+        warm_up_stats: Dict = pool.wait_stats()
+
+        numbers = iter(range(requests))
+        latencies: List[float] = []
+
+        async def worker() -> None:
+            for _ in numbers:
+                started: float = time.perf_counter()
+                await repository.get_books(library_uid, 1, BOOKS, show_all=True)
+                latencies.append(time.perf_counter() - started)
+
+        started: float = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed: float = time.perf_counter() - started
+        wait_stats: Dict = pool.wait_stats()
+    finally:
+        await pool_engine.dispose()
+
+    # Ожидание соединений при прогреве пула не относится к нагрузке.
+    waits: int = wait_stats['waits'] - warm_up_stats['waits']
+    wait_time: float = get_total_wait_ms(wait_stats) - get_total_wait_ms(warm_up_stats)
+    return (
+        f'{requests / elapsed:6.0f} requests/s, {describe_latencies(latencies)}; '
+        f'pool wait avg {wait_time / waits:7.2f} ms, max {wait_stats["max_wait_ms"]:7.1f} ms'
+    )
+
+
+async def main(pool_sizes: List[int], concurrency_levels: List[int], requests: int) -> None:
+    repository = LibraryRepository(async_session)
+    library: LibraryModel = await repository.create_library(
+        LibraryInput(name='Библиотека', city=f'bench-{uuid4()}', address='Тестовая ул., д.1')
+    )
+    try:
+        for _ in range(BOOKS):
+            await add_book(repository, library)
+
+        for concurrency in concurrency_levels:
+            for pool_size in pool_sizes:
+                result: str = await run(library.library_uid, pool_size, concurrency, requests)
+                print(f'{concurrency:3} concurrent requests, pool {pool_size:2}: {result}')
+    finally:
+        await delete_library(library)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 2, 5, 10, 20])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[20, 100])
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.run(main(args.pool_sizes, args.concurrency, args.requests))
@@ -0,0 +1,96 @@
+"""
+Нагрузочный тест бронирования одной книги: сотни одновременных резервирований, экземпляров на которые хватает
+только части из них. Сравнивается условный UPDATE репозитория с прежней схемой - поиск библиотеки и книги
+отдельными сессиями и изменение строки под блокировкой SELECT ... FOR UPDATE.
+
+Запуск из каталога с пакетами сервиса и тестов при доступной БД сервиса:
+    python -m library_system_tests.bench_reserve --reserves 100 300 500
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+from uuid import UUID, uuid4
+
+from library_system.config import DB_CONFIG
+from library_system.db.db_config import async_session, engine
+from library_system.db.models import LibraryBooks
+from library_system.db.repository import LibraryRepository
+from library_system.main import run_db_migrations
+from library_system.service.schemas import BookModel, LibraryInput, LibraryModel
+from sqlalchemy.future import select
+
+from library_system_tests.utils import MIGRATIONS_PATH, add_book, delete_library, describe_latencies
+
+Reserve = Callable[[LibraryRepository, UUID, UUID], Awaitable[None]]
+
+
+async def conditional_reserve(repository: LibraryRepository, library_uid: UUID, book_uid: UUID) -> None:
+    await repository.update_library_book(library_uid, book_uid, change_count=-1)
+
+
+async def locking_reserve(repository: LibraryRepository, library_uid: UUID, book_uid: UUID) -> None:
+    library: LibraryModel = await repository.get_library(library_uid)
+    book: BookModel = await repository.get_book(book_uid)
+
+    async with async_session() as session, session.begin():
+        result = await session.execute(
+            select(LibraryBooks)
+            .where(LibraryBooks.library_id == library.id, LibraryBooks.book_id == book.id)
+            .with_for_update()
+        )
+        library_book: LibraryBooks = result.scalar_one()
+        if library_book.available_count < 1:
+            raise PermissionError
+        library_book.available_count -= 1
+
+
+async def run(repository: LibraryRepository, reserve: Reserve, reserves: int, copies: int) -> str:
+    library: LibraryModel = await repository.create_library(
+        LibraryInput(name='Библиотека', city=f'bench-{uuid4()}', address='Тестовая ул., д.1')
+    )
+    try:
+        book_uid: UUID = await add_book(repository, library, count=copies)
+        latencies: List[float] = []
+
+        async def timed_reserve() -> bool:
+            started: float = time.perf_counter()
+            try:
+                await reserve(repository, library.library_uid, book_uid)
+                return True
+            except PermissionError:
+                return False
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        started: float = time.perf_counter()
+        results: List[bool] = await asyncio.gather(*(timed_reserve() for _ in range(reserves)))
+        elapsed: float = time.perf_counter() - started
+    finally:
+        await delete_library(library)
+
+    assert sum(results) == copies, f'{sum(results)} reserves succeeded, {copies} copies'
+    return f'{reserves / elapsed:7.0f} reserves/s, {describe_latencies(latencies)}'
+
+
+async def main(reserve_counts: List[int], rounds: int) -> None:
+    repository = LibraryRepository(async_session)
+    try:
+        for reserves in reserve_counts:
+            copies: int = reserves // 4
+            for name, reserve in [('conditional UPDATE', conditional_reserve), ('SELECT FOR UPDATE', locking_reserve)]:
+                for _ in range(rounds):
+                    result: str = await run(repository, reserve, reserves, copies)
+                    print(f'{reserves:4} reserves of {copies:3} copies, {name:18}: {result}')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reserves', type=int, nargs='+', default=[100, 300, 500])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.run(main(args.reserves, args.rounds))
@@ -0,0 +1,58 @@
+import asyncio
+from typing import AsyncIterator, Iterator
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from library_system.config import DB_CONFIG
+from library_system.db.db_config import async_session, engine
+from library_system.db.repository import LibraryRepository
+from library_system.main import run_db_migrations
+from library_system.service.schemas import LibraryInput, LibraryModel
+
+from library_system_tests.utils import MIGRATIONS_PATH, delete_library
+
+
+@pytest.fixture(scope='session')
+def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # Соединения пула привязаны к циклу событий, поэтому один цикл на все тесты.
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def database(event_loop: asyncio.AbstractEventLoop) -> None:
+    """
+    БД, к которой подключается сервис, с примененными миграциями. Если БД недоступна, тесты с ней пропускаются.
+    """
+
+    async def check_connection() -> None:
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql('SELECT 1')
+
+    try:
+        event_loop.run_until_complete(asyncio.wait_for(check_connection(), timeout=5))
+    except (OSError, asyncio.TimeoutError) as exc:
+        pytest.skip(f'PostgreSQL is not available at {DB_CONFIG.db_host}:{DB_CONFIG.db_port}: {exc!r}')
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.set_event_loop(event_loop)
+
+
+@pytest.fixture
+def repository(database: None) -> LibraryRepository:
+    return LibraryRepository(async_session)
+
+
+@pytest_asyncio.fixture
+async def library(repository: LibraryRepository) -> AsyncIterator[LibraryModel]:
+    """
+    Библиотека в отдельном городе, чтобы тесты не видели чужих данных. Удаляется вместе с книгами после теста.
+    """
+    library: LibraryModel = await repository.create_library(
+        LibraryInput(name='Библиотека', city=f'test-{uuid4()}', address='Тестовая ул., д.1')
+    )
+    yield library
+    await delete_library(library)
@@ -0,0 +1,48 @@
+from uuid import UUID, uuid4
+
+import pytest
+from library_system.db.repository import LibraryRepository
+from library_system.exceptions import NoFoundLibrary
+from library_system.service.schemas import LibraryModel
+
+from library_system_tests.utils import add_book
+
+
+@pytest.mark.asyncio
+async def test_show_all_filters_unavailable_books(repository: LibraryRepository, library: LibraryModel):
+    available_uid: UUID = await add_book(repository, library, name='Есть', count=3)
+    unavailable_uid: UUID = await add_book(repository, library, name='Нет')
+    await repository.update_library_book(library.library_uid, unavailable_uid, change_count=-1)
+
+    books, total = await repository.get_books(library.library_uid, 1, 10, show_all=True)
+    assert total == 2
+    assert [(book.bookUid, book.availableCount) for book in books] == [(available_uid, 3), (unavailable_uid, 0)]
+
+    books, total = await repository.get_books(library.library_uid, 1, 10, show_all=False)
+    assert total == 1
+    assert [(book.bookUid, book.name, book.availableCount) for book in books] == [(available_uid, 'Есть', 3)]
+
+    books, next_key = await repository.get_books_after(library.library_uid, 10, None, show_all=False)
+    assert [book.bookUid for book in books] == [available_uid]
+    assert next_key is None
+
+
+@pytest.mark.asyncio
+async def test_library_without_books(repository: LibraryRepository, library: LibraryModel):
+    assert await repository.get_books(library.library_uid, 1, 10, show_all=True) == ([], 0)
+    assert await repository.get_books_after(library.library_uid, 10, None, show_all=True) == ([], None)
+
+    book_uid: UUID = await add_book(repository, library)
+    await repository.update_library_book(library.library_uid, book_uid, change_count=-1)
+
+    assert await repository.get_books(library.library_uid, 1, 10, show_all=False) == ([], 0)
+    assert await repository.get_books_after(library.library_uid, 10, None, show_all=False) == ([], None)
+
+
+@pytest.mark.asyncio
+async def test_unknown_library(repository: LibraryRepository):
+    with pytest.raises(NoFoundLibrary):
+        await repository.get_books(uuid4(), 1, 10, show_all=True)
+
+    with pytest.raises(NoFoundLibrary):
+        await repository.get_books_after(uuid4(), 10, None, show_all=True)
@@ -0,0 +1,93 @@
+import logging
+from typing import AsyncIterator, List
+
+import pytest
+import pytest_asyncio
+from library_system.db.db_config import DATABASE_URL
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from share.sql_instrumentation import SQLInstrumentation, normalize_statement
+
+
+@pytest_asyncio.fixture
+async def engine(database: None) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(DATABASE_URL)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def instrumentation(engine: AsyncEngine) -> SQLInstrumentation:
+    # Каждый запрос считается медленным.
+    return SQLInstrumentation(engine, slow_query_threshold=0, explain_slow_queries=True)
+
+
+@pytest.mark.parametrize(
+    'statement',
+    [
+        'SELECT name FROM library WHERE id IN (%s)',
+        'SELECT name FROM library WHERE id IN (%s, %s, %s)',
+        'SELECT name FROM library WHERE id IN ($1, $2)',
+        'SELECT name FROM library WHERE id IN (%(id_1)s, %(id_2)s)',
+        'SELECT name\n  FROM library WHERE id IN (?, ?, ?, ?)',
+    ],
+)
+def test_normalize_collapses_in_lists(statement):
+    assert normalize_statement(statement) == 'SELECT name FROM library WHERE id IN (...)'
+
+
+@pytest.mark.asyncio
+async def test_slow_query_plan_is_logged(
+    engine: AsyncEngine, instrumentation: SQLInstrumentation, caplog: pytest.LogCaptureFixture
+):
+    caplog.set_level(logging.WARNING, logger='share.sql_instrumentation')
+
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql('SELECT 1 AS x')
+
+    assert any(record.getMessage().startswith('Slow SQL plan:\nResult') for record in caplog.records)
+    assert list(instrumentation.stats()['statements']) == ['SELECT ? AS x']
+
+
+@pytest.mark.asyncio
+async def test_failed_explain_keeps_transaction_usable(engine: AsyncEngine, instrumentation: SQLInstrumentation):
+    async with engine.connect() as connection:
+        # Запрос создает таблицу, поэтому EXPLAIN того же запроса падает с ошибкой "relation already exists".
+        await connection.exec_driver_sql('SELECT 1 AS x INTO TEMP explain_failure')
+
+        result = await connection.exec_driver_sql('SELECT x FROM explain_failure')
+        assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio
+async def test_logs_do_not_contain_parameters(engine: AsyncEngine, caplog: pytest.LogCaptureFixture):
+    instrumentation = SQLInstrumentation(engine, slow_query_threshold=0, trace_sample_rate=1.0)
+    caplog.set_level(logging.INFO, logger='share.sql_instrumentation')
+
+    with instrumentation.trace_request():
+        async with engine.connect() as connection:
+            await connection.execute(
+                text('SELECT CAST(:name AS text), CAST(:city AS text)'), {'name': 'Иван', 'city': 'Москва'}
+            )
+
+    messages: List[str] = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 2
+    assert all(message.endswith('[2 parameters]') for message in messages)
+    assert not any('Иван' in message or 'Москва' in message for message in messages)
+
+
+@pytest.mark.asyncio
+async def test_in_lists_of_any_length_share_statement(engine: AsyncEngine):
+    instrumentation = SQLInstrumentation(engine, slow_query_threshold=60)
+    statement = text('SELECT x FROM generate_series(1, 10) AS x WHERE x IN :values').bindparams(
+        bindparam('values', expanding=True)
+    )
+
+    async with engine.connect() as connection:
+        for values in [[1], [1, 2], [1, 2, 3], list(range(10))]:
+            await connection.execute(statement, {'values': values})
+
+    statements = instrumentation.stats()['statements']
+    assert list(statements) == ['SELECT x FROM generate_series(...) AS x WHERE x IN (...)']
+    assert statements['SELECT x FROM generate_series(...) AS x WHERE x IN (...)']['count'] == 4
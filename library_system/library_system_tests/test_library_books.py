@@ -0,0 +1,124 @@
+import asyncio
+from typing import List
+from uuid import UUID, uuid4
+
+import pytest
+from library_system.db.repository import LibraryRepository
+from library_system.exceptions import NoFoundLibraryBook
+from library_system.service.schemas import LibraryModel
+
+from library_system_tests.utils import add_book
+
+# Сотни одновременных бронирований одной книги, экземпляров которой хватает только на часть из них.
+CONCURRENT_RESERVES = 300
+COPIES = 25
+
+
+async def get_available_count(repository: LibraryRepository, library: LibraryModel) -> int:
+    books, _ = await repository.get_books(library.library_uid, 1, 1, show_all=True)
+    return books[0].availableCount
+
+
+async def reserve_concurrently(
+    repository: LibraryRepository, library: LibraryModel, book_uid: UUID, keys: List[str | None]
+) -> List[BaseException | None]:
+    return await asyncio.gather(
+        *(
+            repository.update_library_book(library.library_uid, book_uid, change_count=-1, idempotency_key=key)
+            for key in keys
+        ),
+        return_exceptions=True,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('with_keys', [False, True])
+async def test_concurrent_reserves_do_not_oversell(
+    repository: LibraryRepository, library: LibraryModel, with_keys: bool
+):
+    book_uid: UUID = await add_book(repository, library, count=COPIES)
+
+    results = await reserve_concurrently(
+        repository, library, book_uid, [str(uuid4()) if with_keys else None for _ in range(CONCURRENT_RESERVES)]
+    )
+
+    assert results.count(None) == COPIES
+    assert all(isinstance(result, PermissionError) for result in results if result is not None)
+    assert await get_available_count(repository, library) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_replays_of_one_key_apply_once(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=3)
+    key = str(uuid4())
+
+    results = await reserve_concurrently(repository, library, book_uid, [key] * CONCURRENT_RESERVES)
+
+    assert results == [None] * CONCURRENT_RESERVES
+    assert await get_available_count(repository, library) == 2
+
+
+@pytest.mark.asyncio
+async def test_replayed_key_changes_count_once(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=2)
+    reserve_key, return_key = str(uuid4()), str(uuid4())
+
+    for _ in range(2):
+        await repository.update_library_book(library.library_uid, book_uid, -1, idempotency_key=reserve_key)
+    assert await get_available_count(repository, library) == 1
+
+    for _ in range(2):
+        await repository.update_library_book(library.library_uid, book_uid, 1, idempotency_key=return_key)
+    assert await get_available_count(repository, library) == 2
+
+
+@pytest.mark.asyncio
+async def test_reverted_operation_can_be_repeated(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=2)
+    key = str(uuid4())
+
+    await repository.update_library_book(library.library_uid, book_uid, -1, idempotency_key=key)
+    await repository.revert_library_book_operation(key)
+    await repository.revert_library_book_operation(key)
+    assert await get_available_count(repository, library) == 2
+
+    await repository.update_library_book(library.library_uid, book_uid, -1, idempotency_key=key)
+    assert await get_available_count(repository, library) == 1
+
+
+@pytest.mark.asyncio
+async def test_revert_does_not_make_count_negative(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=1)
+    key = str(uuid4())
+    await repository.update_library_book(library.library_uid, book_uid, 1, idempotency_key=key)
+    for _ in range(2):
+        await repository.update_library_book(library.library_uid, book_uid, -1)
+
+    with pytest.raises(PermissionError):
+        await repository.revert_library_book_operation(key)
+    assert await get_available_count(repository, library) == 0
+
+    # Операция не отменена, поэтому ее повтор ничего не меняет.
+    await repository.update_library_book(library.library_uid, book_uid, 1, idempotency_key=key)
+    assert await get_available_count(repository, library) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_reserve_does_not_record_key(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=1)
+    key = str(uuid4())
+    await repository.update_library_book(library.library_uid, book_uid, -1)
+
+    with pytest.raises(PermissionError):
+        await repository.update_library_book(library.library_uid, book_uid, -1, idempotency_key=key)
+
+    await repository.update_library_book(library.library_uid, book_uid, 1)
+    await repository.update_library_book(library.library_uid, book_uid, -1, idempotency_key=key)
+    assert await get_available_count(repository, library) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('key', [None, 'missing-book'])
+async def test_missing_library_book(repository: LibraryRepository, library: LibraryModel, key: str | None):
+    with pytest.raises(NoFoundLibraryBook):
+        await repository.update_library_book(library.library_uid, uuid4(), -1, idempotency_key=key)
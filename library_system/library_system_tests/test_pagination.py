@@ -0,0 +1,283 @@
+import re
+from typing import AsyncIterator, List
+from uuid import UUID
+
+import pytest
+import pytest_asyncio
+from library_system.db.db_config import async_session
+from library_system.db.models import Book, Library, LibraryBooks
+from library_system.db.repository import LibraryRepository, get_page_offset
+from library_system.exceptions import InvalidCursor
+from library_system.service.cursors import decode_cursor, encode_cursor
+from library_system.service.schemas import LibraryInput, LibraryModel
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from library_system_tests.utils import add_book, explain, request
+
+
+# Тысяча библиотек в одном городе и по тысяче книг в каждой из двадцати библиотек другого города.
+BULK_DATA = [
+    """
+    INSERT INTO library (library_uid, name, city, address)
+    SELECT gen_random_uuid(), 'Библиотека ' || i, CASE WHEN i <= 1000 THEN 'explain-city' ELSE 'explain-other' END, ''
+    FROM generate_series(1, 1020) AS i
+    """,
+    """
+    INSERT INTO books (book_uid, name, condition)
+    SELECT gen_random_uuid(), 'Книга ' || i, 'EXCELLENT' FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO library_books (library_id, book_id, available_count)
+    SELECT library.id, books.id, 1
+    FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM library WHERE city = 'explain-other') AS library
+    JOIN (SELECT id, row_number() OVER (ORDER BY id) AS n FROM books WHERE name LIKE 'Книга %') AS books
+        ON books.n % 20 = library.n % 20
+    """,
+    'ANALYZE library',
+    'ANALYZE books',
+    'ANALYZE library_books',
+]
+
+
+@pytest_asyncio.fixture
+async def bulk_session(database: None) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия с объемом данных, при котором выбор плана имеет смысл. Данные и статистика по ним существуют только
+    в транзакции теста и откатываются вместе с ней.
+    """
+    async with async_session() as session:
+        transaction = await session.begin()
+        for statement in BULK_DATA:
+            await session.execute(text(statement))
+        await session.execute(text('SET LOCAL enable_seqscan = off'))
+        yield session
+        await transaction.rollback()
+
+
+@pytest.mark.parametrize(
+    'page, size, total, offset',
+    [
+        (1, 10, 25, 0),
+        (3, 10, 25, 20),
+        (4, 10, 25, 30),
+        (0, 10, 25, None),
+        (5, 10, 3, 0),
+        (0, 10, 3, 0),
+    ],
+)
+def test_page_offset(page, size, total, offset):
+    assert get_page_offset(page, size, total) == offset
+
+
+@pytest.mark.asyncio
+async def test_libraries_offset_pages(repository: LibraryRepository, library: LibraryModel):
+    for name in ['Г', 'Д', 'Е', 'Ж']:
+        await repository.create_library(LibraryInput(name=name, city=library.city, address='Тестовая ул., д.2'))
+
+    status_code, page = await request('GET', '/libraries', {'city': library.city, 'page': 2, 'size': 2})
+    assert status_code == 200
+    assert (page['page'], page['pageSize'], page['totalElements']) == (2, 2, 5)
+    assert [item['name'] for item in page['items']] == ['Д', 'Е']
+
+    status_code, page = await request('GET', '/libraries', {'city': library.city, 'page': 4, 'size': 2})
+    assert (page['totalElements'], page['items']) == (5, [])
+
+    status_code, page = await request('GET', '/libraries', {'city': library.city, 'page': 3, 'size': 10})
+    assert (page['page'], page['pageSize'], page['totalElements']) == (1, 5, 5)
+    assert len(page['items']) == 5
+
+
+@pytest.mark.asyncio
+async def test_books_offset_pages(repository: LibraryRepository, library: LibraryModel):
+    book_uids: List[UUID] = [await add_book(repository, library, name=f'Книга {i}') for i in range(3)]
+
+    status_code, page = await request(
+        'GET', f'/libraries/{library.library_uid}/books', {'show_all': True, 'page': 2, 'size': 2}
+    )
+    assert status_code == 200
+    assert (page['page'], page['pageSize'], page['totalElements']) == (2, 2, 3)
+    assert [UUID(item['bookUid']) for item in page['items']] == book_uids[2:]
+
+
+@pytest.mark.asyncio
+async def test_listing_items_match_response_schemas(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=2)
+    _, library_response = await request('GET', f'/libraries/{library.library_uid}')
+
+    # Поля `library_uid` и `book_uid` наследуются схемами ответов от схем ввода и всегда пустые.
+    assert library_response == {
+        'name': library.name,
+        'city': library.city,
+        'address': library.address,
+        'library_uid': None,
+        'libraryUid': str(library.library_uid),
+    }
+
+    for cursor in [{}, {'cursor': ''}]:
+        _, page = await request('GET', '/libraries', {'city': library.city, **cursor})
+        assert page['items'] == [library_response]
+
+        _, page = await request('GET', f'/libraries/{library.library_uid}/books', {'show_all': True, **cursor})
+        assert page['items'] == [
+            {
+                'name': 'Книга',
+                'author': 'Автор',
+                'genre': 'Жанр',
+                'condition': 'EXCELLENT',
+                'book_uid': None,
+                'bookUid': str(book_uid),
+                'availableCount': 2,
+            }
+        ]
+
+
+@pytest.mark.parametrize('key, types', [(('Библиотека', 7), (str, int)), ((42,), (int,))])
+def test_cursor_round_trip(key, types):
+    assert decode_cursor(encode_cursor(key), types) == key
+
+
+def test_empty_cursor_is_first_page():
+    assert decode_cursor('', (int,)) is None
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not a cursor!',
+        encode_cursor(('Библиотека', 7))[:-3],
+        encode_cursor(('Библиотека', '7')),
+        encode_cursor((7,)),
+        encode_cursor({'id': 7}),
+    ],
+)
+def test_malformed_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, (str, int))
+
+
+@pytest.mark.asyncio
+async def test_libraries_keyset_query_uses_index(bulk_session: AsyncSession):
+    plan: str = await explain(
+        bulk_session, LibraryRepository._get_libraries_after_query('explain-city', 10, ('Библиотека 500', 1))
+    )
+
+    assert re.search(r'Index Scan (using|on) ix_library_city_name_id', plan), plan
+    assert re.search(r'Index Cond: .*city.*ROW\(', plan), plan
+
+
+@pytest.mark.asyncio
+async def test_books_keyset_query_uses_index(bulk_session: AsyncSession):
+    result = await bulk_session.execute(
+        select(Library.library_uid, func.percentile_disc(0.5).within_group(LibraryBooks.id))
+        .join(LibraryBooks, LibraryBooks.library_id == Library.id)
+        .where(Library.city == 'explain-other')
+        .group_by(Library.library_uid)
+        .limit(1)
+    )
+    library_uid, after = result.one()
+    statement = (
+        LibraryRepository._get_library_books_query(library_uid, True, LibraryBooks.id > after)
+        .order_by(LibraryBooks.id)
+        .limit(11)
+    )
+
+    plan: str = await explain(bulk_session, statement)
+
+    assert re.search(r'Index Scan (using|on) ix_library_books_library_id_id', plan), plan
+    assert re.search(r'Index Cond: \(\(library_id = library\.id\) AND \(id > ', plan), plan
+
+
+@pytest.mark.asyncio
+async def test_libraries_cursor_pages(repository: LibraryRepository, library: LibraryModel):
+    for name in ['В', 'Б', 'А', 'Б']:
+        await repository.create_library(LibraryInput(name=name, city=library.city, address='Тестовая ул., д.2'))
+
+    names: List[str] = []
+    cursor: str | None = ''
+    while cursor is not None:
+        status_code, page = await request('GET', '/libraries', {'city': library.city, 'size': 2, 'cursor': cursor})
+        assert status_code == 200
+        assert page['totalElements'] is None
+        names.extend(item['name'] for item in page['items'])
+        cursor = page['nextCursor']
+
+    assert names == ['А', 'Б', 'Б', 'Библиотека', 'В']
+
+
+@pytest.mark.asyncio
+async def test_books_cursor_pages(repository: LibraryRepository, library: LibraryModel):
+    book_uids: List[UUID] = [await add_book(repository, library, name=f'Книга {i}') for i in range(5)]
+    await repository.update_library_book(library.library_uid, book_uids[2], change_count=-1)
+
+    async def read_all(show_all: bool) -> List[UUID]:
+        seen: List[UUID] = []
+        cursor: str | None = ''
+        while cursor is not None:
+            status_code, page = await request(
+                'GET',
+                f'/libraries/{library.library_uid}/books',
+                {'show_all': show_all, 'size': 2, 'cursor': cursor},
+            )
+            assert status_code == 200
+            seen.extend(UUID(item['bookUid']) for item in page['items'])
+            cursor = page['nextCursor']
+        return seen
+
+    assert await read_all(show_all=True) == book_uids
+    assert await read_all(show_all=False) == [uid for i, uid in enumerate(book_uids) if i != 2]
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_are_stable_under_inserts(repository: LibraryRepository, library: LibraryModel):
+    for name in ['Б', 'Г', 'Е']:
+        await repository.create_library(LibraryInput(name=name, city=library.city, address='Тестовая ул., д.2'))
+
+    _, page = await request('GET', '/libraries', {'city': library.city, 'size': 2, 'cursor': ''})
+    names: List[str] = [item['name'] for item in page['items']]
+
+    # Библиотека перед курсором не сдвигает следующую страницу, а после курсора попадает в нее.
+    for name in ['А', 'Д']:
+        await repository.create_library(LibraryInput(name=name, city=library.city, address='Тестовая ул., д.3'))
+
+    cursor: str | None = page['nextCursor']
+    while cursor is not None:
+        _, page = await request('GET', '/libraries', {'city': library.city, 'size': 2, 'cursor': cursor})
+        names.extend(item['name'] for item in page['items'])
+        cursor = page['nextCursor']
+
+    assert names == ['Б', 'Библиотека', 'Г', 'Д', 'Е']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('cursor', ['not a cursor!', encode_cursor(('Библиотека',))])
+async def test_malformed_cursor_is_bad_request(library: LibraryModel, cursor: str):
+    status_code, body = await request('GET', '/libraries', {'city': library.city, 'cursor': cursor})
+    assert status_code == 400
+    assert body == {'message': 'Invalid cursor'}
+
+    status_code, _ = await request(
+        'GET', f'/libraries/{library.library_uid}/books', {'show_all': True, 'cursor': cursor}
+    )
+    assert status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_library_book_update_uses_unique_key(bulk_session: AsyncSession):
+    result = await bulk_session.execute(
+        select(Library.library_uid, Book.book_uid)
+        .join(LibraryBooks, LibraryBooks.library_id == Library.id)
+        .join(Book, Book.id == LibraryBooks.book_id)
+        .where(Library.city == 'explain-other')
+        .limit(1)
+    )
+    library_uid, book_uid = result.one()
+    statement = LibraryRepository._change_available_count_query(-1).where(
+        *LibraryRepository._get_library_book_conditions(library_uid, book_uid)
+    )
+
+    plan: str = await explain(bulk_session, statement)
+
+    assert re.search(r'Index Scan (using|on) library_books_library_id_book_id_key', plan), plan
+    assert re.search(r'Index Cond: \(\(library_id = library\.id\) AND \(book_id = books\.id\)\)', plan), plan
@@ -0,0 +1,45 @@
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from library_system.db.db_config import DATABASE_URL
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from share.db_pool import MeasuredQueuePool, warm_up_pool
+
+
+@pytest_asyncio.fixture
+async def small_engine(database: None) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(
+        DATABASE_URL, poolclass=MeasuredQueuePool, pool_size=2, max_overflow=0, pool_timeout=0.2
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fills_pool(small_engine: AsyncEngine):
+    pool: MeasuredQueuePool = small_engine.sync_engine.pool
+
+    await warm_up_pool(small_engine, 2)
+
+    assert pool.checkedin() == 2
+    assert pool.checkedout() == 0
+    assert pool.wait_stats()['waits'] == 2
+
+
+@pytest.mark.asyncio
+async def test_exhausted_pool_counts_timeouts(small_engine: AsyncEngine):
+    pool: MeasuredQueuePool = small_engine.sync_engine.pool
+
+    async with small_engine.connect(), small_engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with small_engine.connect():
+                pass
+
+    stats = pool.wait_stats()
+    assert stats['waits'] == 3
+    assert stats['timeouts'] == 1
+    assert stats['max_wait_ms'] >= 200
+    assert stats['avg_wait_ms'] < stats['max_wait_ms']
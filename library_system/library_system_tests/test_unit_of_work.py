@@ -0,0 +1,88 @@
+from uuid import UUID
+
+import pytest
+from library_system.db.pool_metrics import POOL_METRICS
+from library_system.db.repository import LibraryRepository
+from library_system.db.unit_of_work import get_current_session, unit_of_work
+from library_system.exceptions import NoFoundLibrary
+from library_system.main import unit_of_work_middleware
+from library_system.service.schemas import LibraryInput, LibraryModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from library_system_tests.utils import add_book, request
+
+
+def make_request(method: str, path: str) -> Request:
+    return Request({'type': 'http', 'method': method, 'path': path, 'headers': [], 'query_string': b''})
+
+
+@pytest.mark.asyncio
+async def test_rolls_back_when_block_raises(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=2)
+
+    with pytest.raises(RuntimeError):
+        async with unit_of_work():
+            created: LibraryModel = await repository.create_library(
+                LibraryInput(name='Новая', city=library.city, address='Тестовая ул., д.2')
+            )
+            await repository.update_library_book(library.library_uid, book_uid, -1)
+            raise RuntimeError
+
+    assert get_current_session() is None
+    with pytest.raises(NoFoundLibrary):
+        await repository.get_library(created.library_uid)
+    books, _ = await repository.get_books(library.library_uid, 1, 10, show_all=True)
+    assert books[0].availableCount == 2
+
+
+@pytest.mark.asyncio
+async def test_nested_block_shares_transaction(repository: LibraryRepository, library: LibraryModel):
+    async with unit_of_work() as session:
+        async with unit_of_work() as nested_session:
+            assert nested_session is session
+            assert get_current_session() is session
+        assert get_current_session() is session
+    assert get_current_session() is None
+
+
+@pytest.mark.asyncio
+async def test_middleware_rolls_back_when_handler_raises(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=2)
+
+    async def call_next(_: Request) -> Response:
+        await repository.update_library_book(library.library_uid, book_uid, -1)
+        await repository.update_library_book(library.library_uid, book_uid, -1)
+        await repository.update_library_book(library.library_uid, book_uid, -1)
+        return Response()
+
+    with pytest.raises(PermissionError):
+        await unit_of_work_middleware(make_request('POST', '/libraries/reserve'), call_next)
+
+    books, _ = await repository.get_books(library.library_uid, 1, 10, show_all=True)
+    assert books[0].availableCount == 2
+
+
+@pytest.mark.asyncio
+async def test_middleware_commits_before_response(repository: LibraryRepository, library: LibraryModel):
+    book_uid: UUID = await add_book(repository, library, count=2)
+
+    async def call_next(_: Request) -> Response:
+        await repository.update_library_book(library.library_uid, book_uid, -1)
+        return Response()
+
+    await unit_of_work_middleware(make_request('POST', '/libraries/reserve'), call_next)
+
+    books, _ = await repository.get_books(library.library_uid, 1, 10, show_all=True)
+    assert books[0].availableCount == 1
+
+
+@pytest.mark.asyncio
+async def test_request_uses_one_connection(repository: LibraryRepository, library: LibraryModel):
+    await add_book(repository, library)
+    checkouts: int = POOL_METRICS.stats()['checkouts']
+
+    status_code, _ = await request('GET', f'/libraries/{library.library_uid}/books', {'show_all': True})
+
+    assert status_code == 200
+    assert POOL_METRICS.stats()['checkouts'] - checkouts == 1
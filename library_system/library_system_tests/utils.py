@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import statistics
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from urllib.parse import urlencode
+from uuid import UUID, uuid4
+
+import library_system
+from library_system.db.db_config import async_session
+from library_system.db.models import Book, Library, LibraryBookOperation, LibraryBooks
+from library_system.db.repository import LibraryRepository
+from library_system.db.unit_of_work import unit_of_work
+from library_system.main import app
+from library_system.service.schemas import BookInput, Condition, LibraryModel
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(library_system.__file__), 'db', 'migrations')
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    statement: str = compiler.process(element.statement, **kwargs)
+    # EXPLAIN изменяющего запроса возвращает строки плана, а не результат изменения.
+    compiler.isinsert = compiler.isupdate = compiler.isdelete = False
+    return f'EXPLAIN {statement}'
+
+
+async def explain(session: AsyncSession, statement: Executable) -> str:
+    """
+    План запроса без его выполнения.
+    """
+    result = await session.execute(Explain(statement))
+    return '\n'.join(result.scalars().all())
+
+
+async def add_book(repository: LibraryRepository, library: LibraryModel, name: str = 'Книга', count: int = 1) -> UUID:
+    book_uid = uuid4()
+    await repository.create_book(
+        library.library_uid,
+        BookInput(book_uid=book_uid, name=name, author='Автор', genre='Жанр', condition=Condition.EXCELLENT),
+    )
+    if count != 1:
+        await repository.update_library_book(library.library_uid, book_uid, change_count=count - 1)
+    return book_uid
+
+
+async def delete_library(library: LibraryModel) -> None:
+    """
+    Удаляет библиотеки города `library` вместе с их книгами и операциями с книгами.
+    """
+    async with async_session() as session, session.begin():
+        library_book_ids = select(LibraryBooks.id).where(LibraryBooks.library_id == library.id)
+        await session.execute(
+            delete(LibraryBookOperation)
+            .where(LibraryBookOperation.library_book_id.in_(library_book_ids))
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(
+            delete(LibraryBooks)
+            .where(LibraryBooks.library_id == library.id)
+            .returning(LibraryBooks.book_id)
+            .execution_options(synchronize_session=False)
+        )
+        book_ids: List[int] = result.scalars().all()
+        await session.execute(
+            delete(Book).where(Book.id.in_(book_ids)).execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            delete(Library).where(Library.city == library.city).execution_options(synchronize_session=False)
+        )
+
+
+class _Rollback(Exception):
+    pass
+
+
+@asynccontextmanager
+async def bulk_catalogue(libraries: int, books: int) -> AsyncIterator[Tuple[str, UUID]]:
+    """
+    Город с `libraries` библиотеками, в первой из которых `books` книг, доступна из них каждая вторая.
+    Данные видны репозиториям только внутри блока, в единице работы, и откатываются при выходе из него.
+    :return: Город и UID библиотеки с книгами.
+    """
+    city: str = f'bench-{uuid4()}'
+    try:
+        async with unit_of_work() as session:
+            await session.execute(
+                text(
+                    """
+                    INSERT INTO library (library_uid, name, city, address)
+                    SELECT gen_random_uuid(), 'Библиотека ' || i, :city, 'Тестовая ул., д.' || i
+                    FROM generate_series(1, :libraries) AS i
+                    """
+                ),
+                {'city': city, 'libraries': libraries},
+            )
+            result = await session.execute(
+                select(Library.id, Library.library_uid).where(Library.city == city).order_by(Library.id).limit(1)
+            )
+            library_id, library_uid = result.one()
+            await session.execute(
+                text(
+                    """
+                    WITH books AS (
+                        INSERT INTO books (book_uid, name, author, genre, condition)
+                        SELECT gen_random_uuid(), 'Книга ' || i, 'Автор', 'Жанр', 'EXCELLENT'
+                        FROM generate_series(1, :books) AS i
+                        RETURNING id
+                    )
+                    INSERT INTO library_books (library_id, book_id, available_count)
+                    SELECT :library_id, id, id % 2 FROM books
+                    """
+                ),
+                {'library_id': library_id, 'books': books},
+            )
+            for table in ['library', 'books', 'library_books']:
+                await session.execute(text(f'ANALYZE {table}'))
+
+            yield city, library_uid
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def describe_latencies(latencies: List[float]) -> str:
+    """
+    Медиана, 99-й перцентиль и максимум времени выполнения, заданного в секундах.
+    """
+    percentiles: List[float] = statistics.quantiles(latencies, n=100, method='inclusive')
+    return (
+        f'p50 {percentiles[49] * 1000:7.1f} ms, p99 {percentiles[98] * 1000:7.1f} ms, '
+        f'max {max(latencies) * 1000:7.1f} ms'
+    )
+
+
+async def request(
+    method: str,
+    path: str,
+    params: Dict[str, Any] | None = None,
+    headers: Dict[str, str] | None = None,
+    body: Any = None,
+) -> Tuple[int, Any]:
+    """
+    Выполняет запрос к приложению через ASGI, включая middleware, и возвращает статус и тело ответа.
+    """
+    content: bytes = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': urlencode(params or {}).encode(),
+        'headers': [
+            (b'content-type', b'application/json'),
+            *((name.lower().encode(), value.encode()) for name, value in (headers or {}).items()),
+        ],
+        'client': ('test', 0),
+        'server': ('test', 80),
+    }
+    messages: List[Dict] = []
+    request_sent: bool = False
+    response_sent = asyncio.Event()
+
+    async def receive() -> Dict:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': content, 'more_body': False}
+        # Клиент отключается только после того, как получил ответ.
+        await response_sent.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Dict) -> None:
+        messages.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body', False):
+            response_sent.set()
+
+    await app(scope, receive, send)
+
+    status_code: int = next(message['status'] for message in messages if message['type'] == 'http.response.start')
+    response: bytes = b''.join(
+        message.get('body', b'') for message in messages if message['type'] == 'http.response.body'
+    )
+    return status_code, json.loads(response) if response else None
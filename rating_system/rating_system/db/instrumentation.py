@@ -0,0 +1,12 @@
+from rating_system.config import SQL_INSTRUMENTATION_CONFIG
+from rating_system.db.db_config import engine
+
+from share.sql_instrumentation import SQLInstrumentation
+
+SQL_INSTRUMENTATION: SQLInstrumentation = SQLInstrumentation(
+    engine,
+    slow_query_threshold=SQL_INSTRUMENTATION_CONFIG.slow_query_threshold,
+    explain_slow_queries=SQL_INSTRUMENTATION_CONFIG.explain_slow_queries,
+    trace_sample_rate=SQL_INSTRUMENTATION_CONFIG.trace_sample_rate,
+    max_statements=SQL_INSTRUMENTATION_CONFIG.max_statements,
+)
@@ -0,0 +1,33 @@
+"""Rating unique username
+
+Revision ID: 2d7b5e9f4a31
+Revises: feb7e3e1e070
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2d7b5e9f4a31'
+down_revision = 'feb7e3e1e070'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Из повторяющихся рейтингов пользователя остается первый созданный, иначе уникальный индекс не создать.
+    op.execute(
+        """
+        DELETE FROM rating AS duplicate USING rating AS kept
+        WHERE kept.username = duplicate.username AND kept.id < duplicate.id
+        """
+    )
+
+    # Индекс строится без блокировки записи в таблицу, поэтому вне транзакции миграции.
+    with op.get_context().autocommit_block():
+        op.create_index('rating_username_key', 'rating', ['username'], unique=True, postgresql_concurrently=True)
+    op.execute('ALTER TABLE rating ADD CONSTRAINT rating_username_key UNIQUE USING INDEX rating_username_key')
+
+
+def downgrade() -> None:
+    op.drop_constraint('rating_username_key', 'rating', type_='unique')
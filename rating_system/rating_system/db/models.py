@@ -6,5 +6,5 @@ class Rating(Base):
     __tablename__ = 'rating'
 
     id = Column(Integer, autoincrement=True, primary_key=True)
-    username = Column(String(80), nullable=False)
+    username = Column(String(80), nullable=False, unique=True)
     stars = Column(Integer, nullable=False)
@@ -0,0 +1,40 @@
+from typing import Dict
+
+from rating_system.db.db_config import engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from share.db_pool import MeasuredQueuePool
+
+
+class PoolMetrics:
+    """
+    Считает выдачи соединений из пула engine и время ожидания свободного соединения.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self._pool: MeasuredQueuePool = engine.sync_engine.pool
+
+        self._checkouts: int = 0
+        self._checked_out: int = 0
+
+        event.listen(self._pool, 'checkout', self._on_checkout)
+        event.listen(self._pool, 'checkin', self._on_checkin)
+
+    def stats(self) -> Dict:
+        return {
+            'checkouts': self._checkouts,
+            'checked_out': self._checked_out,
+            'wait': self._pool.wait_stats(),
+            'pool': self._pool.status(),
+        }
+
+    def _on_checkout(self, *args) -> None:
+        self._checkouts += 1
+        self._checked_out += 1
+
+    def _on_checkin(self, *args) -> None:
+        self._checked_out -= 1
+
+
+POOL_METRICS: PoolMetrics = PoolMetrics(engine)
@@ -4,7 +4,7 @@ from rating_system.exceptions import NoFoundRating
 from rating_system.service.schemas import RatingModel
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session
-from sqlalchemy.future import select
+from sqlalchemy.future import Select, select
 
 
 class RatingRepository:
@@ -14,7 +14,7 @@ class RatingRepository:
     async def get_rating(self, username: str) -> RatingModel:
         session: AsyncSession = self._session_factory()
         async with session, session.begin():
-            result = await session.execute(select(Rating).where(Rating.username == username))
+            result = await session.execute(self._get_rating_query(username))
 
         try:
             rating: Rating = result.scalar_one()
@@ -23,6 +23,13 @@ class RatingRepository:
 
         return RatingModel.from_orm(rating)
 
+    @staticmethod
+    def _get_rating_query(username: str) -> Select:
+        """
+        Рейтинг пользователя. Читается по уникальному индексу username.
+        """
+        return select(Rating).where(Rating.username == username)
+
     async def create_rating(self, username: str) -> RatingModel:
         new_rating = Rating(username=username, stars=1)
 
@@ -37,7 +44,7 @@ class RatingRepository:
     async def update_rating(self, username: str, stars: int) -> RatingModel:
         session: AsyncSession = self._session_factory()
         async with session, session.begin():
-            result = await session.execute(select(Rating).where(Rating.username == username).with_for_update())
+            result = await session.execute(self._get_rating_query(username).with_for_update())
 
             try:
                 updated_rating: Rating = result.scalar_one()
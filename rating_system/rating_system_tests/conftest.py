@@ -0,0 +1,45 @@
+import asyncio
+import os
+from typing import Iterator
+
+import pytest
+import rating_system
+from rating_system.config import DB_CONFIG
+from rating_system.db.db_config import async_session, engine
+from rating_system.db.repository import RatingRepository
+from rating_system.main import run_db_migrations
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(rating_system.__file__), 'db', 'migrations')
+
+
+@pytest.fixture(scope='session')
+def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # Соединения пула привязаны к циклу событий, поэтому один цикл на все тесты.
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def database(event_loop: asyncio.AbstractEventLoop) -> None:
+    """
+    БД, к которой подключается сервис, с примененными миграциями. Если БД недоступна, тесты с ней пропускаются.
+    """
+
+    async def check_connection() -> None:
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql('SELECT 1')
+
+    try:
+        event_loop.run_until_complete(asyncio.wait_for(check_connection(), timeout=5))
+    except (OSError, asyncio.TimeoutError) as exc:
+        pytest.skip(f'PostgreSQL is not available at {DB_CONFIG.db_host}:{DB_CONFIG.db_port}: {exc!r}')
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.set_event_loop(event_loop)
+
+
+@pytest.fixture
+def repository(database: None) -> RatingRepository:
+    return RatingRepository(async_session)
@@ -0,0 +1,44 @@
+import re
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from rating_system.db.db_config import async_session
+from rating_system.db.repository import RatingRepository
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from rating_system_tests.utils import explain
+
+BULK_DATA = [
+    "INSERT INTO rating (username, stars) SELECT 'explain-' || i, 1 + i % 100 FROM generate_series(1, 10000) AS i",
+    'ANALYZE rating',
+]
+
+
+@pytest_asyncio.fixture
+async def bulk_session(database: None) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия с объемом данных, при котором выбор плана имеет смысл. Данные и статистика по ним существуют только
+    в транзакции теста и откатываются вместе с ней.
+    """
+    async with async_session() as session:
+        transaction = await session.begin()
+        for statement in BULK_DATA:
+            await session.execute(text(statement))
+        await session.execute(text('SET LOCAL enable_seqscan = off'))
+        yield session
+        await transaction.rollback()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('for_update', [False, True])
+async def test_rating_query_uses_username_key(bulk_session: AsyncSession, for_update: bool):
+    statement = RatingRepository._get_rating_query('explain-7')
+    if for_update:
+        statement = statement.with_for_update()
+
+    plan: str = await explain(bulk_session, statement)
+
+    assert re.search(r'Index Scan (using|on) rating_username_key', plan), plan
+    assert re.search(r'Index Cond: \(\(?username\)?::text = ', plan), plan
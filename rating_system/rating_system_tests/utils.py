@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    statement: str = compiler.process(element.statement, **kwargs)
+    # EXPLAIN изменяющего запроса возвращает строки плана, а не результат изменения.
+    compiler.isinsert = compiler.isupdate = compiler.isdelete = False
+    return f'EXPLAIN {statement}'
+
+
+async def explain(session: AsyncSession, statement: Executable) -> str:
+    """
+    План запроса без его выполнения.
+    """
+    result = await session.execute(Explain(statement))
+    return '\n'.join(result.scalars().all())
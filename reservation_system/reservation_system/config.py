@@ -8,8 +8,36 @@ class DBConfig(BaseSettings):
     db_port: int = Field(default=5432, allow_mutation=False, env='DB_PORT')
     db_name: str = Field(default='reservations', allow_mutation=False, env='DB_NAME')
 
+    pool_size: int = Field(default=5, allow_mutation=False, env='DB_POOL_SIZE')
+    max_overflow: int = Field(default=10, allow_mutation=False, env='DB_MAX_OVERFLOW')
+    pool_timeout: float = Field(default=30, allow_mutation=False, env='DB_POOL_TIMEOUT')
+    pool_recycle: int = Field(default=1800, allow_mutation=False, env='DB_POOL_RECYCLE')
+    pool_pre_ping: bool = Field(default=False, allow_mutation=False, env='DB_POOL_PRE_PING')
+    pool_warm_up: bool = Field(default=True, allow_mutation=False, env='DB_POOL_WARM_UP')
+    # Кэш подготовленных запросов asyncpg и SQLAlchemy на каждом соединении.
+    statement_cache_size: int = Field(default=100, allow_mutation=False, env='DB_STATEMENT_CACHE_SIZE')
+    prepared_statement_cache_size: int = Field(
+        default=100, allow_mutation=False, env='DB_PREPARED_STATEMENT_CACHE_SIZE'
+    )
+    # Без именованных подготовленных запросов на сервере, например за PgBouncer в режиме transaction.
+    prepared_statements: bool = Field(default=True, allow_mutation=False, env='DB_PREPARED_STATEMENTS')
+
     class Config:
         validate_assignment = True
 
 
 DB_CONFIG: DBConfig = DBConfig()
+
+
+class SQLInstrumentationConfig(BaseSettings):
+    echo: bool = Field(default=False, env='SQL_ECHO')
+    slow_query_threshold: float = Field(default=0.2, env='SQL_SLOW_QUERY_THRESHOLD')
+    explain_slow_queries: bool = Field(default=False, env='SQL_EXPLAIN_SLOW_QUERIES')
+    trace_sample_rate: float = Field(default=0.0, env='SQL_TRACE_SAMPLE_RATE')
+    max_statements: int = Field(default=500, env='SQL_MAX_STATEMENTS')
+
+    class Config:
+        validate_assignment = True
+
+
+SQL_INSTRUMENTATION_CONFIG: SQLInstrumentationConfig = SQLInstrumentationConfig()
@@ -0,0 +1,34 @@
+"""Rented books count
+
+Revision ID: 3f6c8a1d5b27
+Revises: 8e3f1a6c2d94
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3f6c8a1d5b27'
+down_revision = '8e3f1a6c2d94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rented_books_count',
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('username'),
+    )
+    op.execute(
+        """
+        INSERT INTO rented_books_count (username, count)
+        SELECT username, count(*) FROM reservation WHERE status = 'RENTED' GROUP BY username
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rented_books_count')
@@ -0,0 +1,32 @@
+"""Reservation username index
+
+Revision ID: 8e3f1a6c2d94
+Revises: 5a8d2c4b7e10
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8e3f1a6c2d94'
+down_revision = '5a8d2c4b7e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Индекс строится без блокировки записи в таблицу, поэтому вне транзакции миграции.
+    # Он же используется для поиска только по username, поэтому отдельный индекс по username не нужен.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_reservation_username_status',
+            'reservation',
+            ['username', 'status'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reservation_username_status', table_name='reservation', postgresql_concurrently=True)
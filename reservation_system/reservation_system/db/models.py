@@ -2,7 +2,7 @@ import enum
 import uuid
 
 from reservation_system.db.db_config import Base
-from sqlalchemy import Column, Enum, Integer, String
+from sqlalchemy import Column, Enum, Index, Integer, String
 from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
 
 
@@ -23,3 +23,18 @@ class Reservation(Base):
     status = Column(Enum(Status), nullable=False)
     start_date = Column(TIMESTAMP, nullable=False)
     till_date = Column(TIMESTAMP, nullable=False)
+    idempotency_key = Column(String(64), nullable=True, unique=True)
+
+    __table_args__ = (Index('ix_reservation_username_status', 'username', 'status'),)
+
+
+class RentedBooksCount(Base):
+    """
+    Число книг на руках у пользователя, то есть его бронирований в статусе RENTED.
+    Меняется в той же транзакции, что и бронирования.
+    """
+
+    __tablename__ = 'rented_books_count'
+
+    username = Column(String(80), primary_key=True)
+    count = Column(Integer, nullable=False)
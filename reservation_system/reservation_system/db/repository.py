@@ -2,40 +2,84 @@ from typing import List
 from uuid import UUID
 
 from reservation_system.db.db_config import async_session
-from reservation_system.db.models import Reservation, Status
+from reservation_system.db.models import RentedBooksCount, Reservation, Status
 from reservation_system.exceptions import NoFoundReservation
-from reservation_system.service.schemas import RentedBooks, ReservationInput, ReservationModel, ReservationUpdate
+from reservation_system.service.schemas import (
+    RentedBooks,
+    ReservationInput,
+    ReservationModel,
+    ReservationResponse,
+    ReservationUpdate,
+)
+from sqlalchemy import Date, cast, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session
-from sqlalchemy.future import select
+from sqlalchemy.future import Select, select
+
+
+# Бронирования отдаются из выбранных столбцов без создания ORM-объектов.
+RESERVATION_RESPONSE_COLUMNS = (
+    Reservation.username,
+    Reservation.status,
+    Reservation.reservation_uid.label('reservationUid'),
+    Reservation.book_uid.label('bookUid'),
+    Reservation.library_uid.label('libraryUid'),
+    cast(Reservation.start_date, Date).label('startDate'),
+    cast(Reservation.till_date, Date).label('tillDate'),
+)
+
+
+def to_reservation_response(row: Row) -> ReservationResponse:
+    """
+    Ответ из строки выборки `RESERVATION_RESPONSE_COLUMNS` без повторной валидации.
+    """
+    return ReservationResponse.construct(**row._mapping)
 
 
 class ReservationRepository:
     def __init__(self, session_factory: async_scoped_session) -> None:
         self._session_factory: async_scoped_session = session_factory
 
-    async def get_reservations(self, username: str) -> List[ReservationModel]:
+    async def get_reservations(self, username: str) -> List[ReservationResponse]:
         session: AsyncSession = self._session_factory()
         async with session, session.begin():
-            result = await session.execute(select(Reservation).where(Reservation.username == username))
+            result = await session.execute(self._get_reservations_query(username))
 
-        reservations: List[Reservation] = result.scalars().all()
+        return [to_reservation_response(row) for row in result]
 
-        return [ReservationModel.from_orm(reservation) for reservation in reservations]
+    @staticmethod
+    def _get_reservations_query(username: str) -> Select:
+        """
+        Бронирования пользователя. Читаются по индексу (username, status).
+        """
+        return select(*RESERVATION_RESPONSE_COLUMNS).where(Reservation.username == username)
 
-    async def get_reservation(self, reservation_uid: UUID) -> ReservationModel:
+    async def get_reservation(self, reservation_uid: UUID) -> ReservationResponse:
         session: AsyncSession = self._session_factory()
         async with session, session.begin():
-            result = await session.execute(select(Reservation).where(Reservation.reservation_uid == reservation_uid))
+            result = await session.execute(
+                select(*RESERVATION_RESPONSE_COLUMNS).where(Reservation.reservation_uid == reservation_uid)
+            )
 
         try:
-            reservation: Reservation = result.scalar_one()
+            row: Row = result.one()
         except NoResultFound:
             raise NoFoundReservation
 
-        return ReservationModel.from_orm(reservation)
+        return to_reservation_response(row)
+
+    async def create_reservation(
+        self, reservation: ReservationInput, idempotency_key: str | None = None
+    ) -> ReservationModel:
+        """
+        Создает бронирование.
+        :param idempotency_key: Ключ запроса. Повторный запрос с тем же ключом возвращает уже созданное бронирование.
+        """
+        if idempotency_key is not None:
+            return await self._create_idempotent_reservation(reservation, idempotency_key)
 
-    async def create_reservation(self, reservation: ReservationInput) -> ReservationModel:
         new_reservation = Reservation(**reservation.dict())
 
         session: AsyncSession = self._session_factory()
@@ -44,8 +88,30 @@ class ReservationRepository:
             await session.flush()
             await session.refresh(new_reservation)
 
+            if new_reservation.status == Status.RENTED:
+                await self._change_rented_books_count(session, new_reservation.username, 1)
+
         return ReservationModel.from_orm(new_reservation)
 
+    async def _create_idempotent_reservation(
+        self, reservation: ReservationInput, idempotency_key: str
+    ) -> ReservationModel:
+        session: AsyncSession = self._session_factory()
+        async with session, session.begin():
+            result = await session.execute(
+                insert(Reservation)
+                .values(**reservation.dict(), idempotency_key=idempotency_key)
+                .on_conflict_do_nothing(index_elements=[Reservation.idempotency_key])
+                .returning(Reservation.id)
+            )
+            if result.scalar_one_or_none() is not None and reservation.status == Status.RENTED:
+                await self._change_rented_books_count(session, reservation.username, 1)
+
+            result = await session.execute(select(Reservation).where(Reservation.idempotency_key == idempotency_key))
+            reservation_with_key: Reservation = result.scalar_one()
+
+        return ReservationModel.from_orm(reservation_with_key)
+
     async def delete_reservation(self, reservation_uid: UUID, username: str) -> None:
         query = (
             select(Reservation.id)
@@ -60,12 +126,17 @@ class ReservationRepository:
             result = await session.execute(query)
             reservations_ids = result.scalars().all()
 
-            await session.execute(
+            result = await session.execute(
                 delete(Reservation)  # type: ignore
                 .where(Reservation.id.in_(reservations_ids))
+                .returning(Reservation.status)
                 .execution_options(synchronize_session=False)
             )
 
+            rented_count: int = sum(status == Status.RENTED for status in result.scalars().all())
+            if rented_count:
+                await self._change_rented_books_count(session, username, -rented_count)
+
     async def update_reservation(
             self, reservation_uid: UUID, username: str, reservation: ReservationUpdate
     ) -> ReservationModel:
@@ -82,10 +153,16 @@ class ReservationRepository:
             except NoResultFound:
                 raise NoFoundReservation
 
+            was_rented: bool = updated_reservation.status == Status.RENTED
+
             for key, value in reservation.dict(exclude_unset=True).items():
                 if hasattr(updated_reservation, key):
                     setattr(updated_reservation, key, value)
 
+            is_rented: bool = updated_reservation.status == Status.RENTED
+            if was_rented != is_rented:
+                await self._change_rented_books_count(session, username, 1 if is_rented else -1)
+
             await session.flush()
             await session.refresh(updated_reservation)
 
@@ -94,13 +171,30 @@ class ReservationRepository:
     async def get_rented_books(self, username: str) -> RentedBooks:
         session: AsyncSession = self._session_factory()
         async with session, session.begin():
-            result = await session.execute(
-                select(Reservation).where(Reservation.username == username, Reservation.status == Status.RENTED)
+            result = await session.execute(self._get_rented_books_query(username))
+
+        return RentedBooks(count=result.scalar_one_or_none() or 0)
+
+    @staticmethod
+    def _get_rented_books_query(username: str) -> Select:
+        """
+        Счетчик книг пользователя. Читается по первичному ключу, сколько бы бронирований у пользователя ни было.
+        """
+        return select(RentedBooksCount.count).where(RentedBooksCount.username == username)
+
+    @staticmethod
+    async def _change_rented_books_count(session: AsyncSession, username: str, change: int) -> None:
+        """
+        Меняет число книг на руках у пользователя в транзакции `session`, создавая счетчик при первом бронировании.
+        """
+        await session.execute(
+            insert(RentedBooksCount)
+            .values(username=username, count=max(change, 0))
+            .on_conflict_do_update(
+                index_elements=[RentedBooksCount.username],
+                set_={'count': RentedBooksCount.count + change},
             )
-
-            reservations: List[Reservation] = result.scalars().all()
-
-        return RentedBooks(count=len(reservations))
+        )
 
 
 reservation_repository: ReservationRepository = ReservationRepository(async_session)
@@ -1,25 +1,72 @@
+import asyncio
 import logging
 from typing import Any, Dict
 
 import uvicorn
 from alembic import command
 from alembic.config import Config
-from fastapi import FastAPI, status
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from reservation_system.config import DB_CONFIG
-from reservation_system.db.db_config import SQLALCHEMY_DATABASE_URL
+from reservation_system.db.db_config import SQLALCHEMY_DATABASE_URL, engine
+from reservation_system.db.instrumentation import SQL_INSTRUMENTATION
+from reservation_system.db.pool_metrics import POOL_METRICS
 from reservation_system.service.routers import router
 
+from share.db_pool import warm_up_pool
+
 logger = logging.getLogger(__name__)
 
+# Заголовок, в котором Gateway передает оставшийся бюджет запроса в секундах.
+DEADLINE_HEADER = 'X-Request-Timeout'
+
 app = FastAPI()
 app.include_router(router)
 
 
+@app.middleware('http')
+async def sql_trace_middleware(request: Request, call_next):
+    """
+    Для случайной доли запросов, заданной SQL_TRACE_SAMPLE_RATE, пишет в лог все запросы к БД.
+    """
+    with SQL_INSTRUMENTATION.trace_request():
+        return await call_next(request)
+
+
+@app.middleware('http')
+async def deadline_middleware(request: Request, call_next):
+    """
+    Прерывает обработку запроса, в том числе запросы к БД, когда истекает срок, переданный Gateway.
+    """
+    try:
+        timeout: float | None = float(request.headers[DEADLINE_HEADER])
+    except (KeyError, ValueError):
+        timeout = None
+
+    try:
+        async with asyncio.timeout(timeout):
+            return await call_next(request)
+    except TimeoutError:
+        logger.info(f'Deadline exceeded: {request.method} {request.url.path}')
+        return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={'message': 'Deadline exceeded'})
+
+
 @app.get('/manage/health', status_code=status.HTTP_200_OK)
 async def check_health():
     return None
 
 
+@app.get('/manage/metrics', status_code=status.HTTP_200_OK)
+async def get_metrics() -> Dict:
+    return {'db_pool': POOL_METRICS.stats(), 'sql': SQL_INSTRUMENTATION.stats()}
+
+
+@app.on_event('startup')
+async def startup() -> None:
+    if DB_CONFIG.pool_warm_up:
+        await warm_up_pool(engine, DB_CONFIG.pool_size)
+
+
 def run_db_migrations(db_config: Dict[str, Any], migration_script_location: str):
     """
     Функция запускает миграции alembic через API
@@ -29,7 +76,8 @@ def run_db_migrations(db_config: Dict[str, Any], migration_script_location: str)
     """
     alembic_cfg = Config()
     alembic_cfg.set_main_option("script_location", migration_script_location)
-    alembic_cfg.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+    # Значения опций alembic интерполируются, поэтому `%` из экранированного пароля удваивается.
+    alembic_cfg.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
     alembic_cfg.set_main_option("standalone", 'false')
     for option in ['db_host', 'db_user', 'db_password', 'db_name']:
         if option not in db_config:
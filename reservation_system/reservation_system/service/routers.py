@@ -19,40 +19,21 @@ router = APIRouter()
 async def get_reservations(
     x_user_name: str = Header(), repository: ReservationRepository = Depends(get_reservation_repository)
 ) -> List[ReservationResponse]:
-    reservations: List[ReservationModel] = await repository.get_reservations(x_user_name)
-    reservations_response: List[ReservationResponse] = [
-        ReservationResponse(
-            **reservation.dict(exclude={'id', 'reservation_uid', 'book_uid', 'library_uid', 'start_date', 'till_date'}),
-            reservationUid=reservation.reservation_uid,
-            bookUid=reservation.book_uid,
-            libraryUid=reservation.library_uid,
-            startDate=reservation.start_date,
-            tillDate=reservation.till_date,
-        )
-        for reservation in reservations
-    ]
-    return reservations_response
+    return await repository.get_reservations(x_user_name)
 
 
 @router.get('/reservations/{reservation_uid}', status_code=status.HTTP_200_OK, response_model=ReservationResponse)
 async def get_reservation(
     reservation_uid: UUID, repository: ReservationRepository = Depends(get_reservation_repository)
 ) -> ReservationResponse:
-    reservation: ReservationModel = await repository.get_reservation(reservation_uid)
-    return ReservationResponse(
-        **reservation.dict(exclude={'id', 'reservation_uid', 'book_uid', 'library_uid', 'start_date', 'till_date'}),
-        reservationUid=reservation.reservation_uid,
-        bookUid=reservation.book_uid,
-        libraryUid=reservation.library_uid,
-        startDate=reservation.start_date,
-        tillDate=reservation.till_date,
-    )
+    return await repository.get_reservation(reservation_uid)
 
 
 @router.post('/reservations', status_code=status.HTTP_201_CREATED, response_model=ReservationResponse)
 async def create_reservation(
     reservation_request: ReservationRequest,
     x_user_name: str = Header(),
+    idempotency_key: str | None = Header(default=None),
     repository: ReservationRepository = Depends(get_reservation_repository),
 ) -> ReservationResponse:
     reservation_input: ReservationInput = ReservationInput(
@@ -61,7 +42,7 @@ async def create_reservation(
         till_date=reservation_request.tillDate,
         username=x_user_name
     )
-    reservation: ReservationModel = await repository.create_reservation(reservation_input)
+    reservation: ReservationModel = await repository.create_reservation(reservation_input, idempotency_key)
     return ReservationResponse(
         **reservation.dict(exclude={'id', 'reservation_uid', 'book_uid', 'library_uid', 'start_date', 'till_date'}),
         reservationUid=reservation.reservation_uid,
@@ -0,0 +1,118 @@
+"""
+Задержка получения числа книг на руках у пользователей с тысячами бронирований. Сравниваются счетчик
+пользователя, подсчет бронирований COUNT(*) по индексу (username, status) и прежняя схема - загрузка всех
+бронирований на руках в ORM-объекты.
+
+Запуск из каталога с пакетами сервиса и тестов при доступной БД сервиса:
+    python -m reservation_system_tests.bench_rented_books --reservations 1000 5000 10000
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Tuple
+from uuid import uuid4
+
+from reservation_system.config import DB_CONFIG
+from reservation_system.db.db_config import async_session, engine
+from reservation_system.db.models import Reservation, Status
+from reservation_system.db.repository import ReservationRepository
+from reservation_system.main import run_db_migrations
+from sqlalchemy import func, text
+from sqlalchemy.future import select
+
+from reservation_system_tests.utils import MIGRATIONS_PATH, delete_reservations, describe_latencies
+
+GetCount = Callable[[str], Awaitable[int]]
+
+
+async def get_counter(username: str) -> int:
+    rented_books = await ReservationRepository(async_session).get_rented_books(username)
+    return rented_books.count
+
+
+async def count_reservations(username: str) -> int:
+    async with async_session() as session, session.begin():
+        result = await session.execute(
+            select(func.count()).where(Reservation.username == username, Reservation.status == Status.RENTED)
+        )
+    return result.scalar_one()
+
+
+async def load_reservations(username: str) -> int:
+    async with async_session() as session, session.begin():
+        result = await session.execute(
+            select(Reservation).where(Reservation.username == username, Reservation.status == Status.RENTED)
+        )
+        reservations: List[Reservation] = result.scalars().all()
+    return len(reservations)
+
+
+async def create_reservations(username: str, reservations: int) -> int:
+    """
+    Бронирования пользователя `username`, треть из которых на руках, и его счетчик книг.
+    :return: Число книг на руках.
+    """
+    async with async_session() as session, session.begin():
+        await session.execute(
+            text(
+                """
+                INSERT INTO reservation
+                    (reservation_uid, username, book_uid, library_uid, status, start_date, till_date)
+                SELECT gen_random_uuid(), :username, gen_random_uuid(), gen_random_uuid(),
+                    CASE WHEN i % 3 = 0 THEN 'RENTED' ELSE 'RETURNED' END::status, now(), now() + interval '1 month'
+                FROM generate_series(1, :reservations) AS i
+                """
+            ),
+            {'username': username, 'reservations': reservations},
+        )
+        result = await session.execute(
+            text(
+                """
+                INSERT INTO rented_books_count (username, count)
+                SELECT username, count(*) FROM reservation WHERE username = :username AND status = 'RENTED'
+                GROUP BY username
+                RETURNING count
+                """
+            ),
+            {'username': username},
+        )
+        rented: int = result.scalar_one()
+        for table in ['reservation', 'rented_books_count']:
+            await session.execute(text(f'ANALYZE {table}'))
+    return rented
+
+
+async def main(reservations_counts: List[int], repeats: int) -> None:
+    modes: List[Tuple[str, GetCount]] = [
+        ('counter', get_counter),
+        ('COUNT(*)', count_reservations),
+        ('load all rows', load_reservations),
+    ]
+    try:
+        for reservations in reservations_counts:
+            username: str = f'bench-{uuid4()}'
+            rented: int = await create_reservations(username, reservations)
+            try:
+                for name, get_count in modes:
+                    latencies: List[float] = []
+                    for _ in range(repeats):
+                        started: float = time.perf_counter()
+                        count: int = await get_count(username)
+                        latencies.append(time.perf_counter() - started)
+                    assert count == rented, (name, count, rented)
+                    result: str = describe_latencies(latencies)
+                    print(f'{reservations:6} reservations, {rented:5} rented, {name:13}: {result}')
+            finally:
+                await delete_reservations(username)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservations', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--repeats', type=int, default=100)
+    args = parser.parse_args()
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.run(main(args.reservations, args.repeats))
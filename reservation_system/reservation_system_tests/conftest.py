@@ -0,0 +1,56 @@
+import asyncio
+from typing import AsyncIterator, Iterator
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from reservation_system.config import DB_CONFIG
+from reservation_system.db.db_config import async_session, engine
+from reservation_system.db.repository import ReservationRepository
+from reservation_system.main import run_db_migrations
+
+from reservation_system_tests.utils import MIGRATIONS_PATH, delete_reservations
+
+
+@pytest.fixture(scope='session')
+def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # Соединения пула привязаны к циклу событий, поэтому один цикл на все тесты.
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def database(event_loop: asyncio.AbstractEventLoop) -> None:
+    """
+    БД, к которой подключается сервис, с примененными миграциями. Если БД недоступна, тесты с ней пропускаются.
+    """
+
+    async def check_connection() -> None:
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql('SELECT 1')
+
+    try:
+        event_loop.run_until_complete(asyncio.wait_for(check_connection(), timeout=5))
+    except (OSError, asyncio.TimeoutError) as exc:
+        pytest.skip(f'PostgreSQL is not available at {DB_CONFIG.db_host}:{DB_CONFIG.db_port}: {exc!r}')
+
+    run_db_migrations(DB_CONFIG.dict(), MIGRATIONS_PATH)
+    asyncio.set_event_loop(event_loop)
+
+
+@pytest.fixture
+def repository(database: None) -> ReservationRepository:
+    return ReservationRepository(async_session)
+
+
+@pytest_asyncio.fixture
+async def username(database: None) -> AsyncIterator[str]:
+    """
+    Пользователь, которого нет в других тестах. Его бронирования и счетчик удаляются после теста.
+    """
+    username = f'test-{uuid4()}'
+    yield username
+
+    await delete_reservations(username)
@@ -0,0 +1,58 @@
+import re
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from reservation_system.db.db_config import async_session
+from reservation_system.db.repository import ReservationRepository
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from reservation_system_tests.utils import explain
+
+# По двадцать бронирований у тысячи пользователей, треть из них на руках.
+BULK_DATA = [
+    """
+    INSERT INTO reservation (reservation_uid, username, book_uid, library_uid, status, start_date, till_date)
+    SELECT gen_random_uuid(), 'explain-' || (i % 1000), gen_random_uuid(), gen_random_uuid(),
+        CASE WHEN i % 3 = 0 THEN 'RENTED' ELSE 'RETURNED' END::status, now(), now() + interval '1 month'
+    FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO rented_books_count (username, count)
+    SELECT username, count(*) FROM reservation WHERE username LIKE 'explain-%' AND status = 'RENTED'
+    GROUP BY username
+    """,
+    'ANALYZE reservation',
+    'ANALYZE rented_books_count',
+]
+
+
+@pytest_asyncio.fixture
+async def bulk_session(database: None) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия с объемом данных, при котором выбор плана имеет смысл. Данные и статистика по ним существуют только
+    в транзакции теста и откатываются вместе с ней.
+    """
+    async with async_session() as session:
+        transaction = await session.begin()
+        for statement in BULK_DATA:
+            await session.execute(text(statement))
+        await session.execute(text('SET LOCAL enable_seqscan = off'))
+        yield session
+        await transaction.rollback()
+
+
+@pytest.mark.asyncio
+async def test_reservations_query_uses_username_index(bulk_session: AsyncSession):
+    plan: str = await explain(bulk_session, ReservationRepository._get_reservations_query('explain-7'))
+
+    assert re.search(r'(Bitmap )?Index Scan (using|on) ix_reservation_username_status', plan), plan
+    assert re.search(r'Index Cond: \(\(?username\)?::text = ', plan), plan
+
+
+@pytest.mark.asyncio
+async def test_rented_books_query_uses_counter_key(bulk_session: AsyncSession):
+    plan: str = await explain(bulk_session, ReservationRepository._get_rented_books_query('explain-7'))
+
+    assert re.search(r'Index Scan (using|on) rented_books_count_pkey', plan), plan
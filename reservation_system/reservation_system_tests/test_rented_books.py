@@ -0,0 +1,77 @@
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from reservation_system.db.models import Status
+from reservation_system.db.repository import ReservationRepository
+from reservation_system.service.schemas import ReservationInput, ReservationModel, ReservationUpdate
+
+from reservation_system_tests.utils import request
+
+
+def make_reservation(username: str, status: Status = Status.RENTED) -> ReservationInput:
+    return ReservationInput(
+        username=username, book_uid=uuid4(), library_uid=uuid4(), status=status, till_date=date(2030, 1, 31)
+    )
+
+
+async def rented_count(repository: ReservationRepository, username: str) -> int:
+    return (await repository.get_rented_books(username)).count
+
+
+@pytest.mark.asyncio
+async def test_counter_follows_reservation_lifecycle(repository: ReservationRepository, username: str):
+    assert await rented_count(repository, username) == 0
+
+    first: ReservationModel = await repository.create_reservation(make_reservation(username))
+    second: ReservationModel = await repository.create_reservation(make_reservation(username))
+    await repository.create_reservation(make_reservation(username, Status.RETURNED))
+    assert await rented_count(repository, username) == 2
+
+    await repository.update_reservation(first.reservation_uid, username, ReservationUpdate(status=Status.RETURNED))
+    assert await rented_count(repository, username) == 1
+
+    await repository.update_reservation(first.reservation_uid, username, ReservationUpdate(status=Status.RETURNED))
+    await repository.update_reservation(first.reservation_uid, username, ReservationUpdate(status=Status.EXPIRED))
+    assert await rented_count(repository, username) == 1
+
+    await repository.update_reservation(first.reservation_uid, username, ReservationUpdate(status=Status.RENTED))
+    assert await rented_count(repository, username) == 2
+
+    await repository.delete_reservation(second.reservation_uid, username)
+    assert await rented_count(repository, username) == 1
+
+    await repository.update_reservation(first.reservation_uid, username, ReservationUpdate(status=Status.RETURNED))
+    await repository.delete_reservation(first.reservation_uid, username)
+    assert await rented_count(repository, username) == 0
+
+
+@pytest.mark.asyncio
+async def test_repeated_idempotent_create_counts_once(repository: ReservationRepository, username: str):
+    key = str(uuid4())
+    reservation: ReservationInput = make_reservation(username)
+
+    first: ReservationModel = await repository.create_reservation(reservation, key)
+    second: ReservationModel = await repository.create_reservation(reservation, key)
+
+    assert first.reservation_uid == second.reservation_uid
+    assert await rented_count(repository, username) == 1
+
+
+@pytest.mark.asyncio
+async def test_deleting_other_users_reservation_keeps_counter(repository: ReservationRepository, username: str):
+    reservation: ReservationModel = await repository.create_reservation(make_reservation(username))
+
+    await repository.delete_reservation(reservation.reservation_uid, f'{username}-other')
+
+    assert await rented_count(repository, username) == 1
+
+
+@pytest.mark.asyncio
+async def test_rented_endpoint(repository: ReservationRepository, username: str):
+    await repository.create_reservation(make_reservation(username))
+
+    status_code, rented = await request('GET', '/rented', headers={'X-User-Name': username})
+
+    assert status_code == 200
+    assert rented == {'count': 1}
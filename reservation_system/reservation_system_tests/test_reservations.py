@@ -0,0 +1,51 @@
+from datetime import date
+from typing import Dict
+from uuid import uuid4
+
+import pytest
+from reservation_system.service.schemas import ReservationResponse
+
+from reservation_system_tests.utils import request
+
+
+async def create_reservation(username: str, till_date: str = '2030-01-31') -> Dict:
+    status_code, reservation = await request(
+        'POST',
+        '/reservations',
+        headers={'X-User-Name': username},
+        body={'bookUid': str(uuid4()), 'libraryUid': str(uuid4()), 'tillDate': till_date},
+    )
+    assert status_code == 201
+    return reservation
+
+
+@pytest.mark.asyncio
+async def test_listings_return_response_fields(username: str):
+    created: Dict = await create_reservation(username)
+
+    assert set(created) == set(ReservationResponse.__fields__)
+    assert created['username'] == username
+    assert created['status'] == 'RENTED'
+    assert created['startDate'] == date.today().isoformat()
+    assert created['tillDate'] == '2030-01-31'
+
+    status_code, reservations = await request('GET', '/reservations', headers={'X-User-Name': username})
+    assert status_code == 200
+    assert reservations == [created]
+
+    status_code, reservation = await request('GET', f'/reservations/{created["reservationUid"]}')
+    assert status_code == 200
+    assert reservation == created
+
+
+@pytest.mark.asyncio
+async def test_listing_is_per_user(username: str):
+    await create_reservation(username)
+    await create_reservation(username)
+
+    _, reservations = await request('GET', '/reservations', headers={'X-User-Name': username})
+    assert len(reservations) == 2
+    assert {reservation['username'] for reservation in reservations} == {username}
+
+    _, reservations = await request('GET', '/reservations', headers={'X-User-Name': f'{username}-other'})
+    assert reservations == []
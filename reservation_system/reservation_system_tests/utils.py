@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import statistics
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlencode
+
+import reservation_system
+from reservation_system.db.db_config import async_session
+from reservation_system.db.models import RentedBooksCount, Reservation
+from reservation_system.main import app
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(reservation_system.__file__), 'db', 'migrations')
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    statement: str = compiler.process(element.statement, **kwargs)
+    # EXPLAIN изменяющего запроса возвращает строки плана, а не результат изменения.
+    compiler.isinsert = compiler.isupdate = compiler.isdelete = False
+    return f'EXPLAIN {statement}'
+
+
+async def explain(session: AsyncSession, statement: Executable) -> str:
+    """
+    План запроса без его выполнения.
+    """
+    result = await session.execute(Explain(statement))
+    return '\n'.join(result.scalars().all())
+
+
+async def delete_reservations(username: str) -> None:
+    """
+    Удаляет бронирования пользователя `username` и его счетчик книг.
+    """
+    async with async_session() as session, session.begin():
+        await session.execute(
+            delete(Reservation).where(Reservation.username == username).execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            delete(RentedBooksCount)
+            .where(RentedBooksCount.username == username)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def describe_latencies(latencies: List[float]) -> str:
+    """
+    Медиана, 99-й перцентиль и максимум времени выполнения, заданного в секундах.
+    """
+    percentiles: List[float] = statistics.quantiles(latencies, n=100, method='inclusive')
+    return (
+        f'p50 {percentiles[49] * 1000:7.1f} ms, p99 {percentiles[98] * 1000:7.1f} ms, '
+        f'max {max(latencies) * 1000:7.1f} ms'
+    )
+
+
+async def request(
+    method: str,
+    path: str,
+    params: Dict[str, Any] | None = None,
+    headers: Dict[str, str] | None = None,
+    body: Any = None,
+) -> Tuple[int, Any]:
+    """
+    Выполняет запрос к приложению через ASGI, включая middleware, и возвращает статус и тело ответа.
+    """
+    content: bytes = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': urlencode(params or {}).encode(),
+        'headers': [
+            (b'content-type', b'application/json'),
+            *((name.lower().encode(), value.encode()) for name, value in (headers or {}).items()),
+        ],
+        'client': ('test', 0),
+        'server': ('test', 80),
+    }
+    messages: List[Dict] = []
+    request_sent: bool = False
+    response_sent = asyncio.Event()
+
+    async def receive() -> Dict:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': content, 'more_body': False}
+        # Клиент отключается только после того, как получил ответ.
+        await response_sent.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Dict) -> None:
+        messages.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body', False):
+            response_sent.set()
+
+    await app(scope, receive, send)
+
+    status_code: int = next(message['status'] for message in messages if message['type'] == 'http.response.start')
+    response: bytes = b''.join(
+        message.get('body', b'') for message in messages if message['type'] == 'http.response.body'
+    )
+    return status_code, json.loads(response) if response else None
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который учитывает, сколько времени запросы ждали соединение, включая установку нового,
+    и сколько из них не дождались его за `pool_timeout`.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self._waits: int = 0
+        self._wait_time: float = 0.0
+        self._max_wait_time: float = 0.0
+        self._timeouts: int = 0
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self._timeouts += 1
+            raise
+        finally:
+            wait_time = time.perf_counter() - started_at
+            self._waits += 1
+            self._wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def wait_stats(self) -> Dict:
+        return {
+            'waits': self._waits,
+            'avg_wait_ms': round(self._wait_time / self._waits * 1000, 3) if self._waits else None,
+            'max_wait_ms': round(self._max_wait_time * 1000, 3),
+            'timeouts': self._timeouts,
+        }
+
+
+async def warm_up_pool(engine: AsyncEngine, size: int) -> None:
+    """
+    Открывает `size` соединений одновременно, чтобы при запуске в пуле уже были готовые соединения
+    и первые запросы не ждали их установки.
+    """
+
+    async def connect() -> None:
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql('SELECT 1')
+
+    await asyncio.gather(*(connect() for _ in range(size)))
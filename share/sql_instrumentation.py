@@ -0,0 +1,181 @@
+import logging
+import random
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы интервалов гистограммы времени выполнения запросов в миллисекундах.
+LATENCY_BUCKETS: List[float] = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# Запросы, для которых имеет смысл EXPLAIN.
+EXPLAINABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+EXPLAIN_SAVEPOINT = 'sql_instrumentation_explain'
+
+OTHER_STATEMENTS = 'other'
+
+_sampled: ContextVar[bool] = ContextVar('sql_trace_sampled', default=False)
+
+_whitespace_re = re.compile(r'\s+')
+_literal_re = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|%s|\?|\b\d+(?:\.\d+)?\b")
+# Список из нескольких параметров или список IN из одного.
+_list_re = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)|(?<=\bIN )\(\s*\?\s*\)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    """
+    Заменяет параметры и литералы запроса на `?`, а списки параметров на `(...)`,
+    чтобы одинаковые запросы с разными значениями учитывались вместе.
+    """
+    statement = _literal_re.sub('?', _whitespace_re.sub(' ', statement).strip())
+    return _list_re.sub('(...)', statement)
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self._buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._count: int = 0
+        self._total: float = 0.0
+        self._max: float = 0.0
+
+    def add(self, latency_ms: float) -> None:
+        self._buckets[bisect_left(LATENCY_BUCKETS, latency_ms)] += 1
+        self._count += 1
+        self._total += latency_ms
+        self._max = max(self._max, latency_ms)
+
+    def stats(self) -> Dict:
+        return {
+            'count': self._count,
+            'total_ms': round(self._total, 3),
+            'max_ms': round(self._max, 3),
+            'buckets': {
+                f'le_{bound}' if bound is not None else 'inf': count
+                for bound, count in zip([*LATENCY_BUCKETS, None], self._buckets)
+            },
+        }
+
+
+class SQLInstrumentation:
+    """
+    Измеряет время выполнения запросов к БД по событиям engine вместо `echo=True`, который синхронно пишет в лог
+    каждый запрос. Время собирается в гистограммы по нормализованному тексту запроса, в лог попадают только медленные
+    запросы, при необходимости вместе с их планом, и все запросы из случайной доли HTTP-запросов.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        slow_query_threshold: float,
+        explain_slow_queries: bool = False,
+        trace_sample_rate: float = 0.0,
+        max_statements: int = 500,
+    ) -> None:
+        self._slow_query_threshold: float = slow_query_threshold
+        self._explain_slow_queries: bool = explain_slow_queries
+        self._trace_sample_rate: float = trace_sample_rate
+        self._max_statements: int = max_statements
+
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._slow_queries: int = 0
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine.sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    @contextmanager
+    def trace_request(self) -> Iterator[None]:
+        """
+        Решает, попадут ли в лог все запросы к БД, выполненные внутри блока.
+        """
+        token = _sampled.set(random.random() < self._trace_sample_rate)
+        try:
+            yield
+        finally:
+            _sampled.reset(token)
+
+    def stats(self) -> Dict:
+        return {
+            'slow_queries': self._slow_queries,
+            'statements': {statement: histogram.stats() for statement, histogram in self._histograms.items()},
+        }
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        latency: float = time.perf_counter() - conn.info['query_start_time'].pop()
+
+        normalized_statement = normalize_statement(statement)
+        histogram: LatencyHistogram | None = self._histograms.get(normalized_statement)
+        if histogram is None:
+            # Число разных запросов ограничено, чтобы гистограммы не занимали память без предела.
+            if len(self._histograms) >= self._max_statements:
+                normalized_statement = OTHER_STATEMENTS
+            histogram = self._histograms.setdefault(normalized_statement, LatencyHistogram())
+        histogram.add(latency * 1000)
+
+        if _sampled.get():
+            logger.info(f'SQL {latency * 1000:.1f}ms: {statement} {_describe_parameters(parameters, executemany)}')
+
+        if latency >= self._slow_query_threshold:
+            self._slow_queries += 1
+            logger.warning(
+                f'Slow SQL {latency * 1000:.1f}ms: {statement} {_describe_parameters(parameters, executemany)}'
+            )
+            if self._explain_slow_queries:
+                self._explain(conn, statement, parameters)
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters: Any) -> None:
+        if not statement.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+            return
+
+        # Отдельный курсор, чтобы не потерять результат исходного запроса. EXPLAIN без ANALYZE запрос не выполняет.
+        cursor = conn.connection.cursor()
+        try:
+            plan: str = _run_explain(cursor, statement, parameters, in_transaction=conn.in_transaction())
+        except Exception as exc:
+            logger.debug(f'Can not explain slow SQL: {exc!r}')
+            return
+        finally:
+            cursor.close()
+
+        logger.warning(f'Slow SQL plan:\n{plan}')
+
+
+def _describe_parameters(parameters: Any, executemany: bool) -> str:
+    """
+    Описание параметров запроса для лога. Значения не пишутся, так как в них могут быть персональные данные.
+    """
+    if executemany:
+        return f'[{len(parameters)} rows]'
+    return f'[{len(parameters) if parameters else 0} parameters]'
+
+
+def _run_explain(cursor, statement: str, parameters: Any, in_transaction: bool) -> str:
+    """
+    Выполняет EXPLAIN на соединении запроса. В транзакции EXPLAIN выполняется в точке сохранения,
+    чтобы его ошибка не прервала транзакцию, в которой выполняются остальные запросы.
+    """
+    if in_transaction:
+        cursor.execute(f'SAVEPOINT {EXPLAIN_SAVEPOINT}')
+    try:
+        cursor.execute(f'EXPLAIN {statement}', parameters)
+        return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+    except Exception:
+        if in_transaction:
+            cursor.execute(f'ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        raise
+    finally:
+        if in_transaction:
+            cursor.execute(f'RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}')